@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+End-to-end deploy and rollback benchmark, entirely offline
+Usage: python benchmarks/e2e_benchmark.py [--repeats 3] [--files 300] [--file-kb 8] [--media-mb 0]
+                                          [--install-seconds 2] [--build-seconds 1] [--output results.json]
+
+Runs deploy_tool.py as a subprocess against a local bare git repository (the "GitHub"
+remote), stub npm/node executables that write a configurable build tree, and moto's
+S3/STS server (pip install "moto[server]"). Every repeat starts from empty caches and runs:
+  cold      first deploy: mirror clone, npm install, build, bucket creation, full upload
+  warm      deploy of a new commit: incremental fetch, cached packages, delta upload
+  no-op     deploy with nothing new: ends after git ls-remote
+  rollback  rollback to the first deploy: cached build, backup, clear, re-upload
+Per-phase latencies come from each run's --trace file. POSIX only (the stubs are scripts).
+"""
+
+import os
+import sys
+import json
+import shutil
+import socket
+import logging
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+
+# Spans reported besides the phases, when a run has them
+DETAIL_SPANS = ['resolve_remote_commit', 'clone_repository', 'install_dependencies', 'run_build',
+                'upload_to_s3', 'backup_current_deployment', 'clear_s3_bucket']
+
+COUNTERS = ['s3_api_calls', 'files_uploaded', 'bytes_uploaded', 'git_commands', 'git_bytes_fetched']
+
+STUB_NPM = r'''#!{python}
+"""Stand-in for npm: simulated installs with a package cache, and a configurable build tree."""
+import hashlib, os, sys, time
+
+args = sys.argv[1:]
+if not args or args[0] in ('--version', '-v'):
+    print('10.0.0-stub')
+    sys.exit(0)
+
+def content(seed, size):
+    digest = hashlib.sha256(seed.encode('utf-8')).hexdigest().encode('ascii')
+    return (digest * (size // len(digest) + 1))[:size]
+
+if args[0] in ('ci', 'install'):
+    cache_dir = args[args.index('--cache') + 1] if '--cache' in args else os.path.join(os.getcwd(), '.npm-cache')
+    content_dir = os.path.join(cache_dir, '_cacache', 'content-v2')
+    cached = os.path.isdir(content_dir) and os.listdir(content_dir)
+    seconds = float(os.environ.get('STUB_INSTALL_SECONDS', 2))
+    # A warm cache leaves only linking work
+    time.sleep(seconds * 0.2 if cached else seconds)
+    os.makedirs(content_dir, exist_ok=True)
+    for i in range(int(os.environ.get('STUB_PACKAGES', 100))):
+        with open(os.path.join(content_dir, f'package-{{i}}'), 'w') as f:
+            f.write(str(i))
+    os.makedirs('node_modules', exist_ok=True)
+    sys.exit(0)
+
+if args[:2] == ['run', 'build']:
+    time.sleep(float(os.environ.get('STUB_BUILD_SECONDS', 1)))
+    source = b''
+    for root, dirs, files in sorted(os.walk('src')):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                source += f.read()
+    source_hash = hashlib.sha256(source).hexdigest()[:8]
+    file_count = int(os.environ.get('STUB_BUILD_FILES', 300))
+    file_size = int(float(os.environ.get('STUB_BUILD_KB', 8)) * 1024)
+    
+    os.makedirs(os.path.join('build', 'static', 'js'), exist_ok=True)
+    with open(os.path.join('build', 'index.html'), 'w') as f:
+        f.write(f'<!doctype html><html><body><script src="/static/js/main.{{source_hash}}.js"></script></body></html>')
+    # The app chunk follows the source; vendor chunks stay the same between commits
+    with open(os.path.join('build', 'static', 'js', f'main.{{source_hash}}.js'), 'wb') as f:
+        f.write(content(source_hash, file_size))
+    for i in range(file_count - 2):
+        with open(os.path.join('build', 'static', 'js', f'vendor-{{i}}.js'), 'wb') as f:
+            f.write(content(f'vendor-{{i}}', file_size))
+    
+    media_size = int(float(os.environ.get('STUB_MEDIA_MB', 0)) * 1024 * 1024)
+    if media_size:
+        os.makedirs(os.path.join('build', 'media'), exist_ok=True)
+        with open(os.path.join('build', 'media', 'intro.mp4'), 'wb') as f:
+            f.write(content('media', media_size))
+    sys.exit(0)
+
+print(f'stub npm: unsupported command: {{" ".join(args)}}', file=sys.stderr)
+sys.exit(1)
+'''
+
+STUB_NODE = '''#!{python}
+print('v20.0.0-stub')
+'''
+
+
+def write_stub(bin_dir, name, source):
+    """Write an executable stub script."""
+    stub_path = os.path.join(bin_dir, name)
+    with open(stub_path, 'w') as f:
+        f.write(source.format(python=sys.executable))
+    os.chmod(stub_path, 0o755)
+
+
+def git(args, cwd):
+    """Run a git command with a fixed identity."""
+    subprocess.run(['git', '-c', 'user.name=benchmark', '-c', 'user.email=benchmark@example.com'] + args,
+                   cwd=cwd, check=True, capture_output=True, text=True)
+
+
+def create_remote(work_dir, packages):
+    """Create a bare repository with one commit of a Node.js project; return its path and working copy."""
+    remote = os.path.join(work_dir, 'remote.git')
+    source = os.path.join(work_dir, 'source')
+    git(['init', '--bare', '--quiet', remote], work_dir)
+    git(['symbolic-ref', 'HEAD', 'refs/heads/master'], remote)
+    git(['clone', '--quiet', remote, source], work_dir)
+    git(['checkout', '--quiet', '-B', 'master'], source)
+    
+    with open(os.path.join(source, 'package.json'), 'w') as f:
+        json.dump({'name': 'e2e-benchmark', 'version': '1.0.0', 'scripts': {'build': 'stub'},
+                   'dependencies': {'react-scripts': '5.0.1'}}, f, indent=2)
+    lock_packages = {'': {'name': 'e2e-benchmark'}}
+    lock_packages.update({f'node_modules/package-{i}': {'version': '1.0.0'} for i in range(packages)})
+    with open(os.path.join(source, 'package-lock.json'), 'w') as f:
+        json.dump({'name': 'e2e-benchmark', 'lockfileVersion': 3, 'packages': lock_packages}, f, indent=2)
+    os.makedirs(os.path.join(source, 'src'))
+    commit_source_change(source, 1)
+    return remote, source
+
+
+def commit_source_change(source, revision):
+    """Commit a new revision of the app source and push it."""
+    with open(os.path.join(source, 'src', 'app.js'), 'w') as f:
+        f.write(f"export const revision = {revision};\n")
+    git(['add', '-A'], source)
+    git(['commit', '--quiet', '-m', f'Revision {revision}'], source)
+    git(['push', '--quiet', 'origin', 'master'], source)
+
+
+def start_moto_server():
+    """Start moto's server on a free port; return the server and its URL."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        print('The local S3 stand-in needs moto\'s server: pip install "moto[server]"')
+        sys.exit(2)
+    
+    # The server would otherwise log every request to stderr
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run_tool(argv, app_dir, env, stdin, trace_path):
+    """Run deploy_tool.py with a trace file; return wall seconds and the parsed trace."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, str(TOOL_DIR / 'deploy_tool.py')] + argv + ['--trace', trace_path],
+                            cwd=app_dir, env=env, input=stdin, capture_output=True, text=True)
+    wall_seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise Exception(f"{' '.join(argv)} failed:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    
+    with open(trace_path, 'r') as f:
+        return wall_seconds, json.load(f)
+
+
+def summarize_trace(wall_seconds, trace):
+    """Pick the command, phase and detail span durations and the counters out of a trace."""
+    spans = {}
+    for event in trace['traceEvents']:
+        if event.get('ph') != 'X':
+            continue
+        if event['cat'] in ('command', 'phase') or event['name'] in DETAIL_SPANS:
+            name = 'total' if event['cat'] == 'command' else event['name']
+            spans[name] = spans.get(name, 0.0) + event['dur'] / 1e6
+    
+    counters = trace.get('otherData', {}).get('counters', {})
+    return {
+        'wall_seconds': wall_seconds,
+        'spans': spans,
+        'counters': {name: counters.get(name, 0) for name in COUNTERS}
+    }
+
+
+def run_sequence(work_dir, endpoint_url, args):
+    """Run cold, warm, no-op and rollback against fresh caches; return each run's summary."""
+    remote, source = create_remote(work_dir, args.packages)
+    app_dir = os.path.join(work_dir, 'app')
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(app_dir)
+    os.makedirs(bin_dir)
+    write_stub(bin_dir, 'npm', STUB_NPM)
+    write_stub(bin_dir, 'node', STUB_NODE)
+    
+    with open(os.path.join(app_dir, '.deploy-config.json'), 'w') as f:
+        json.dump({
+            'project_name': 'e2e-benchmark',
+            'github_url': remote,
+            'github_branch': 'master',
+            'aws_profile': None,
+            'aws_region': 'us-east-1',
+            's3_endpoint_url': endpoint_url,
+            'cache_dir': os.path.join(work_dir, 'cache'),
+            'upload_workers': args.workers,
+            'environments': {'dev': {'bucket': f"e2e-benchmark-{os.path.basename(work_dir).lower()}"}}
+        }, f, indent=2)
+    
+    env = {key: value for key, value in os.environ.items() if not key.startswith('AWS_')}
+    env.update({
+        'PATH': bin_dir + os.pathsep + os.environ.get('PATH', ''),
+        # moto accepts any credentials; real ones are never sent to it
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'AWS_ENDPOINT_URL_STS': endpoint_url,
+        'STUB_INSTALL_SECONDS': str(args.install_seconds),
+        'STUB_BUILD_SECONDS': str(args.build_seconds),
+        'STUB_BUILD_FILES': str(args.files),
+        'STUB_BUILD_KB': str(args.file_kb),
+        'STUB_MEDIA_MB': str(args.media_mb),
+        'STUB_PACKAGES': str(args.packages)
+    })
+    
+    def trace_path(name):
+        return os.path.join(work_dir, f"{name}.trace.json")
+    
+    summaries = {}
+    # "n" declines the .env prompt; rollback only asks for confirmation with --deployment
+    summaries['cold'] = summarize_trace(*run_tool(['deploy', '--env', 'dev'], app_dir, env, 'n\n', trace_path('cold')))
+    commit_source_change(source, 2)
+    summaries['warm'] = summarize_trace(*run_tool(['deploy', '--env', 'dev'], app_dir, env, 'n\n', trace_path('warm')))
+    summaries['no-op'] = summarize_trace(*run_tool(['deploy', '--env', 'dev'], app_dir, env, 'n\n', trace_path('no-op')))
+    summaries['rollback'] = summarize_trace(*run_tool(['rollback', '--env', 'dev', '--deployment', '1'],
+                                                      app_dir, env, 'yes\n', trace_path('rollback')))
+    return summaries
+
+
+def aggregate(samples):
+    """Get the median, min and max of each span and counter across repeats of one run."""
+    def stats(values):
+        return {'median': round(statistics.median(values), 3), 'min': round(min(values), 3),
+                'max': round(max(values), 3)}
+    
+    span_names = []
+    for sample in samples:
+        span_names += [name for name in sample['spans'] if name not in span_names]
+    
+    return {
+        'wall_seconds': stats([sample['wall_seconds'] for sample in samples]),
+        'spans': {name: stats([sample['spans'].get(name, 0.0) for sample in samples]) for name in span_names},
+        'counters': {name: statistics.median(sample['counters'][name] for sample in samples) for name in COUNTERS}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end deploy and rollback benchmark, entirely offline')
+    parser.add_argument('--repeats', type=int, default=3, help='Full cold/warm/no-op/rollback sequences to run')
+    parser.add_argument('--files', type=int, default=300, help='Files in the stub build output')
+    parser.add_argument('--file-kb', type=float, default=8, help='Size of each stub build file')
+    parser.add_argument('--media-mb', type=float, default=0, help='Add one incompressible media file of this size')
+    parser.add_argument('--packages', type=int, default=100, help='Packages in the stub lockfile and npm cache')
+    parser.add_argument('--install-seconds', type=float, default=2, help='Simulated cold npm install time')
+    parser.add_argument('--build-seconds', type=float, default=1, help='Simulated npm run build time')
+    parser.add_argument('--workers', type=int, default=10, help='Upload workers, as upload_workers in the config')
+    parser.add_argument('--keep', action='store_true', help='Keep the work directories (and traces) for inspection')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+    
+    if os.name == 'nt':
+        print("The stub npm and node are POSIX scripts; run this benchmark on Linux or macOS")
+        sys.exit(2)
+    
+    server, endpoint_url = start_moto_server()
+    work_root = tempfile.mkdtemp(prefix='deploy_e2e_')
+    samples = {}
+    try:
+        for repeat in range(args.repeats):
+            work_dir = os.path.join(work_root, f"run{repeat + 1}")
+            os.makedirs(work_dir)
+            print(f"Sequence {repeat + 1}/{args.repeats}...")
+            for name, summary in run_sequence(work_dir, endpoint_url, args).items():
+                samples.setdefault(name, []).append(summary)
+    finally:
+        if args.keep:
+            print(f"Work directories and traces kept in {work_root}")
+        else:
+            shutil.rmtree(work_root, ignore_errors=True)
+        server.stop()
+    
+    results = {name: aggregate(run_samples) for name, run_samples in samples.items()}
+    
+    print(f"\n{'run':<9} {'span':<26} {'median':>8} {'min':>8} {'max':>8}")
+    for name, result in results.items():
+        wall = result['wall_seconds']
+        print(f"{name:<9} {'wall clock':<26} {wall['median']:>7.2f}s {wall['min']:>7.2f}s {wall['max']:>7.2f}s")
+        for span_name, span_stats in result['spans'].items():
+            print(f"{'':<9} {span_name:<26} {span_stats['median']:>7.2f}s {span_stats['min']:>7.2f}s "
+                  f"{span_stats['max']:>7.2f}s")
+        counters = result['counters']
+        print(f"{'':<9} {counters['s3_api_calls']:.0f} S3 requests, {counters['files_uploaded']:.0f} files uploaded, "
+              f"{counters['git_commands']:.0f} git commands")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'repeats': args.repeats,
+                'settings': {
+                    'files': args.files,
+                    'file_kb': args.file_kb,
+                    'media_mb': args.media_mb,
+                    'packages': args.packages,
+                    'install_seconds': args.install_seconds,
+                    'build_seconds': args.build_seconds,
+                    'workers': args.workers
+                },
+                'results': results,
+                'samples': samples
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Upload, backup and clear benchmark against a local S3 stand-in
+Usage: python benchmarks/s3_benchmark.py [--scenarios chunks,media,mixed] [--scale 1.0] [--workers 10]
+                                         [--endpoint-url URL] [--output results.json] [--baseline old.json]
+
+Generates synthetic build trees and times AWSClient.upload_to_s3, backup_current_deployment
+and clear_s3_bucket on each. The S3 stand-in is moto's server (pip install "moto[server]"),
+started in this process, or any S3-compatible endpoint given with --endpoint-url. Every
+scenario runs in a fresh interpreter so its peak RSS is its own. With --baseline, exits
+with status 1 when throughput drops past --tolerance or an operation makes more requests.
+"""
+
+import os
+import sys
+import json
+import uuid
+import random
+import shutil
+import socket
+import hashlib
+import logging
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+
+MB = 1024 * 1024
+
+# Small files are hashed build chunks; large files are incompressible media
+SCENARIOS = {
+    'chunks': {'small_files': 3000, 'large_files': 0, 'large_mb': 0},
+    'media': {'small_files': 20, 'large_files': 4, 'large_mb': 48},
+    'mixed': {'small_files': 1500, 'large_files': 2, 'large_mb': 32}
+}
+
+SMALL_FILE_TYPES = [('static/js', 'chunk', '.js'), ('static/css', 'chunk', '.css'), ('static/media', 'icon', '.svg')]
+
+# Counters holding each operation's object and byte counts (see utils/tracing.py)
+OPERATION_COUNTERS = {
+    'upload': ('files_uploaded', 'bytes_uploaded'),
+    'backup': ('objects_copied', 'bytes_copied'),
+    'clear': ('objects_deleted', None)
+}
+
+SCENARIO_SCRIPT = """
+import contextlib, io, json, sys, time
+sys.path.insert(0, {tool_dir!r})
+from core.aws_client import AWSClient, BACKUPS_PREFIX, get_peak_rss_mb
+from utils.manifest import build_manifest
+from utils.tracing import start_tracing
+
+tracer = start_tracing()
+client = AWSClient(profile=None, region='us-east-1', upload_workers={workers!r}, endpoint_url={endpoint_url!r})
+bucket = {bucket!r}
+client.get_s3_client().create_bucket(Bucket=bucket)
+manifest = build_manifest({tree!r})
+tree_bytes = sum(entry['size'] for entry in manifest.values())
+
+operations = [
+    ('upload', lambda: client.upload_to_s3({tree!r}, bucket, manifest)),
+    ('backup', lambda: client.backup_current_deployment(bucket, BACKUPS_PREFIX + 'benchmark')),
+    ('clear', lambda: client.clear_s3_bucket(bucket))
+]
+
+results = {{'baseline_rss_mb': get_peak_rss_mb(), 'tree_files': len(manifest), 'tree_bytes': tree_bytes, 'operations': {{}}}}
+for name, operation in operations:
+    counters_before = dict(tracer.counters)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok = operation() is not False
+    seconds = time.perf_counter() - started
+    grown = {{key: value - counters_before.get(key, 0) for key, value in tracer.counters.items()}}
+    results['operations'][name] = {{'ok': ok, 'seconds': seconds, 'counters': grown, 'peak_rss_mb': get_peak_rss_mb()}}
+print(json.dumps(results))
+"""
+
+
+def write_random_file(file_path, size, rng):
+    """Write size bytes of incompressible data."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            block = min(remaining, MB)
+            f.write(rng.randbytes(block) if hasattr(rng, 'randbytes') else os.urandom(block))
+            remaining -= block
+
+
+def generate_build_tree(root, scenario, scale, seed=1):
+    """Generate a synthetic build tree for a scenario; return its file count and size in bytes."""
+    spec = SCENARIOS[scenario]
+    rng = random.Random(f"{seed}-{scenario}")
+    files = 0
+    total_bytes = 0
+    
+    index_html = '<!doctype html><html><head><title>benchmark</title></head><body><div id="root"></div></body></html>'
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, 'index.html'), 'w') as f:
+        f.write(index_html)
+    files += 1
+    total_bytes += len(index_html)
+    
+    for i in range(int(spec['small_files'] * scale)):
+        directory, prefix, extension = SMALL_FILE_TYPES[i % len(SMALL_FILE_TYPES)]
+        # Text-like content with a content hash in the name, as bundlers emit it
+        body = ''.join(f"var v{i}_{n}={rng.randint(0, 10 ** 9)};" for n in range(rng.randint(20, 800)))
+        digest = hashlib.sha1(body.encode('utf-8')).hexdigest()[:8]
+        file_path = os.path.join(root, directory, f"{prefix}.{digest}{extension}")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(body)
+        files += 1
+        total_bytes += len(body)
+    
+    large_size = int(spec['large_mb'] * scale * MB)
+    for i in range(spec['large_files']):
+        write_random_file(os.path.join(root, 'media', f"video-{i}.mp4"), large_size, rng)
+        files += 1
+        total_bytes += large_size
+    
+    return files, total_bytes
+
+
+def get_free_port():
+    """Get a free local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_moto_server():
+    """Start moto's S3-compatible server on a free port; return the server and its URL."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        print('The local S3 stand-in needs moto\'s server: pip install "moto[server]"')
+        print("Or point the benchmark at another S3-compatible endpoint with --endpoint-url")
+        sys.exit(2)
+    
+    # The server would otherwise log every request to stderr
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    port = get_free_port()
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run_scenario(scenario, tree, endpoint_url, workers):
+    """Run the upload, backup and clear operations for one tree in a fresh interpreter."""
+    script = SCENARIO_SCRIPT.format(
+        tool_dir=str(TOOL_DIR),
+        tree=tree,
+        endpoint_url=endpoint_url,
+        workers=workers,
+        bucket=f"benchmark-{scenario}-{uuid.uuid4().hex[:8]}"
+    )
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"{scenario} failed: {result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize_operation(name, operation, tree_bytes):
+    """Turn raw operation counters into throughput figures."""
+    objects_counter, bytes_counter = OPERATION_COUNTERS[name]
+    counters = operation['counters']
+    objects = counters.get(objects_counter, 0)
+    # Deletes carry no sizes; a clear removes the whole uploaded tree
+    size = counters.get(bytes_counter, 0) if bytes_counter else tree_bytes
+    seconds = max(operation['seconds'], 1e-6)
+    
+    return {
+        'ok': operation['ok'],
+        'seconds': round(operation['seconds'], 3),
+        'objects': objects,
+        'mb': round(size / MB, 2),
+        'files_per_s': round(objects / seconds, 1),
+        'mb_per_s': round(size / MB / seconds, 2),
+        'requests': counters.get('s3_api_calls', 0),
+        'peak_rss_mb': round(operation['peak_rss_mb'], 1) if operation['peak_rss_mb'] is not None else None
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """List throughput drops and request-count growth against an earlier result file."""
+    regressions = []
+    previous = {(r['scenario'], r['operation']): r for r in baseline.get('results', [])}
+    
+    for result in results:
+        before = previous.get((result['scenario'], result['operation']))
+        if not before:
+            continue
+        
+        label = f"{result['scenario']}/{result['operation']}"
+        if result['files_per_s'] < before['files_per_s'] * (1 - tolerance):
+            regressions.append(f"{label}: {result['files_per_s']:.0f} files/s, was {before['files_per_s']:.0f}")
+        if result['requests'] > before['requests']:
+            regressions.append(f"{label}: {result['requests']} requests, was {before['requests']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upload, backup and clear benchmark against a local S3 stand-in')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply file counts and media sizes')
+    parser.add_argument('--workers', type=int, default=10, help='Upload workers, as upload_workers in the config')
+    parser.add_argument('--endpoint-url', help='S3-compatible endpoint to use instead of a local moto server')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput drop against the baseline')
+    args = parser.parse_args()
+    
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    
+    server = None
+    endpoint_url = args.endpoint_url
+    if not endpoint_url:
+        server, endpoint_url = start_moto_server()
+        # moto accepts any credentials; never send real ones to it
+        os.environ.update(AWS_ACCESS_KEY_ID='benchmark', AWS_SECRET_ACCESS_KEY='benchmark')
+        os.environ.pop('AWS_SESSION_TOKEN', None)
+        os.environ.pop('AWS_PROFILE', None)
+    
+    work_dir = tempfile.mkdtemp(prefix='deploy_s3_benchmark_')
+    results = []
+    failures = []
+    try:
+        print(f"S3 endpoint: {endpoint_url} ({args.workers} workers, scale {args.scale})")
+        print(f"{'scenario':<8} {'operation':<9} {'objects':>7} {'MB':>8} {'seconds':>8} {'files/s':>8} "
+              f"{'MB/s':>7} {'requests':>8} {'peak RSS':>9}")
+        
+        for scenario in scenarios:
+            tree = os.path.join(work_dir, scenario)
+            generate_build_tree(tree, scenario, args.scale)
+            raw = run_scenario(scenario, tree, endpoint_url, args.workers)
+            shutil.rmtree(tree, ignore_errors=True)
+            
+            for name, operation in raw['operations'].items():
+                summary = summarize_operation(name, operation, raw['tree_bytes'])
+                results.append({'scenario': scenario, 'operation': name, **summary})
+                if not summary['ok']:
+                    failures.append(f"{scenario}/{name}: operation reported failure")
+                
+                peak_rss = f"{summary['peak_rss_mb']:.0f} MB" if summary['peak_rss_mb'] is not None else 'n/a'
+                print(f"{scenario:<8} {name:<9} {summary['objects']:>7} {summary['mb']:>8.1f} "
+                      f"{summary['seconds']:>8.2f} {summary['files_per_s']:>8.0f} {summary['mb_per_s']:>7.1f} "
+                      f"{summary['requests']:>8} {peak_rss:>9}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if server:
+            server.stop()
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'endpoint': 'moto' if server else endpoint_url,
+                'workers': args.workers,
+                'scale': args.scale,
+                'results': results
+            }, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale or baseline.get('workers') != args.workers:
+            print(f"\nBaseline was run with scale {baseline.get('scale')} and {baseline.get('workers')} workers; "
+                  f"not comparing")
+        else:
+            failures += compare_with_baseline(results, baseline, args.tolerance)
+    
+    if failures:
+        print("\nUpload-path regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll operations completed" + (" within the baseline tolerance" if args.baseline else ""))
+
+
+if __name__ == '__main__':
+    main()
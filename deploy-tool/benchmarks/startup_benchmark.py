@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for deploy_tool.py subcommands
+Usage: python benchmarks/startup_benchmark.py [--runs 5] [--budget-scale 1.0] [--output results.json]
+
+Every sample is a fresh interpreter. config and status are run end to end against a
+throwaway config; the other subcommands are timed up to the point their command
+class is imported. Exits with status 1 if a subcommand exceeds its budget or an
+AWS-free subcommand imports boto3/botocore.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent.parent
+
+# name, argv to run end to end (None: import only), must stay AWS-free, budget in ms
+SUBCOMMANDS = [
+    ('config', ['config', '--list'], True, 300),
+    ('status', ['status'], True, 300),
+    ('check', None, True, 300),
+    ('init', None, False, 500),
+    ('deploy', None, False, 500),
+    ('rollback', None, False, 500),
+    ('monitoring', None, False, 500)
+]
+
+RUN_SCRIPT = """
+import contextlib, io, json, sys
+sys.path.insert(0, {tool_dir!r})
+sys.argv = ['deploy_tool.py'] + {argv!r}
+import deploy_tool
+with contextlib.redirect_stdout(io.StringIO()):
+    deploy_tool.main()
+print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in ('boto3', 'botocore'))))
+"""
+
+IMPORT_SCRIPT = """
+import json, sys
+sys.path.insert(0, {tool_dir!r})
+import deploy_tool
+if {name!r} == 'check':
+    from utils.prerequisites import check_prerequisites
+else:
+    deploy_tool.load_command({name!r})
+print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in ('boto3', 'botocore'))))
+"""
+
+
+def create_sample_config(work_dir):
+    """Write a config like the one init produces, with caches kept inside work_dir."""
+    config = {
+        'project_name': 'startup-benchmark',
+        'github_url': 'https://github.com/example/app',
+        'github_branch': 'master',
+        'aws_region': 'ap-south-1',
+        'aws_profile': 'benchmark',
+        'cache_dir': os.path.join(work_dir, 'cache'),
+        'environments': {
+            'dev': {'bucket': 'startup-benchmark-dev'},
+            'prod': {'bucket': 'startup-benchmark-prod'}
+        },
+        'deployments': []
+    }
+    with open(os.path.join(work_dir, '.deploy-config.json'), 'w') as f:
+        json.dump(config, f, indent=2)
+
+
+def time_bare_interpreter():
+    """Time starting and stopping an interpreter that does nothing."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - started
+
+
+def run_sample(name, argv, work_dir):
+    """Start a fresh interpreter for one subcommand; return wall seconds and AWS SDK modules loaded."""
+    if argv is None:
+        script = IMPORT_SCRIPT.format(tool_dir=str(TOOL_DIR), name=name)
+    else:
+        script = RUN_SCRIPT.format(tool_dir=str(TOOL_DIR), argv=argv)
+    
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script], cwd=work_dir, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    
+    if result.returncode != 0:
+        raise Exception(f"{name} failed: {result.stderr.strip()}")
+    return elapsed, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark for deploy_tool.py subcommands')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per subcommand')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='Multiply every budget (slow CI machines)')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix='deploy_startup_')
+    create_sample_config(work_dir)
+    
+    # Bare interpreter start-up, for reference
+    baseline = statistics.median(time_bare_interpreter() for _ in range(args.runs))
+    
+    results = []
+    failures = []
+    try:
+        print(f"Python start-up baseline: {baseline * 1000:.0f} ms")
+        print(f"{'subcommand':<12} {'median':>8} {'max':>8} {'budget':>8}  AWS SDK")
+        
+        for name, argv, aws_free, budget_ms in SUBCOMMANDS:
+            samples = []
+            sdk_modules = []
+            for _ in range(args.runs):
+                elapsed, modules = run_sample(name, argv, work_dir)
+                samples.append(elapsed)
+                sdk_modules = sdk_modules or modules
+            
+            median_ms = statistics.median(samples) * 1000
+            budget_ms = budget_ms * args.budget_scale
+            print(f"{name:<12} {median_ms:6.0f}ms {max(samples) * 1000:6.0f}ms {budget_ms:6.0f}ms  "
+                  f"{'imported' if sdk_modules else 'not imported'}")
+            
+            if median_ms > budget_ms:
+                failures.append(f"{name}: {median_ms:.0f} ms is over its {budget_ms:.0f} ms budget")
+            if aws_free and sdk_modules:
+                failures.append(f"{name}: imports {', '.join(sdk_modules[:3])} but never calls AWS")
+            
+            results.append({
+                'subcommand': name,
+                'mode': 'run' if argv else 'import',
+                'median_ms': round(median_ms, 1),
+                'max_ms': round(max(samples) * 1000, 1),
+                'budget_ms': budget_ms,
+                'aws_sdk_imported': bool(sdk_modules)
+            })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python_baseline_ms': round(baseline * 1000, 1), 'runs': args.runs, 'results': results}, f, indent=2)
+    
+    if failures:
+        print("\nStart-up regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll subcommands within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,25 @@
 """Base command class."""
 
+import os
+import time
 from abc import ABC, abstractmethod
-from core.config import ConfigManager
-from core.aws_client import AWSClient
+from datetime import datetime
+from core.config import ConfigManager, get_cache_dir
+from core.artifact_cache import ArtifactCache
+from core.aws_client import AWSClient, RELEASES_PREFIX, get_s3_error_code
 from core.git_operations import GitOperations
+from core.history import DeploymentHistory
+from core.identity_cache import IdentityCache
+from utils.build import build_project, create_health_check_endpoint
+from utils.cache_control import get_cache_rules
+from utils.compression import compress_build_assets
+from utils.docker_utils import create_dockerfile_and_dockerignore
+from utils.manifest import (build_manifest, diff_manifests, hash_file, manifest_document, summarize_manifest,
+                            trusted_manifest)
+from utils.tracing import span, traced
+
+# Errors showing the bucket was deleted or re-permissioned outside the tool
+BUCKET_CHANGED_ERRORS = ('NoSuchBucket', 'AccessDenied')
 
 
 class BaseCommand(ABC):
@@ -11,17 +27,248 @@ class BaseCommand(ABC):
         self.config_manager = ConfigManager()
         self.aws_client = AWSClient(
             profile=self.config_manager.get('aws_profile', 'abhinav'),
-            region=self.config_manager.get('aws_region', 'ap-south-1')
+            region=self.config_manager.get('aws_region', 'ap-south-1'),
+            upload_workers=int(self.config_manager.get('upload_workers', 10)),
+            transfer_settings=self.config_manager.get('transfer', {}),
+            endpoint_url=self.config_manager.get('s3_endpoint_url'),
+            identity_cache=IdentityCache(
+                get_cache_dir(self.config_manager.config, 'identity'),
+                ttl=float(self.config_manager.get('identity_cache.ttl_seconds', 900))
+            ) if self.config_manager.get_bool('identity_cache.enabled', True) else None
+        )
+        self.git_ops = GitOperations(
+            clone_depth=int(self.config_manager.get('clone_depth', 1)),
+            mirror_dir=get_cache_dir(self.config_manager.config, 'git')
+            if self.config_manager.get_bool('git_mirror_cache', True) else None
+        )
+        # Deployment records used to live in .deploy-config.json; they are imported on first use
+        self.history = DeploymentHistory(
+            self.config_manager.get('history_db', '.deploy-history.db'),
+            legacy_records=lambda: self.config_manager.get('deployments', [])
         )
-        self.git_ops = GitOperations()
     
     @abstractmethod
     def execute(self, args):
         """Execute the command."""
         pass
     
+    def get_env_file_path(self, args, environment):
+        """Get the .env file for an environment: --env-file, then the environment's, then the global one."""
+        return getattr(args, 'env_file', None) or \
+            self.config_manager.get(f'environments.{environment}.env_file_path') or \
+            self.config_manager.get('env_file_path')
+    
+    def get_env_file_hash(self, env_file_path):
+        """Hash the .env file baked into a build, or None when no file is used."""
+        if env_file_path and os.path.exists(env_file_path):
+            return hash_file(env_file_path)
+        return None
+    
+    @traced()
+    def build_with_cache(self, args, project_path, commit_hash, env_file_path):
+        """Build the project, reusing a cached build of the same inputs when one exists."""
+        config = self.config_manager.config
+        build_dir = config.get('build_dir', 'build')
+        use_cache = self.config_manager.get_bool('artifact_cache.enabled', True) and \
+            not getattr(args, 'no_build_cache', False)
+        
+        if not use_cache or not commit_hash:
+            return build_project(project_path, env_file_path, config)
+        
+        cache = ArtifactCache(
+            get_cache_dir(config, 'artifacts'),
+            float(self.config_manager.get('artifact_cache.max_size_mb', 2048))
+        )
+        cache_key = ArtifactCache.compute_key(
+            commit_hash, project_path, config.get('build_command', 'npm run build'), build_dir, env_file_path
+        )
+        build_path = os.path.join(project_path, build_dir)
+        
+        with span('artifact_cache_restore', key=cache_key[:12]) as restore_span:
+            restored = cache.restore(cache_key, build_path)
+            restore_span.set(hit=restored)
+        if restored:
+            print(f"Using cached build for commit {commit_hash[:8]} (skipped install and build)")
+            return build_path
+        
+        build_path = build_project(project_path, env_file_path, config)
+        try:
+            with span('artifact_cache_store', key=cache_key[:12]):
+                cache.store(cache_key, build_path, commit_hash)
+        except Exception as e:
+            print(f"Warning: Could not cache build: {e}")
+        return build_path
+    
+    def get_cdn_url(self, environment):
+        """Get the CDN URL serving an environment's bucket, if one is configured."""
+        return self.config_manager.get(f'environments.{environment}.cdn_url', self.config_manager.get('cdn_url'))
+    
+    def compress_assets(self, build_path, args, environment):
+        """Run the optional asset compression stage and return encodings by S3 path."""
+        algorithm = getattr(args, 'compress', None)
+        if not algorithm and self.config_manager.get_bool('asset_compression.enabled', False):
+            algorithm = self.config_manager.get('asset_compression.algorithm', 'gzip')
+        
+        if not algorithm:
+            return {}
+        
+        # Browsers only accept br over HTTPS, and S3 website endpoints are HTTP-only
+        if algorithm == 'br' and not (self.get_cdn_url(environment) or '').startswith('https://'):
+            print(f"Warning: No HTTPS cdn_url configured for {environment}, compressing with GZIP instead of Brotli")
+            algorithm = 'gzip'
+        
+        return compress_build_assets(
+            build_path,
+            algorithm,
+            min_size=int(self.config_manager.get('asset_compression.min_size', 1024)),
+            min_savings=float(self.config_manager.get('asset_compression.min_savings', 10))
+        )
+    
+    def get_deploy_strategy(self, environment):
+        """Get the deploy strategy ('sync' or 'release') for an environment."""
+        return self.config_manager.get(f'environments.{environment}.deploy_strategy',
+                                       self.config_manager.get('deploy_strategy', 'sync'))
+    
+    @traced()
+    def provision_bucket(self, environment, bucket_name):
+        """Create and configure the environment's bucket and return its website URL."""
+        # In trust mode a recently verified fingerprint skips every bucket API call
+        state = self.config_manager.get('bucket_state', {}).get(bucket_name, {})
+        trusted_fingerprint = None
+        if self.config_manager.get('bucket_provisioning.check', 'verify') == 'trust':
+            trust_seconds = float(self.config_manager.get('bucket_provisioning.trust_hours', 24)) * 3600
+            if time.time() - state.get('verified_at', 0) < trust_seconds:
+                trusted_fingerprint = state.get('fingerprint')
+        
+        website_url, fingerprint = self.aws_client.ensure_s3_bucket(
+            bucket_name, trusted_fingerprint=trusted_fingerprint
+        )
+        
+        if fingerprint and fingerprint != trusted_fingerprint:
+            self.config_manager.update({bucket_name: {
+                'fingerprint': fingerprint,
+                'region': self.aws_client.aws_region,
+                'verified_at': time.time()
+            }}, key='bucket_state')
+        return website_url
+    
+    def forget_bucket_state(self, bucket_name):
+        """Drop a bucket's verified fingerprint so the next deploy checks the bucket again."""
+        if self.config_manager.get('bucket_state', {}).get(bucket_name):
+            self.config_manager.update({bucket_name: {}}, key='bucket_state')
+    
+    @traced()
+    def publish_build(self, args, environment, bucket_name, build_path, project_path, commit_hash, website_url=None):
+        """Finish a build and publish it to the environment's bucket (provisioning it unless website_url is given)."""
+        try:
+            return self._publish_build(args, environment, bucket_name, build_path, project_path, commit_hash,
+                                       website_url)
+        except Exception as e:
+            if get_s3_error_code(e) in BUCKET_CHANGED_ERRORS:
+                # A trusted fingerprint would otherwise skip the checks that repair the bucket
+                print(f"Bucket {bucket_name} changed outside the tool; it will be checked on the next deploy")
+                self.forget_bucket_state(bucket_name)
+            raise
+    
+    def _publish_build(self, args, environment, bucket_name, build_path, project_path, commit_hash, website_url):
+        """Publish a finished build to the environment's bucket."""
+        if self.config_manager.get('create_health_check', True):
+            create_health_check_endpoint(build_path)
+        
+        if self.config_manager.get('create_dockerfile', True):
+            create_dockerfile_and_dockerignore(build_path, project_path, 
+                                             self.config_manager.get('project_type', 'react'))
+        
+        with span('compress_assets'):
+            content_encodings = self.compress_assets(build_path, args, environment)
+        
+        release_mode = self.get_deploy_strategy(environment) == 'release'
+        if website_url is None:
+            website_url = self.provision_bucket(environment, bucket_name)
+        
+        # Delta sync: only PUT files whose content or headers changed
+        cache_rules = get_cache_rules(self.config_manager.config, environment)
+        with span('build_manifest') as manifest_span:
+            manifest = build_manifest(build_path, content_encodings, cache_rules)
+            manifest_span.set(files=len(manifest))
+        full_upload = getattr(args, 'full_upload', False) or not self.config_manager.get_bool('delta_sync', True)
+        previous_manifest, previous_release = {}, None
+        if not full_upload:
+            # The manifest lives in the bucket so deploys from any machine see the same one
+            previous_manifest, previous_release = trusted_manifest(
+                self.aws_client.load_manifest(bucket_name, environment), bucket_name, self.history.latest(environment)
+            )
+        
+        if not release_mode:
+            # Files held under a release prefix are not at the bucket root
+            changed_files = diff_manifests({} if previous_release else previous_manifest, manifest)
+            print(f"Delta sync: {len(changed_files)} of {len(manifest)} files new or changed")
+            
+            # Removed first so an interrupted upload leaves no manifest to trust
+            self.aws_client.delete_manifest(bucket_name, environment)
+            self.aws_client.upload_to_s3(build_path, bucket_name, changed_files)
+            self._upload_docker_files(project_path, bucket_name)
+            self.aws_client.save_manifest(bucket_name, environment,
+                                          manifest_document(bucket_name, manifest, commit_hash))
+            
+            return {'url': website_url, 'release': None, 'manifest': summarize_manifest(manifest, changed_files)}
+        
+        release = f"{RELEASES_PREFIX}{commit_hash[:8]}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if previous_release and not self.aws_client.release_exists(bucket_name, previous_release):
+            previous_manifest, previous_release = {}, None
+        changed_files = diff_manifests(previous_manifest if previous_release else {}, manifest)
+        unchanged = [path for path in manifest if path not in changed_files]
+        print(f"Release {release}: {len(changed_files)} files to upload, {len(unchanged)} to copy from {previous_release}")
+        
+        # Unchanged files are copied server-side from the previous release
+        if unchanged:
+            self.aws_client.copy_objects(bucket_name, [
+                (f"{previous_release}/{path}", f"{release}/{path}", manifest[path]['size'])
+                for path in unchanged
+            ])
+        self.aws_client.upload_to_s3(build_path, bucket_name, changed_files, key_prefix=f"{release}/")
+        self._upload_docker_files(project_path, bucket_name, f"{release}/")
+        
+        self.aws_client.activate_release(bucket_name, release)
+        self.aws_client.save_manifest(bucket_name, environment,
+                                      manifest_document(bucket_name, manifest, commit_hash, release))
+        
+        # Older releases stay available for instant rollback until they fall out of retention
+        release_retention = int(self.config_manager.get('release_retention', 10))
+        if release_retention > 0:
+            try:
+                self.aws_client.prune_releases(bucket_name, release_retention, release)
+            except Exception as e:
+                print(f"Warning: Could not prune old releases: {e}")
+        
+        return {
+            'url': website_url,
+            'release': release,
+            'manifest': summarize_manifest(manifest, changed_files, len(unchanged))
+        }
+    
+    def _upload_docker_files(self, project_path, bucket_name, key_prefix=''):
+        """Upload Docker files to S3."""
+        s3 = self.aws_client.get_s3_client()
+        
+        for file_name in ['Dockerfile', '.dockerignore']:
+            file_path = os.path.join(project_path, file_name)
+            if not os.path.exists(file_path):
+                continue
+            
+            try:
+                s3.upload_file(
+                    file_path,
+                    bucket_name,
+                    key_prefix + file_name,
+                    ExtraArgs={'ContentType': 'text/plain'}
+                )
+                print(f"  Uploaded: {file_name}")
+            except Exception as e:
+                print(f"Warning: Could not upload {file_name}: {e}")
+    
     def cleanup(self):
         """Cleanup resources."""
-        if hasattr(self.git_ops, 'temp_dir') and self.git_ops.temp_dir:
+        if self.git_ops.temp_dirs:
             self.git_ops.cleanup_temp_dir()
  
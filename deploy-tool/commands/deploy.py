@@ -1,93 +1,104 @@
 """Deploy command implementation."""
 
+import os
+import shutil
 from datetime import datetime
+from functools import partial
 from commands.base import BaseCommand
+from utils.pipeline import Pipeline, require
 from utils.prerequisites import check_prerequisites_bool
-from utils.build import build_project, create_health_check_endpoint
-from utils.docker_utils import create_dockerfile_and_dockerignore
+from utils.tracing import trace
 
 
 class DeployCommand(BaseCommand):
     def execute(self, args):
         """Deploy from GitHub."""
-        print(f"Deploying from GitHub to {args.env}...")
-        
-        if not check_prerequisites_bool():
+        # Every config change made during the deploy is written in one locked save
+        with self.config_manager.batch(), trace('deploy', environment=args.env):
+            return self._deploy(args)
+    
+    def _deploy(self, args):
+        """Deploy to one environment, or hand several over to deploy_environments."""
+        environments = self.get_target_environments(args)
+        if not environments:
+            print("No environments to deploy. Use --env dev,staging,prod or configure environments first")
             return False
+        if len(environments) > 1:
+            return self.deploy_environments(args, environments)
+        args.env = environments[0]
+        
+        print(f"Deploying from GitHub to {args.env}...")
         
         github_url = args.github_url or self.config_manager.get('github_url')
         if not github_url:
             print("No GitHub URL found. Please run 'init' first or provide --github-url")
             return False
         
-        if not self.aws_client.check_sso_login():
+        env_config = self.config_manager.get(f'environments.{args.env}')
+        if not env_config:
+            print(f"Environment '{args.env}' not configured")
             return False
         
+        bucket_name = env_config['bucket']
+        branch = self.config_manager.get('github_branch', 'master')
+        
+        # Skip everything when the branch head and .env are already live
+        if not (hasattr(args, 'force') and args.force):
+            live_deployment = self._find_live_deployment(
+                args.env, github_url, branch, bucket_name, self.get_env_file_path(args, args.env)
+            )
+            if live_deployment:
+                print(f"Nothing to deploy: {branch} is at {live_deployment['commit_short']}, "
+                      f"live on {args.env} since {live_deployment['timestamp'][:19]}")
+                print(f"Website URL: {live_deployment['url']}")
+                print("Use --force to deploy anyway")
+                return True
+        
         # Handle flags
         if hasattr(args, 'no_docker') and args.no_docker:
             self.config_manager.set('create_dockerfile', False)
         if hasattr(args, 'no_health_check') and args.no_health_check:
             self.config_manager.set('create_health_check', False)
+        if hasattr(args, 'upload_workers') and args.upload_workers:
+            self.aws_client.set_upload_workers(args.upload_workers)
         
-        # Handle env file
-        env_file_path = args.env_file
-        if not env_file_path and not self.config_manager.get('env_file_path'):
+        # Handle env file (prompted before any stage starts)
+        env_file_path = self.get_env_file_path(args, args.env)
+        if not env_file_path:
             response = input("Do you want to use a .env file? (y/n): ").lower().strip()
             if response in ['y', 'yes']:
                 env_file_path = input("Enter the full path to your .env file: ").strip()
                 if env_file_path:
                     self.config_manager.set('env_file_path', env_file_path)
-        elif not env_file_path:
-            env_file_path = self.config_manager.get('env_file_path')
         
-        env_config = self.config_manager.get(f'environments.{args.env}')
-        if not env_config:
-            print(f"Environment '{args.env}' not configured")
-            return False
-        
-        bucket_name = env_config['bucket']
-        branch = self.config_manager.get('github_branch', 'master')
+        # Bucket provisioning only needs credentials, so it runs while the clone and build do
+        pipeline = Pipeline()
+        pipeline.add_stage('prerequisites', require(check_prerequisites_bool, "Prerequisites check failed"))
+        pipeline.add_stage('sso', self._check_aws_access)
+        pipeline.add_stage('clone', lambda: self.git_ops.clone_repository(github_url, branch))
+        pipeline.add_stage('build', lambda: self.build_with_cache(args, *pipeline.result('clone'), env_file_path),
+                           ['prerequisites', 'clone'])
+        pipeline.add_stage('bucket', lambda: self.provision_bucket(args.env, bucket_name), ['prerequisites', 'sso'])
+        pipeline.add_stage('publish', lambda: self.publish_build(
+            args, args.env, bucket_name, pipeline.result('build'), *pipeline.result('clone'),
+            website_url=pipeline.result('bucket')
+        ), ['build', 'bucket'])
         
         try:
-            project_path, actual_commit = self.git_ops.clone_repository(github_url, branch)
-            build_path = build_project(project_path, env_file_path, self.config_manager.config)
-            
-            # Create health check if enabled
-            if self.config_manager.get('create_health_check', True):
-                create_health_check_endpoint(build_path)
-            
-            # Create Docker files if enabled
-            if self.config_manager.get('create_dockerfile', True):
-                create_dockerfile_and_dockerignore(build_path, project_path, 
-                                                 self.config_manager.get('project_type', 'react'))
+            if not pipeline.run():
+                pipeline.print_timings()
+                print(f"Deployment failed: {pipeline.failed_stages()[0].error}")
+                return False
             
-            website_url = self.aws_client.create_s3_bucket(bucket_name)
-            self.aws_client.upload_to_s3(build_path, bucket_name)
-            
-            # Upload Docker files if they exist
-            self._upload_docker_files(build_path, project_path, bucket_name)
+            project_path, actual_commit = pipeline.result('clone')
+            published = pipeline.result('publish')
+            website_url = published['url']
             
             # Save deployment record
-            deployment = {
-                'timestamp': datetime.now().isoformat(),
-                'environment': args.env,
-                'bucket': bucket_name,
-                'url': website_url,
-                'region': self.aws_client.aws_region,
-                'profile': self.aws_client.aws_profile,
-                'github_url': github_url,
-                'github_branch': branch,
-                'commit_hash': actual_commit,
-                'commit_short': actual_commit[:8] if actual_commit else None,
-                'env_file_used': env_file_path is not None,
-                'docker_files_created': self.config_manager.get('create_dockerfile', True),
-                'health_check_created': self.config_manager.get('create_health_check', True),
-                'status': 'success'
-            }
+            deployment = self._deployment_record(args.env, bucket_name, github_url, branch,
+                                                 actual_commit, env_file_path, published, pipeline.timings())
             
-            deployments = self.config_manager.get('deployments', [])
-            deployments.insert(0, deployment)
-            self.config_manager.set('deployments', deployments[:10])
+            self.history.add(deployment)
             
             print("Deployment successful!")
             print("=" * 50)
@@ -96,6 +107,8 @@ class DeployCommand(BaseCommand):
             print(f"Repository: {github_url}")
             print(f"Branch: {branch}")
             print(f"Commit: {actual_commit[:8] if actual_commit else 'N/A'}")
+            if published['release']:
+                print(f"Release: {published['release']}")
             print(f"Region: {self.aws_client.aws_region}")
             print(f"Profile: {self.aws_client.aws_profile}")
             
@@ -120,6 +133,8 @@ class DeployCommand(BaseCommand):
                 print("   Get dashboard + email alerts with compression")
                 print("   GZIP bypasses AWS 16KB limit!")
             
+            print("=" * 50)
+            pipeline.print_timings()
             return True
             
         except Exception as e:
@@ -128,36 +143,223 @@ class DeployCommand(BaseCommand):
         finally:
             self.cleanup()
     
-    def _upload_docker_files(self, build_path, project_path, bucket_name):
-        """Upload Docker files to S3."""
-        import os
-        
-        s3 = self.aws_client.get_s3_client()
-        
-        dockerfile_path = os.path.join(project_path, 'Dockerfile')
-        dockerignore_path = os.path.join(project_path, '.dockerignore')
-        
-        if os.path.exists(dockerfile_path):
-            try:
-                s3.upload_file(
-                    dockerfile_path,
-                    bucket_name,
-                    'Dockerfile',
-                    ExtraArgs={'ContentType': 'text/plain'}
-                )
-                print("  Uploaded: Dockerfile")
-            except Exception as e:
-                print(f"Warning: Could not upload Dockerfile: {e}")
-        
-        if os.path.exists(dockerignore_path):
-            try:
-                s3.upload_file(
-                    dockerignore_path,
-                    bucket_name,
-                    '.dockerignore',
-                    ExtraArgs={'ContentType': 'text/plain'}
-                )
-                print("  Uploaded: .dockerignore")
-            except Exception as e:
-                print(f"Warning: Could not upload .dockerignore: {e}")
- 
+    def _find_live_deployment(self, environment, github_url, branch, bucket_name, env_file_path):
+        """Return the live deployment when it already matches the branch head and .env file."""
+        live = self.history.latest(environment)
+        
+        if not live or live.get('bucket') != bucket_name or live.get('github_url') != github_url:
+            return None
+        if not live.get('commit_hash') or live.get('deploy_strategy', 'sync') != self.get_deploy_strategy(environment):
+            return None
+        
+        # Records written before env_file_hash existed can only be matched when no .env was used
+        env_file_hash = self.get_env_file_hash(env_file_path)
+        if live.get('env_file_hash', 'unknown' if live.get('env_file_used') else None) != env_file_hash:
+            return None
+        
+        remote_commit = self.git_ops.resolve_remote_commit(github_url, branch)
+        if remote_commit != live['commit_hash']:
+            return None
+        return live
+    
+    def get_target_environments(self, args):
+        """Get the environments to deploy from --all-envs or a comma-separated --env."""
+        if getattr(args, 'all_envs', False):
+            return list(self.config_manager.get('environments', {}))
+        return [environment.strip() for environment in args.env.split(',') if environment.strip()]
+    
+    def _deployment_record(self, environment, bucket_name, github_url, branch, commit_hash, env_file_path, published,
+                           phase_timings):
+        """Build the deployment record saved to the history."""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'environment': environment,
+            'bucket': bucket_name,
+            'url': published['url'],
+            'region': self.aws_client.aws_region,
+            'profile': self.aws_client.aws_profile,
+            'github_url': github_url,
+            'github_branch': branch,
+            'commit_hash': commit_hash,
+            'commit_short': commit_hash[:8] if commit_hash else None,
+            'env_file_used': env_file_path is not None,
+            'env_file_hash': self.get_env_file_hash(env_file_path),
+            'docker_files_created': self.config_manager.get('create_dockerfile', True),
+            'health_check_created': self.config_manager.get('create_health_check', True),
+            'deploy_strategy': self.get_deploy_strategy(environment),
+            'release': published['release'],
+            'manifest': published['manifest'],
+            'phase_timings': phase_timings,
+            'status': 'success'
+        }
+    
+    def deploy_environments(self, args, environments):
+        """Deploy one commit to several environments, building once per distinct .env file."""
+        print(f"Deploying from GitHub to {', '.join(environments)}...")
+        
+        github_url = args.github_url or self.config_manager.get('github_url')
+        if not github_url:
+            print("No GitHub URL found. Please run 'init' first or provide --github-url")
+            return False
+        
+        branch = self.config_manager.get('github_branch', 'master')
+        targets = {}
+        for environment in environments:
+            env_config = self.config_manager.get(f'environments.{environment}')
+            if not env_config:
+                print(f"Environment '{environment}' not configured")
+                return False
+            targets[environment] = {
+                'bucket': env_config['bucket'],
+                'env_file': self.get_env_file_path(args, environment)
+            }
+        
+        results = {}
+        if not (hasattr(args, 'force') and args.force):
+            for environment, target in list(targets.items()):
+                live_deployment = self._find_live_deployment(environment, github_url, branch,
+                                                             target['bucket'], target['env_file'])
+                if live_deployment:
+                    results[environment] = {'status': 'unchanged', 'commit': live_deployment['commit_short'],
+                                            'url': live_deployment['url']}
+                    del targets[environment]
+        
+        if not targets:
+            self._print_summary(environments, results)
+            return True
+        
+        # Handle flags
+        if hasattr(args, 'no_docker') and args.no_docker:
+            self.config_manager.set('create_dockerfile', False)
+        if hasattr(args, 'no_health_check') and args.no_health_check:
+            self.config_manager.set('create_health_check', False)
+        if hasattr(args, 'upload_workers') and args.upload_workers:
+            self.aws_client.set_upload_workers(args.upload_workers)
+        
+        # Environments whose .env files are identical share one build
+        variants = {}
+        for environment, target in targets.items():
+            variants.setdefault(self.get_env_file_hash(target['env_file']), []).append(environment)
+        print(f"Building {len(variants)} variant(s) for {len(targets)} environment(s)...")
+        
+        pipeline = Pipeline(max_workers=4 + 2 * len(targets))
+        pipeline.add_stage('prerequisites', require(check_prerequisites_bool, "Prerequisites check failed"))
+        pipeline.add_stage('sso', self._check_aws_access)
+        pipeline.add_stage('clone', lambda: self.git_ops.clone_repository(github_url, branch))
+        # Copy the pristine checkout for every extra variant before any build writes to it
+        pipeline.add_stage('checkouts', lambda: [pipeline.result('clone')[0]] + [
+            self._copy_tree(pipeline.result('clone')[0]) for _ in range(len(variants) - 1)
+        ], ['clone'])
+        
+        for index, variant_envs in enumerate(variants.values()):
+            build_stage = f"build:{'+'.join(variant_envs)}"
+            pipeline.add_stage(build_stage, partial(
+                self._build_variant, pipeline, args, index, targets[variant_envs[0]]['env_file']
+            ), ['prerequisites', 'checkouts'])
+            
+            for environment in variant_envs:
+                bucket_name = targets[environment]['bucket']
+                pipeline.add_stage(f'bucket:{environment}', partial(self.provision_bucket, environment, bucket_name),
+                                   ['prerequisites', 'sso'])
+                pipeline.add_stage(f'publish:{environment}', partial(
+                    self._publish_environment, pipeline, args, environment, bucket_name, build_stage
+                ), [build_stage, f'bucket:{environment}'])
+        
+        try:
+            pipeline.run()
+            
+            records = []
+            for environment in environments:
+                if environment not in targets:
+                    continue
+                
+                publish_stage = pipeline.stages[f'publish:{environment}']
+                if publish_stage.status != 'done':
+                    results[environment] = {'status': 'failed',
+                                            'error': self._stage_error(pipeline, publish_stage.name)}
+                    continue
+                
+                published = publish_stage.result
+                actual_commit = pipeline.result('clone')[1]
+                records.append(self._deployment_record(
+                    environment, targets[environment]['bucket'], github_url, branch,
+                    actual_commit, targets[environment]['env_file'], published,
+                    self._environment_timings(pipeline, environment)
+                ))
+                results[environment] = {'status': 'success', 'commit': actual_commit[:8],
+                                        'url': published['url'], 'release': published['release']}
+            
+            for record in records:
+                self.history.add(record)
+            
+            self._print_summary(environments, results)
+            pipeline.print_timings()
+            return all(result['status'] != 'failed' for result in results.values())
+            
+        except Exception as e:
+            print(f"Deployment failed: {e}")
+            return False
+        finally:
+            self.cleanup()
+    
+    def _check_aws_access(self):
+        """Check the SSO login and create the S3 client shared by the stages that follow."""
+        if not self.aws_client.check_sso_login():
+            raise Exception("AWS SSO login is not valid")
+        # boto3 sessions are not thread-safe, so the client is created before stages fan out
+        return self.aws_client.get_s3_client()
+    
+    def _build_variant(self, pipeline, args, index, env_file_path):
+        """Build one .env variant in its own copy of the checkout."""
+        project_path = pipeline.result('checkouts')[index]
+        return self.build_with_cache(args, project_path, pipeline.result('clone')[1], env_file_path)
+    
+    def _publish_environment(self, pipeline, args, environment, bucket_name, build_stage):
+        """Publish a variant's build to one environment's bucket."""
+        # Publishing writes health checks, Docker files and compressed assets, so each
+        # environment publishes from its own copy of the build
+        build_path = self._copy_tree(pipeline.result(build_stage))
+        return self.publish_build(args, environment, bucket_name, build_path, os.path.dirname(build_path),
+                                  pipeline.result('clone')[1], website_url=pipeline.result(f'bucket:{environment}'))
+    
+    def _environment_timings(self, pipeline, environment):
+        """Get the timings of the shared stages and of the stages run for one environment."""
+        return {name: seconds for name, seconds in pipeline.timings().items()
+                if ':' not in name or environment in name.split(':', 1)[1].split('+')}
+    
+    def _stage_error(self, pipeline, name):
+        """Describe the failed stage that stopped a stage from running."""
+        stage = pipeline.stages[name]
+        if stage.status == 'failed':
+            return f"{name} failed: {stage.error}"
+        for dependency in stage.depends_on:
+            error = self._stage_error(pipeline, dependency)
+            if error:
+                return error
+        return None
+    
+    def _copy_tree(self, source_path):
+        """Copy a checkout or build into a new temp dir, keeping its directory name."""
+        target_path = os.path.join(self.git_ops.create_temp_dir(), os.path.basename(source_path))
+        shutil.copytree(source_path, target_path)
+        return target_path
+    
+    def _print_summary(self, environments, results):
+        """Print one line per environment with its deployment status."""
+        print("=" * 50)
+        print("Deployment summary:")
+        for environment in environments:
+            result = results.get(environment, {'status': 'failed', 'error': 'not deployed'})
+            if result['status'] == 'failed':
+                print(f"  {environment:<12} FAILED     {result['error']}")
+            else:
+                release = f"  ({result['release']})" if result.get('release') else ''
+                print(f"  {environment:<12} {result['status'].upper():<10} {result['commit']}  {result['url']}{release}")
+        
+        failed = [environment for environment in environments
+                  if results.get(environment, {}).get('status', 'failed') == 'failed']
+        print("=" * 50)
+        if failed:
+            print(f"{len(failed)} of {len(environments)} environment(s) failed: {', '.join(failed)}")
+        else:
+            print(f"All {len(environments)} environment(s) deployed or up to date")
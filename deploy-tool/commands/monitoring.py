@@ -1,14 +1,20 @@
 """Monitoring command implementation."""
 
-import time
 from datetime import datetime
 from commands.base import BaseCommand
 from utils.compression import create_compressed_monitoring_user_data
+from utils.readiness import wait_until_ready
+from utils.tracing import span, trace, traced
 
 
 class MonitoringCommand(BaseCommand):
     def execute(self, args):
         """Handle monitoring commands."""
+        with trace(f"monitoring {args.subcommand or 'help'}"):
+            return self._run_subcommand(args)
+    
+    def _run_subcommand(self, args):
+        """Run the requested monitoring subcommand."""
         if args.subcommand == 'init':
             self._init_monitoring()
         elif args.subcommand == 'status':
@@ -29,8 +35,9 @@ class MonitoringCommand(BaseCommand):
         """Initialize monitoring with GZIP compression."""
         print("Setting up monitoring with GZIP compression...")
         
-        if not self.aws_client.check_sso_login():
-            return False
+        with span('sso', 'phase'):
+            if not self.aws_client.check_sso_login():
+                return False
         
         if not self.config_manager.get('project_name'):
             print("Project not initialized. Run 'init' first.")
@@ -44,15 +51,7 @@ class MonitoringCommand(BaseCommand):
             return True
         
         # Get targets from deployments
-        targets = []
-        deployments = self.config_manager.get('deployments', [])
-        
-        seen_urls = set()
-        for deployment in deployments:
-            if deployment.get('status') == 'success' and deployment.get('url'):
-                if deployment['url'] not in seen_urls:
-                    targets.append(deployment['url'])
-                    seen_urls.add(deployment['url'])
+        targets = self.history.urls()
         
         if not targets:
             print("No websites found to monitor!")
@@ -86,16 +85,15 @@ class MonitoringCommand(BaseCommand):
         
         try:
             print("\nCREATING GZIP MONITORING INSTANCE...")
-            instance_id, public_ip = self._create_monitoring_instance(targets, alert_email, gmail_app_password)
-            
-            print("WAITING FOR SERVICES TO START (3-4 minutes for full setup)...")
-            time.sleep(240)  # 4 minutes
+            with span('create_instance', 'phase'):
+                instance_id, public_ip = self._create_monitoring_instance(targets, alert_email, gmail_app_password)
             
             grafana_url = f"http://{public_ip}:3000"
             prometheus_url = f"http://{public_ip}:9090"
             
             monitoring_config = {
                 'enabled': True,
+                'ready': False,
                 'instance_id': instance_id,
                 'public_ip': public_ip,
                 'grafana_url': grafana_url,
@@ -110,8 +108,27 @@ class MonitoringCommand(BaseCommand):
                 }
             }
             
+            # Saved before waiting so a timed-out or interrupted setup can still be destroyed
             self.config_manager.set('monitoring', monitoring_config)
             
+            timeout = float(self.config_manager.get('monitoring_readiness.timeout_seconds', 600))
+            max_interval = float(self.config_manager.get('monitoring_readiness.max_interval_seconds', 30))
+            
+            print(f"WAITING FOR SERVICES TO START (up to {timeout:.0f}s)...")
+            with span('wait_for_services', 'phase'):
+                _, pending = wait_until_ready({
+                    'Prometheus': f"{prometheus_url}/-/ready",
+                    'Grafana': f"{grafana_url}/api/health"
+                }, timeout=timeout, max_delay=max_interval)
+            
+            if pending:
+                print(f"GZIP MONITORING SETUP TIMED OUT: {', '.join(pending)} not ready after {timeout:.0f}s")
+                print(f"Instance {instance_id} is still running; check it at {grafana_url}")
+                print("Remove it with: python deploy_tool.py monitoring destroy")
+                return False
+            
+            self.config_manager.set('monitoring.ready', True)
+            
             print("\nGZIP MONITORING SETUP COMPLETE!")
             print("=" * 60)
             print(f"GRAFANA DASHBOARD: {grafana_url}")
@@ -161,6 +178,8 @@ class MonitoringCommand(BaseCommand):
             return
         
         print(f"Status: ACTIVE (GZIP Compressed)")
+        if not monitoring_config.get('ready', True):
+            print("Services: NOT READY (setup timed out waiting for Prometheus/Grafana)")
         print(f"Instance: {monitoring_config.get('instance_id', 'N/A')}")
         print(f"IP Address: {monitoring_config.get('public_ip', 'N/A')}")
         print(f"Created: {monitoring_config.get('created_at', 'N/A')[:19]}")
@@ -221,8 +240,9 @@ class MonitoringCommand(BaseCommand):
             return False
         
         try:
-            ec2 = self.aws_client.get_ec2_client()
-            ec2.terminate_instances(InstanceIds=[instance_id])
+            with span('terminate_instance', 'phase'):
+                ec2 = self.aws_client.get_ec2_client()
+                ec2.terminate_instances(InstanceIds=[instance_id])
             print(f"Instance {instance_id} terminated")
             
             self.config_manager.set('monitoring', {
@@ -254,15 +274,7 @@ class MonitoringCommand(BaseCommand):
             return False
         
         # Get current targets from deployments
-        targets = []
-        deployments = self.config_manager.get('deployments', [])
-        
-        seen_urls = set()
-        for deployment in deployments:
-            if deployment.get('status') == 'success' and deployment.get('url'):
-                if deployment['url'] not in seen_urls:
-                    targets.append(deployment['url'])
-                    seen_urls.add(deployment['url'])
+        targets = self.history.urls()
         
         if not targets:
             print("No websites to monitor")
@@ -316,7 +328,8 @@ class MonitoringCommand(BaseCommand):
         ami_id = self._get_latest_amazon_linux_ami()
         
         # Create compressed user data
-        user_data = create_compressed_monitoring_user_data(targets, alert_email, gmail_app_password)
+        with span('compress_user_data'):
+            user_data = create_compressed_monitoring_user_data(targets, alert_email, gmail_app_password)
         
         instance_name = f"{self.config_manager.get('project_name', 'deploy')}-monitoring"
         
@@ -343,8 +356,9 @@ class MonitoringCommand(BaseCommand):
         
         # Wait for running state
         print("Waiting for instance to be running...")
-        waiter = ec2.get_waiter('instance_running')
-        waiter.wait(InstanceIds=[instance_id])
+        with span('wait_instance_running'):
+            waiter = ec2.get_waiter('instance_running')
+            waiter.wait(InstanceIds=[instance_id])
         
         response = ec2.describe_instances(InstanceIds=[instance_id])
         instance = response['Reservations'][0]['Instances'][0]
@@ -353,6 +367,7 @@ class MonitoringCommand(BaseCommand):
         print(f"Instance running at: {public_ip}")
         return instance_id, public_ip
     
+    @traced()
     def _create_security_group(self, sg_name):
         """Create security group for monitoring."""
         ec2 = self.aws_client.get_ec2_client()
@@ -390,6 +405,7 @@ class MonitoringCommand(BaseCommand):
             print(f"Error creating security group: {e}")
             raise
     
+    @traced()
     def _get_latest_amazon_linux_ami(self):
         """Get latest Amazon Linux AMI."""
         ec2 = self.aws_client.get_ec2_client()
@@ -2,43 +2,61 @@
 
 from datetime import datetime
 from commands.base import BaseCommand
-from utils.build import build_project, create_health_check_endpoint
-from utils.docker_utils import create_dockerfile_and_dockerignore
+from core.aws_client import BACKUPS_PREFIX
+from utils.manifest import manifest_document
+from utils.tracing import phase_timings, span, trace
+
+ROLLBACK_CHOICES = 10
 
 
 class RollbackCommand(BaseCommand):
     def execute(self, args):
         """Rollback deployment."""
+        # Every config change made during the rollback is written in one locked save
+        with self.config_manager.batch(), trace('rollback', environment=args.env) as command_span:
+            return self._rollback(args, command_span)
+    
+    def _rollback(self, args, command_span):
+        """Select a previous deployment and restore it."""
         print(f"Rolling back {args.env} environment...")
         
-        if not self.aws_client.check_sso_login():
-            return False
+        with span('sso', 'phase'):
+            if not self.aws_client.check_sso_login():
+                return False
+        
+        if hasattr(args, 'upload_workers') and args.upload_workers:
+            self.aws_client.set_upload_workers(args.upload_workers)
         
-        deployments = self.config_manager.get('deployments', [])
-        env_deployments = [d for d in deployments if d['environment'] == args.env and d['status'] == 'success']
+        # The newest successful deployment is live; every older one is a rollback target
+        current_deployment = self.history.latest(args.env)
+        available = self.history.count(environment=args.env, status='success') - 1
         
-        if len(env_deployments) < 2:
+        if not current_deployment or available < 1:
             print(f"No previous {args.env} deployment to rollback to")
             return False
         
         deployment_index = args.deployment
         if deployment_index is None:
+            choices = self.history.query(environment=args.env, status='success', limit=ROLLBACK_CHOICES, offset=1)
             print(f"\nAvailable deployments for {args.env}:")
-            for i, deployment in enumerate(env_deployments[1:], 1):
+            for i, deployment in enumerate(choices, 1):
                 print(f"  {i}. {deployment['timestamp'][:19]} - Commit: {deployment.get('commit_short', 'N/A')}")
+            if available > len(choices):
+                print(f"  ... {available - len(choices)} older deployment(s), select one with --deployment N")
             
             try:
-                choice = input(f"\nSelect deployment to rollback to (1-{len(env_deployments)-1}): ").strip()
+                choice = input(f"\nSelect deployment to rollback to (1-{available}): ").strip()
                 deployment_index = int(choice)
-                if deployment_index < 1 or deployment_index >= len(env_deployments):
-                    print("Invalid selection")
-                    return False
             except ValueError:
                 print("Invalid input")
                 return False
         
-        target_deployment = env_deployments[deployment_index]
-        current_deployment = env_deployments[0]
+        if deployment_index < 1 or deployment_index > available:
+            print("Invalid selection")
+            return False
+        
+        target_deployment = self.history.query(environment=args.env, status='success',
+                                               limit=1, offset=deployment_index)[0]
         
         print(f"\nRollback Plan:")
         print(f"  Current:  {current_deployment['timestamp'][:19]} - {current_deployment.get('commit_short', 'N/A')}")
@@ -53,30 +71,56 @@ class RollbackCommand(BaseCommand):
             github_url = target_deployment.get('github_url', self.config_manager.get('github_url'))
             commit_hash = target_deployment.get('commit_hash')
             bucket_name = target_deployment.get('bucket')
-            env_file_path = self.config_manager.get('env_file_path') if target_deployment.get('env_file_used') else None
+            env_file_path = self.get_env_file_path(args, args.env) if target_deployment.get('env_file_used') else None
             
-            if not github_url or not commit_hash:
-                print("Missing repository URL or commit hash")
-                return False
+            release_mode = self.get_deploy_strategy(args.env) == 'release'
+            target_release = target_deployment.get('release')
+            backup_prefix = None
             
-            # Create backup and clear current deployment
-            backup_prefix = f"rollback_backups/{args.env}"
-            self.aws_client.backup_current_deployment(bucket_name, backup_prefix)
-            self.aws_client.clear_s3_bucket(bucket_name)
-            
-            print(f"\nDeploying commit {commit_hash[:8]}...")
-            project_path, actual_commit = self.git_ops.clone_repository(github_url, None, commit_hash)
-            build_path = build_project(project_path, env_file_path, self.config_manager.config)
-            
-            if self.config_manager.get('create_health_check', True):
-                create_health_check_endpoint(build_path)
-            
-            if self.config_manager.get('create_dockerfile', True):
-                create_dockerfile_and_dockerignore(build_path, project_path, 
-                                                 self.config_manager.get('project_type', 'react'))
-            
-            website_url = self.aws_client.create_s3_bucket(bucket_name)
-            self.aws_client.upload_to_s3(build_path, bucket_name)
+            if release_mode and target_release and self.aws_client.release_exists(bucket_name, target_release):
+                # The target release is still in the bucket: switch the pointer, no rebuild
+                print(f"\nActivating release {target_release}...")
+                with span('activate', 'phase'):
+                    self.aws_client.activate_release(bucket_name, target_release)
+                    # The release's own manifest lets the next deploy copy its unchanged files
+                    document = self.aws_client.load_release_manifest(bucket_name, target_release) or \
+                        manifest_document(bucket_name, {}, commit_hash, target_release)
+                    self.aws_client.save_manifest(bucket_name, args.env, document)
+                website_url = target_deployment.get('url')
+                actual_commit = commit_hash
+                published = {'release': target_release, 'manifest': None}
+            else:
+                if not github_url or not commit_hash:
+                    print("Missing repository URL or commit hash")
+                    return False
+                
+                if not release_mode:
+                    # Create backup and clear current deployment
+                    backup_prefix = f"{BACKUPS_PREFIX}{args.env}"
+                    with span('backup', 'phase'):
+                        backed_up = self.aws_client.backup_current_deployment(bucket_name, backup_prefix)
+                    if not backed_up:
+                        # Clearing now would leave no copy of the live site to restore
+                        print("Rollback aborted: the backup is incomplete, the live deployment was left untouched")
+                        return False
+                    with span('clear', 'phase'):
+                        # No manifest is left to trust until a new one is written after the upload
+                        self.aws_client.delete_manifest(bucket_name, args.env)
+                        cleared = self.aws_client.clear_s3_bucket(bucket_name)
+                    if not cleared:
+                        print("Rollback aborted: the bucket was only partly cleared")
+                        print(f"Restore it from the backup under s3://{bucket_name}/{backup_prefix}/ or redeploy")
+                        return False
+                
+                print(f"\nDeploying commit {commit_hash[:8]}...")
+                with span('clone', 'phase'):
+                    project_path, actual_commit = self.git_ops.clone_repository(github_url, None, commit_hash)
+                with span('build', 'phase'):
+                    build_path = self.build_with_cache(args, project_path, actual_commit, env_file_path)
+                with span('publish', 'phase'):
+                    published = self.publish_build(args, args.env, bucket_name, build_path, project_path,
+                                                   actual_commit)
+                website_url = published['url']
             
             # Save rollback record
             rollback_deployment = {
@@ -91,23 +135,29 @@ class RollbackCommand(BaseCommand):
                 'commit_hash': actual_commit,
                 'commit_short': actual_commit[:8] if actual_commit else None,
                 'env_file_used': env_file_path is not None,
+                'env_file_hash': self.get_env_file_hash(env_file_path),
                 'docker_files_created': self.config_manager.get('create_dockerfile', True),
                 'health_check_created': self.config_manager.get('create_health_check', True),
+                'deploy_strategy': self.get_deploy_strategy(args.env),
+                'release': published['release'],
+                'manifest': published['manifest'],
+                'phase_timings': phase_timings(command_span),
                 'status': 'success',
                 'rollback_from': current_deployment['timestamp'],
                 'rollback_to': target_deployment['timestamp']
             }
             
-            deployments = self.config_manager.get('deployments', [])
-            deployments.insert(0, rollback_deployment)
-            self.config_manager.set('deployments', deployments[:10])
+            self.history.add(rollback_deployment)
             
             print("Rollback successful!")
             print("=" * 50)
             print(f"URL: {website_url}")
             print(f"Health: {website_url}/health")
             print(f"Rolled back to: {actual_commit[:8] if actual_commit else 'N/A'}")
-            print(f"Backup: s3://{bucket_name}/{backup_prefix}")
+            if published['release']:
+                print(f"Release: {published['release']}")
+            if backup_prefix:
+                print(f"Backup: s3://{bucket_name}/{backup_prefix}")
             
             monitoring_config = self.config_manager.get('monitoring', {})
             if monitoring_config.get('enabled'):
@@ -43,14 +43,14 @@ class StatusCommand(BaseCommand):
         
         print()
         
-        deployments = config.get('deployments', [])
+        deployments = self.history.query(limit=5)
         
         if not deployments:
             print("No deployments found")
             return
         
-        print("Recent Deployments:")
-        for i, deployment in enumerate(deployments[:5]):
+        print(f"Recent Deployments ({len(deployments)} of {self.history.count()}):")
+        for i, deployment in enumerate(deployments):
             status_icon = 'SUCCESS' if deployment['status'] == 'success' else 'FAILED'
             print(f"{i+1}. {deployment['timestamp'][:19]} {status_icon}")
             print(f"   Environment: {deployment['environment']}")
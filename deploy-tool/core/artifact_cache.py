@@ -0,0 +1,129 @@
+"""Local content-addressed cache of build outputs."""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+from core.aws_client import MB
+from core.git_operations import remove_tree
+from utils.manifest import hash_file
+
+LOCKFILES = ['package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml']
+
+
+class ArtifactCache:
+    # Parallel builds in one process share the index file
+    _index_lock = threading.Lock()
+    
+    def __init__(self, cache_dir: str, max_size_mb: float = 2048):
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * MB)
+        self.index_file = os.path.join(cache_dir, 'index.json')
+    
+    @staticmethod
+    def compute_key(commit_hash: str, project_path: str, build_command: str, build_dir: str,
+                    env_file_path: Optional[str] = None) -> str:
+        """Build the cache key from commit, lockfile, build command and .env contents."""
+        lockfile_hash = None
+        for lockfile in LOCKFILES:
+            lockfile_path = os.path.join(project_path, lockfile)
+            if os.path.exists(lockfile_path):
+                lockfile_hash = f"{lockfile}:{hash_file(lockfile_path)}"
+                break
+        
+        env_hash = None
+        if env_file_path and os.path.exists(env_file_path):
+            env_hash = hash_file(env_file_path)
+        
+        key_source = {
+            'commit': commit_hash,
+            'lockfile': lockfile_hash,
+            'build_command': build_command,
+            'build_dir': build_dir,
+            'env': env_hash
+        }
+        return hashlib.sha256(json.dumps(key_source, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache index."""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        """Save the cache index atomically."""
+        temp_path = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_file)
+    
+    def _entry_path(self, key: str) -> str:
+        """Get the directory holding a cached build."""
+        return os.path.join(self.cache_dir, key)
+    
+    def restore(self, key: str, build_path: str) -> bool:
+        """Copy a cached build into build_path; return False on a cache miss."""
+        entry_path = self._entry_path(key)
+        
+        with self._index_lock:
+            if key not in self._load_index() or not os.path.isdir(entry_path):
+                return False
+            
+            if os.path.exists(build_path):
+                remove_tree(build_path)
+            shutil.copytree(entry_path, build_path)
+            
+            index = self._load_index()
+            index[key]['last_used'] = time.time()
+            self._save_index(index)
+        return True
+    
+    def store(self, key: str, build_path: str, commit_hash: Optional[str] = None) -> None:
+        """Cache a finished build and evict least recently used entries over the size limit."""
+        staging_path = tempfile.mkdtemp(prefix='store_', dir=self.cache_dir)
+        entry_path = self._entry_path(key)
+        try:
+            shutil.copytree(build_path, os.path.join(staging_path, 'build'))
+            size = sum(os.path.getsize(os.path.join(root, file))
+                       for root, dirs, files in os.walk(staging_path) for file in files)
+            
+            with self._index_lock:
+                if os.path.exists(entry_path):
+                    remove_tree(entry_path)
+                os.replace(os.path.join(staging_path, 'build'), entry_path)
+                
+                index = self._load_index()
+                index[key] = {
+                    'commit': commit_hash,
+                    'size': size,
+                    'created': time.time(),
+                    'last_used': time.time()
+                }
+                self._evict(index, keep=key)
+                self._save_index(index)
+        finally:
+            remove_tree(staging_path)
+    
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> None:
+        """Drop least recently used builds until the cache fits its size limit."""
+        total = sum(entry['size'] for entry in index.values())
+        
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            
+            entry_path = self._entry_path(key)
+            if os.path.exists(entry_path):
+                remove_tree(entry_path)
+            total -= index.pop(key)['size']
+            print(f"Evicted cached build {key[:12]}")
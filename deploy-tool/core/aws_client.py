@@ -1,17 +1,98 @@
 """AWS client management and operations."""
 
-import boto3
+import hashlib
 import json
+import os
+import sys
 import time
-from botocore.exceptions import ProfileNotFound, NoCredentialsError
-from datetime import datetime
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from core.identity_cache import IdentityCache
+from utils.manifest import build_manifest
+from utils.tracing import count, instrument_client, traced
+
+# boto3 and botocore are imported where they are used: importing them costs more
+# than the config, status and check commands take to run
+if TYPE_CHECKING:
+    from boto3.s3.transfer import TransferConfig
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+MB = 1024 * 1024
+
+RELEASES_PREFIX = 'releases/'
+
+BACKUPS_PREFIX = 'rollback_backups/'
+
+MANIFESTS_PREFIX = '.deploy-manifests/'
+
+MANAGED_PREFIXES = (RELEASES_PREFIX, BACKUPS_PREFIX, MANIFESTS_PREFIX)
+
+DELETE_BATCH_SIZE = 1000
+
+PUBLIC_ACCESS_BLOCK = {
+    'BlockPublicAcls': False,
+    'IgnorePublicAcls': False,
+    'BlockPublicPolicy': False,
+    'RestrictPublicBuckets': False
+}
+
+POLICY_RETRY_DELAYS = [0.5, 1, 2, 4, 8]
+
+FILE_CLASSES = {
+    '.mp4': 'media',
+    '.webm': 'media',
+    '.mov': 'media',
+    '.mp3': 'media',
+    '.ogg': 'media',
+    '.wav': 'media',
+    '.wasm': 'wasm',
+    '.map': 'sourcemap'
+}
+
+
+def get_s3_error_code(error: Optional[BaseException]) -> Optional[str]:
+    """Get the S3 error code behind a failure, following wrapped upload and copy errors."""
+    while error is not None:
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        if code:
+            return code
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def get_file_class(s3_path: str) -> str:
+    """Classify a build file for transfer reporting."""
+    return FILE_CLASSES.get(os.path.splitext(s3_path)[1].lower(), 'static')
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """Get this process's peak resident set size in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
 
 
 class AWSClient:
-    def __init__(self, profile: str = 'abhinav', region: str = 'ap-south-1'):
+    def __init__(self, profile: str = 'abhinav', region: str = 'ap-south-1', upload_workers: int = 10,
+                 transfer_settings: Optional[Dict[str, Any]] = None, identity_cache: Optional[IdentityCache] = None,
+                 endpoint_url: Optional[str] = None):
+        transfer_settings = transfer_settings or {}
         self.aws_profile = profile
         self.aws_region = region
+        self.upload_workers = max(1, upload_workers)
+        self.multipart_threshold = int(float(transfer_settings.get('multipart_threshold_mb', 16)) * MB)
+        self.multipart_chunksize = int(float(transfer_settings.get('multipart_chunksize_mb', 16)) * MB)
+        self.max_concurrency = max(1, int(transfer_settings.get('max_concurrency', 4)))
+        self.identity_cache = identity_cache
+        # S3-compatible endpoint to use instead of AWS (a local stand-in for benchmarks)
+        self.endpoint_url = endpoint_url
         self._session = None
         self._s3_client = None
         self._ec2_client = None
@@ -19,6 +100,9 @@ class AWSClient:
     def get_boto3_session(self):
         """Get AWS session with error handling."""
         if self._session is None:
+            import boto3
+            from botocore.exceptions import NoCredentialsError, ProfileNotFound
+            
             try:
                 self._session = boto3.Session(profile_name=self.aws_profile)
             except ProfileNotFound:
@@ -32,38 +116,151 @@ class AWSClient:
         return self._session
     
     def get_s3_client(self):
-        """Get S3 client."""
+        """Get S3 client with a connection pool sized for the upload workers."""
         if self._s3_client is None:
+            from botocore.config import Config
+            
             session = self.get_boto3_session()
-            self._s3_client = session.client('s3', region_name=self.aws_region)
+            # Every worker may be running a multipart upload with its own part threads
+            self._s3_client = instrument_client(session.client(
+                's3',
+                region_name=self.aws_region,
+                endpoint_url=self.endpoint_url,
+                config=Config(max_pool_connections=max(self.upload_workers * self.max_concurrency, 10))
+            ))
         return self._s3_client
     
+    def get_transfer_config(self, large: bool = True) -> 'TransferConfig':
+        """Get the tuned transfer configuration for large or small files."""
+        from boto3.s3.transfer import TransferConfig
+        
+        if not large:
+            # Single PUTs gain nothing from a per-file thread pool
+            return TransferConfig(multipart_threshold=self.multipart_threshold, use_threads=False)
+        
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.max_concurrency,
+            use_threads=True
+        )
+    
+    def set_upload_workers(self, workers: int) -> None:
+        """Change the upload worker count, resizing the S3 connection pool."""
+        workers = max(1, workers)
+        if workers != self.upload_workers:
+            self.upload_workers = workers
+            self._s3_client = None
+    
     def get_ec2_client(self):
         """Get EC2 client."""
         if self._ec2_client is None:
             session = self.get_boto3_session()
-            self._ec2_client = session.client('ec2', region_name=self.aws_region)
+            self._ec2_client = instrument_client(session.client('ec2', region_name=self.aws_region))
         return self._ec2_client
     
+    @traced()
     def check_sso_login(self) -> bool:
-        """Check if SSO login is valid."""
+        """Check if SSO login is valid, trusting a cached identity until its token expires."""
+        if self.identity_cache:
+            cached = self.identity_cache.load(self.aws_profile, self.aws_region)
+            if cached:
+                expires = datetime.fromtimestamp(cached['expires_at']).strftime('%H:%M:%S')
+                print(f"SSO login valid for account: {cached['account']} (cached until {expires})")
+                return True
+        
         try:
             session = self.get_boto3_session()
-            sts = session.client('sts')
+            sts = instrument_client(session.client('sts'))
             identity = sts.get_caller_identity()
             print(f"SSO login valid for account: {identity['Account']}")
-            return True
         except Exception as e:
+            if self.identity_cache:
+                self.identity_cache.clear(self.aws_profile, self.aws_region)
             print(f"SSO login expired or invalid: {e}")
             print(f"Please run: aws sso login --profile {self.aws_profile}")
             return False
+        
+        if self.identity_cache:
+            try:
+                self.identity_cache.store(self.aws_profile, self.aws_region, identity)
+            except OSError as e:
+                print(f"Warning: Could not cache AWS identity: {e}")
+        return True
     
     def create_s3_bucket(self, bucket_name: str) -> str:
         """Create and configure S3 bucket for static hosting."""
-        print(f"Creating S3 bucket: {bucket_name}")
+        return self.ensure_s3_bucket(bucket_name)[0]
+    
+    @traced()
+    def ensure_s3_bucket(self, bucket_name: str,
+                         trusted_fingerprint: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Create the bucket if needed and re-apply only the hosting configuration that drifted."""
+        website_url = f"http://{bucket_name}.s3-website.{self.aws_region}.amazonaws.com"
+        fingerprint = self.get_bucket_fingerprint(bucket_name)
+        
+        if trusted_fingerprint == fingerprint:
+            print(f"Bucket {bucket_name} configuration unchanged (fingerprint {fingerprint}), skipping checks")
+            return website_url, fingerprint
+        
+        created = self._create_bucket_if_missing(bucket_name)
+        if created:
+            drifted = ['public_access_block', 'website', 'policy']
+        else:
+            drifted = self._find_bucket_drift(bucket_name)
+            if not drifted:
+                print(f"Bucket {bucket_name} already configured for static hosting")
+                return website_url, fingerprint
+            print(f"Bucket {bucket_name} configuration drifted ({', '.join(drifted)}), re-applying...")
+        
+        try:
+            self._apply_bucket_configuration(bucket_name, drifted)
+        except Exception as e:
+            if created:
+                raise
+            print(f"Warning: Could not configure existing bucket: {e}")
+            return website_url, None
+        
+        print("S3 bucket created and configured successfully" if created else "Existing bucket configured successfully")
+        return website_url, fingerprint
+    
+    def get_bucket_fingerprint(self, bucket_name: str) -> str:
+        """Fingerprint the hosting configuration the tool applies."""
+        desired = {
+            'region': self.aws_region,
+            'public_access_block': PUBLIC_ACCESS_BLOCK,
+            'website': self._get_website_configuration(bucket_name),
+            'policy': self._get_bucket_policy(bucket_name)
+        }
+        return hashlib.sha256(json.dumps(desired, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    
+    def _get_bucket_policy(self, bucket_name: str) -> Dict[str, Any]:
+        """Build the public-read bucket policy."""
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Sid": "PublicReadGetObject",
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": "s3:GetObject",
+                "Resource": f"arn:aws:s3:::{bucket_name}/*"
+            }]
+        }
+    
+    def _create_bucket_if_missing(self, bucket_name: str) -> bool:
+        """Create the bucket unless it already exists; return True if it was created."""
+        from botocore.exceptions import ClientError
         
         s3 = self.get_s3_client()
         
+        try:
+            s3.head_bucket(Bucket=bucket_name)
+            return False
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchBucket', 'NotFound'):
+                raise Exception(f"Bucket {bucket_name} exists but is not accessible: {e}")
+        
+        print(f"Creating S3 bucket: {bucket_name}")
         try:
             if self.aws_region == 'us-east-1':
                 s3.create_bucket(Bucket=bucket_name)
@@ -72,198 +269,518 @@ class AWSClient:
                     Bucket=bucket_name,
                     CreateBucketConfiguration={'LocationConstraint': self.aws_region}
                 )
-            
+        except ClientError as e:
+            # Another deploy created it between the check and the create
+            if e.response.get('Error', {}).get('Code') != 'BucketAlreadyOwnedByYou':
+                raise
+        return True
+    
+    def _find_bucket_drift(self, bucket_name: str) -> List[str]:
+        """Read the bucket's hosting configuration and list the parts that differ from the desired state."""
+        from botocore.exceptions import ClientError
+        
+        s3 = self.get_s3_client()
+        drifted = []
+        
+        try:
+            current = s3.get_public_access_block(Bucket=bucket_name)['PublicAccessBlockConfiguration']
+            if current != PUBLIC_ACCESS_BLOCK:
+                drifted.append('public_access_block')
+        except ClientError:
+            drifted.append('public_access_block')
+        
+        try:
+            current = s3.get_bucket_website(Bucket=bucket_name)
+            expected = self._get_website_configuration(bucket_name)
+            if any(current.get(key) != value for key, value in expected.items()) or current.get('RoutingRules'):
+                drifted.append('website')
+        except ClientError:
+            drifted.append('website')
+        
+        try:
+            current = json.loads(s3.get_bucket_policy(Bucket=bucket_name)['Policy'])
+            if current != self._get_bucket_policy(bucket_name):
+                drifted.append('policy')
+        except (ClientError, ValueError):
+            drifted.append('policy')
+        
+        return drifted
+    
+    def _apply_bucket_configuration(self, bucket_name: str, parts: List[str]) -> None:
+        """Write the given parts of the hosting configuration."""
+        s3 = self.get_s3_client()
+        
+        if 'public_access_block' in parts:
             print("Configuring bucket for public access...")
             s3.put_public_access_block(
                 Bucket=bucket_name,
-                PublicAccessBlockConfiguration={
-                    'BlockPublicAcls': False,
-                    'IgnorePublicAcls': False,
-                    'BlockPublicPolicy': False,
-                    'RestrictPublicBuckets': False
-                }
+                PublicAccessBlockConfiguration=PUBLIC_ACCESS_BLOCK
             )
-            
-            time.sleep(2)
-            
+        
+        if 'website' in parts:
             print("Configuring static website hosting...")
             s3.put_bucket_website(
                 Bucket=bucket_name,
-                WebsiteConfiguration={
-                    'IndexDocument': {'Suffix': 'index.html'},
-                    'ErrorDocument': {'Key': 'error.html'}
-                }
+                WebsiteConfiguration=self._get_website_configuration(bucket_name)
             )
-            
+        
+        if 'policy' in parts:
             print("Setting bucket policy for public access...")
-            policy = {
-                "Version": "2012-10-17",
-                "Statement": [{
-                    "Sid": "PublicReadGetObject",
-                    "Effect": "Allow",
-                    "Principal": "*",
-                    "Action": "s3:GetObject",
-                    "Resource": f"arn:aws:s3:::{bucket_name}/*"
-                }]
-            }
-            
-            s3.put_bucket_policy(
+            self._put_bucket_policy(bucket_name)
+    
+    def _put_bucket_policy(self, bucket_name: str) -> None:
+        """Put the public-read policy, retrying while a new public access block propagates."""
+        from botocore.exceptions import ClientError
+        
+        s3 = self.get_s3_client()
+        
+        for delay in POLICY_RETRY_DELAYS + [None]:
+            try:
+                s3.put_bucket_policy(
+                    Bucket=bucket_name,
+                    Policy=json.dumps(self._get_bucket_policy(bucket_name))
+                )
+                return
+            except ClientError as e:
+                if delay is None or e.response.get('Error', {}).get('Code') != 'AccessDenied':
+                    raise
+                time.sleep(delay)
+    
+    def _get_website_configuration(self, bucket_name: str) -> Dict[str, Any]:
+        """Build the static website configuration."""
+        return {
+            'IndexDocument': {'Suffix': 'index.html'},
+            'ErrorDocument': {'Key': 'error.html'}
+        }
+    
+    def release_exists(self, bucket_name: str, release_prefix: str) -> bool:
+        """Check whether a release prefix still holds objects."""
+        s3 = self.get_s3_client()
+        response = s3.list_objects_v2(Bucket=bucket_name, Prefix=f"{release_prefix}/", MaxKeys=1)
+        return response.get('KeyCount', 0) > 0
+    
+    def get_manifest_key(self, environment: str) -> str:
+        """Get the bucket key holding an environment's upload manifest."""
+        return f"{MANIFESTS_PREFIX}{environment}.json"
+    
+    def get_release_manifest_key(self, release_prefix: str) -> str:
+        """Get the bucket key holding the manifest a release was uploaded with."""
+        return f"{MANIFESTS_PREFIX}{release_prefix}.json"
+    
+    def load_manifest(self, bucket_name: str, environment: str) -> Optional[Dict[str, Any]]:
+        """Read an environment's upload manifest from its bucket, or None when there is none."""
+        return self._load_manifest(bucket_name, self.get_manifest_key(environment))
+    
+    def load_release_manifest(self, bucket_name: str, release_prefix: str) -> Optional[Dict[str, Any]]:
+        """Read the manifest a release was uploaded with, or None when there is none."""
+        return self._load_manifest(bucket_name, self.get_release_manifest_key(release_prefix))
+    
+    def _load_manifest(self, bucket_name: str, key: str) -> Optional[Dict[str, Any]]:
+        """Read a manifest document from the bucket."""
+        from botocore.exceptions import ClientError
+        
+        s3 = self.get_s3_client()
+        
+        try:
+            response = s3.get_object(Bucket=bucket_name, Key=key)
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NoSuchBucket'):
+                print(f"Warning: Could not read manifest from {bucket_name}, uploading all files: {e}")
+            return None
+        except ValueError:
+            print(f"Warning: Manifest in {bucket_name} is corrupt, uploading all files")
+            return None
+    
+    def save_manifest(self, bucket_name: str, environment: str, document: Dict[str, Any]) -> None:
+        """Store an environment's upload manifest in its bucket, next to the files it describes."""
+        keys = [self.get_manifest_key(environment)]
+        # A release keeps its own copy so activating it again restores the manifest
+        if document.get('release'):
+            keys.append(self.get_release_manifest_key(document['release']))
+        
+        for key in keys:
+            self.get_s3_client().put_object(
                 Bucket=bucket_name,
-                Policy=json.dumps(policy)
+                Key=key,
+                Body=json.dumps(document).encode('utf-8'),
+                ContentType='application/json',
+                CacheControl='no-cache'
             )
-            
-            print("S3 bucket created and configured successfully")
-            return f"http://{bucket_name}.s3-website.{self.aws_region}.amazonaws.com"
-            
-        except Exception as e:
-            if "BucketAlreadyExists" in str(e) or "BucketAlreadyOwnedByYou" in str(e):
-                print(f"Bucket {bucket_name} already exists, configuring for public access...")
-                
-                try:
-                    s3.put_public_access_block(
-                        Bucket=bucket_name,
-                        PublicAccessBlockConfiguration={
-                            'BlockPublicAcls': False,
-                            'IgnorePublicAcls': False,
-                            'BlockPublicPolicy': False,
-                            'RestrictPublicBuckets': False
-                        }
-                    )
-                    
-                    time.sleep(2)
-                    
-                    s3.put_bucket_website(
-                        Bucket=bucket_name,
-                        WebsiteConfiguration={
-                            'IndexDocument': {'Suffix': 'index.html'},
-                            'ErrorDocument': {'Key': 'error.html'}
-                        }
-                    )
-                    
-                    policy = {
-                        "Version": "2012-10-17",
-                        "Statement": [{
-                            "Sid": "PublicReadGetObject",
-                            "Effect": "Allow",
-                            "Principal": "*",
-                            "Action": "s3:GetObject",
-                            "Resource": f"arn:aws:s3:::{bucket_name}/*"
-                        }]
-                    }
-                    
-                    s3.put_bucket_policy(
-                        Bucket=bucket_name,
-                        Policy=json.dumps(policy)
-                    )
-                    
-                    print("Existing bucket configured successfully")
-                    
-                except Exception as config_error:
-                    print(f"Warning: Could not configure existing bucket: {config_error}")
-                
-                return f"http://{bucket_name}.s3-website.{self.aws_region}.amazonaws.com"
-            else:
-                raise e
     
-    def upload_to_s3(self, build_dir: str, bucket_name: str) -> int:
-        """Upload files to S3 bucket."""
-        print("Uploading files to S3...")
+    def delete_manifest(self, bucket_name: str, environment: str) -> None:
+        """Remove an environment's upload manifest before the files it describes change."""
+        self.get_s3_client().delete_object(Bucket=bucket_name, Key=self.get_manifest_key(environment))
+    
+    def _list_objects(self, bucket_name: str, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Map the keys under a prefix, relative to it, to their size and ETag."""
+        objects = {}
+        paginator = self.get_s3_client().get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                objects[obj['Key'][len(prefix):]] = {'size': obj['Size'], 'etag': obj['ETag']}
+        return objects
+    
+    def _list_served_objects(self, bucket_name: str) -> Dict[str, Dict[str, Any]]:
+        """Map the keys served from the bucket root, outside the prefixes the tool manages, to their size and ETag."""
+        objects = {}
+        directories = []
+        paginator = self.get_s3_client().get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Delimiter='/'):
+            directories += [p['Prefix'] for p in page.get('CommonPrefixes', []) if p['Prefix'] not in MANAGED_PREFIXES]
+            objects.update({obj['Key']: {'size': obj['Size'], 'etag': obj['ETag']} for obj in page.get('Contents', [])})
+        for directory in directories:
+            objects.update({f"{directory}{key}": obj for key, obj in self._list_objects(bucket_name, directory).items()})
+        return objects
+    
+    def _delete_keys(self, bucket_name: str, keys: List[str]) -> None:
+        """Delete the given keys in batches."""
+        s3 = self.get_s3_client()
+        for i in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = [{'Key': key} for key in keys[i:i + DELETE_BATCH_SIZE]]
+            response = s3.delete_objects(Bucket=bucket_name, Delete={'Objects': batch, 'Quiet': True})
+            if response.get('Errors'):
+                raise Exception(f"Could not delete {len(response['Errors'])} objects from {bucket_name}")
+    
+    @traced()
+    def activate_release(self, bucket_name: str, release_prefix: str) -> None:
+        """Serve a release from the bucket root, switching to it with a single write of index.html."""
+        release = self._list_objects(bucket_name, f"{release_prefix}/")
+        if not release:
+            raise Exception(f"Release {release_prefix} is empty or missing")
+        
+        conflicts = sorted({key.split('/', 1)[0] + '/' for key in release if key.startswith(MANAGED_PREFIXES)})
+        if conflicts:
+            raise Exception(f"Top-level build directories clash with prefixes the tool manages: {', '.join(conflicts)}")
+        
+        # Assets are added next to the live release's: bundler output is content-hashed, so the
+        # live index.html keeps loading its own files, and open tabs can still lazy-load old
+        # chunks until the release that owns them is pruned
+        served = self._list_served_objects(bucket_name)
+        assets = [key for key in release if '/' in key and served.get(key) != release[key]]
+        if assets:
+            self.copy_objects(bucket_name, [(f"{release_prefix}/{key}", key, release[key]['size']) for key in assets],
+                              label='Staged')
+        
+        # Copying index.html is the switch; the other root files (health, sw.js, ...) go just before it
+        entry_points = sorted((key for key in release if '/' not in key), key=lambda name: name == 'index.html')
+        started = time.perf_counter()
+        for batch in (entry_points[:-1], entry_points[-1:]):
+            if batch:
+                self.copy_objects(bucket_name, [(f"{release_prefix}/{name}", name, release[name]['size'])
+                                                for name in batch], label='Activated')
+        switched_ms = (time.perf_counter() - started) * 1000
         
+        # Root files from an earlier release that this one does not have
+        self._delete_keys(bucket_name, [key for key in served if '/' not in key and key not in release])
+        
+        print(f"Activated release {release_prefix}: {len(assets)} assets staged, "
+              f"{len(entry_points)} root files switched in {switched_ms:.0f} ms")
+    
+    def prune_releases(self, bucket_name: str, keep: int, active_release: Optional[str] = None) -> int:
+        """Delete all but the newest releases, never the active one; return how many were deleted."""
         s3 = self.get_s3_client()
-        file_count = 0
         
-        content_types = {
-            '.html': 'text/html',
-            '.js': 'application/javascript',
-            '.css': 'text/css',
-            '.json': 'application/json',
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.svg': 'image/svg+xml',
-            '.ico': 'image/x-icon'
-        }
+        releases = []
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=RELEASES_PREFIX, Delimiter='/'):
+            releases += [p['Prefix'] for p in page.get('CommonPrefixes', [])]
+        
+        # Release names end in their creation timestamp: releases/<commit>-<YYYYmmddHHMMSS>/
+        releases.sort(key=lambda prefix: prefix.rstrip('/').rsplit('-', 1)[-1], reverse=True)
+        expired = [prefix for prefix in releases[keep:] if prefix.rstrip('/') != active_release]
+        if not expired:
+            return 0
         
-        import os
-        for root, dirs, files in os.walk(build_dir):
-            for file in files:
-                local_path = os.path.join(root, file)
-                relative_path = os.path.relpath(local_path, build_dir)
-                s3_path = relative_path.replace('\\', '/')
+        print(f"Pruning {len(expired)} old release(s), keeping the newest {keep}...")
+        prefixes = expired + [self.get_release_manifest_key(prefix.rstrip('/')) for prefix in expired]
+        if not self.clear_s3_bucket(bucket_name, include_prefixes=prefixes, exclude_prefixes=[]):
+            raise Exception("Some old releases could not be deleted")
+        
+        # Root assets staged by the pruned releases and by no release that is left
+        kept = set()
+        for prefix in releases:
+            if prefix not in expired:
+                kept.update(self._list_objects(bucket_name, prefix))
+        orphans = [key for key in self._list_served_objects(bucket_name) if '/' in key and key not in kept]
+        self._delete_keys(bucket_name, orphans)
+        if orphans:
+            print(f"Removed {len(orphans)} root assets no remaining release uses")
+        return len(expired)
+    
+    @traced()
+    def copy_objects(self, bucket_name: str, copies: Iterable[Tuple[str, str, int]],
+                     max_workers: Optional[int] = None, label: str = 'Copied') -> int:
+        """Copy (source, target, size) objects server-side as they arrive, with bounded concurrency."""
+        workers = max(1, max_workers or self.upload_workers)
+        s3 = self.get_s3_client()
+        failures = []
+        errors = []
+        copied = 0
+        copied_bytes = 0
+        started = time.perf_counter()
+        last_report = started
+        
+        def copy_one(source_key, target_key, size):
+            copy_source = {'Bucket': bucket_name, 'Key': source_key}
+            if size >= self.multipart_threshold:
+                # Managed copy goes multipart (UploadPartCopy) from multipart_threshold, the cutoff checked above
+                s3.copy(copy_source, bucket_name, target_key, Config=self.get_transfer_config())
+            else:
+                s3.copy_object(Bucket=bucket_name, CopySource=copy_source, Key=target_key)
+            return size
+        
+        def collect(done):
+            nonlocal copied, copied_bytes
+            for future in done:
+                source_key = pending.pop(future)
+                try:
+                    size = future.result()
+                except Exception as e:
+                    failures.append(source_key)
+                    errors.append(e)
+                    print(f"  Failed to copy: {source_key} ({e})")
+                    continue
+                copied += 1
+                copied_bytes += size
+                count('objects_copied')
+                count('bytes_copied', size)
+        
+        # Keys are submitted while the listing is still paging in; capping the
+        # in-flight futures keeps memory flat on buckets with millions of keys.
+        pending = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for source_key, target_key, size in copies:
+                pending[executor.submit(copy_one, source_key, target_key, size)] = source_key
                 
-                file_ext = os.path.splitext(file)[1].lower()
-                content_type = content_types.get(file_ext, 'application/json' if file == 'health' else 'text/html')
+                if len(pending) >= workers * 4:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
                 
-                s3.upload_file(
-                    local_path,
+                if time.perf_counter() - last_report >= 5:
+                    last_report = time.perf_counter()
+                    print(f"  {label} {copied} objects ({copied_bytes / MB:.1f} MB)...")
+            
+            collect(list(pending))
+        
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        print(f"  {label} {copied} objects ({copied_bytes / MB:.1f} MB) in {elapsed:.1f}s "
+              f"({copied / elapsed:.0f} objects/s, {copied_bytes / MB / elapsed:.1f} MB/s)")
+        
+        if failures:
+            raise Exception(f"Copy failed for {len(failures)} of {copied + len(failures)} objects") from errors[0]
+        return copied
+    
+    @traced()
+    def upload_to_s3(self, build_dir: str, bucket_name: str, files: Optional[Dict[str, Dict[str, Any]]] = None,
+                     max_workers: Optional[int] = None, key_prefix: str = '') -> int:
+        """Upload build files, or just the given manifest entries, with a bounded worker pool."""
+        if files is None:
+            files = build_manifest(build_dir)
+        
+        workers = max(1, max_workers or self.upload_workers)
+        print(f"Uploading {len(files)} files to S3 ({workers} workers)...")
+        
+        s3 = self.get_s3_client()
+        file_count = 0
+        failures = []
+        errors = []
+        class_stats = {}
+        
+        # boto3 clients are thread-safe, so every worker shares the one client
+        # and its connection pool; results are tallied on this thread only.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    self._upload_file,
+                    s3,
+                    os.path.join(build_dir, *s3_path.split('/')),
                     bucket_name,
-                    s3_path,
-                    ExtraArgs={'ContentType': content_type}
-                )
+                    key_prefix + s3_path,
+                    entry
+                ): s3_path
+                for s3_path, entry in files.items()
+            }
+            
+            for future in as_completed(futures):
+                s3_path = futures[future]
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    failures.append(s3_path)
+                    errors.append(e)
+                    print(f"  Failed: {s3_path} ({e})")
+                    continue
+                
+                stats = class_stats.setdefault(get_file_class(s3_path), {'files': 0, 'bytes': 0, 'seconds': 0.0})
+                stats['files'] += 1
+                stats['bytes'] += files[s3_path]['size']
+                stats['seconds'] += duration
                 
                 file_count += 1
+                count('files_uploaded')
+                count('bytes_uploaded', files[s3_path]['size'])
                 print(f"  Uploaded: {s3_path}")
         
+        if failures:
+            raise Exception(f"Upload failed for {len(failures)} of {len(files)} files") from errors[0]
+        
         print(f"Upload completed ({file_count} files)")
+        self._print_transfer_stats(class_stats)
         return file_count
     
+    def _upload_file(self, s3, local_path: str, bucket_name: str, s3_path: str, entry: Dict[str, Any]) -> float:
+        """Upload one file, streaming large files in multipart chunks, and return the duration."""
+        started = time.perf_counter()
+        # upload_file reads each part from disk on demand, so peak memory is bounded by
+        # chunk size x concurrency rather than by the size of the file
+        s3.upload_file(
+            local_path,
+            bucket_name,
+            s3_path,
+            ExtraArgs=self._get_upload_args(entry),
+            Config=self.get_transfer_config(entry['size'] >= self.multipart_threshold)
+        )
+        return time.perf_counter() - started
+    
+    def _print_transfer_stats(self, class_stats: Dict[str, Dict[str, Any]]) -> None:
+        """Print per file class throughput, then the process's peak memory."""
+        if not class_stats:
+            return
+        
+        print("Transfer Stats:")
+        for file_class, stats in sorted(class_stats.items()):
+            megabytes = stats['bytes'] / MB
+            throughput = megabytes / stats['seconds'] if stats['seconds'] else 0.0
+            print(f"   {file_class}: {stats['files']} files, {megabytes:.1f} MB, "
+                  f"{throughput:.1f} MB/s per stream")
+        
+        # Classes upload side by side in one pool, so memory is only meaningful for the whole process
+        peak_rss = get_peak_rss_mb()
+        if peak_rss is not None:
+            print(f"   process peak RSS: {peak_rss:.0f} MB")
+    
+    def _get_upload_args(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Build S3 ExtraArgs for a manifest entry."""
+        extra_args = {'ContentType': entry['content_type']}
+        if entry.get('content_encoding'):
+            extra_args['ContentEncoding'] = entry['content_encoding']
+        if entry.get('cache_control'):
+            extra_args['CacheControl'] = entry['cache_control']
+        if entry.get('expires_in'):
+            extra_args['Expires'] = datetime.now(timezone.utc) + timedelta(seconds=entry['expires_in'])
+        return extra_args
+    
+    @traced()
     def backup_current_deployment(self, bucket_name: str, backup_prefix: str) -> bool:
         """Backup current deployment before rollback."""
         print("Creating backup of current deployment...")
         
         s3 = self.get_s3_client()
+        backup_folder = f"{backup_prefix}/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Earlier backups, immutable releases and upload manifests are never copied into a new backup
+        exclude_prefixes = MANAGED_PREFIXES
+        listed = 0
+        
+        def list_copies():
+            nonlocal listed
+            paginator = s3.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket_name):
+                for obj in page.get('Contents', []):
+                    if obj['Key'].startswith(exclude_prefixes):
+                        continue
+                    listed += 1
+                    yield obj['Key'], f"{backup_folder}/{obj['Key']}", obj['Size']
         
         try:
-            response = s3.list_objects_v2(Bucket=bucket_name)
+            copied = self.copy_objects(bucket_name, list_copies(), label='Backed up')
             
-            if 'Contents' not in response:
+            if listed == 0:
                 print("No files to backup")
                 return True
             
-            backup_folder = f"{backup_prefix}/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            for obj in response['Contents']:
-                source_key = obj['Key']
-                backup_key = f"{backup_folder}/{source_key}"
-                
-                s3.copy_object(
-                    Bucket=bucket_name,
-                    CopySource={'Bucket': bucket_name, 'Key': source_key},
-                    Key=backup_key
-                )
+            paginator = s3.get_paginator('list_objects_v2')
+            verified = sum(page.get('KeyCount', 0)
+                           for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{backup_folder}/"))
+            if verified != listed:
+                print(f"Warning: Backup incomplete, {verified} of {listed} objects found in {backup_folder}")
+                return False
             
-            print(f"Backup created at: s3://{bucket_name}/{backup_folder}")
+            print(f"Backup created at: s3://{bucket_name}/{backup_folder} ({copied} objects verified)")
             return True
             
         except Exception as e:
             print(f"Warning: Could not create backup: {e}")
             return False
     
-    def clear_s3_bucket(self, bucket_name: str) -> bool:
-        """Clear all objects from S3 bucket."""
-        print("Clearing current deployment from S3...")
+    @traced()
+    def clear_s3_bucket(self, bucket_name: str, include_prefixes: Optional[List[str]] = None,
+                        exclude_prefixes: Optional[List[str]] = None, max_workers: Optional[int] = None) -> bool:
+        """Clear objects from S3 bucket, keeping rollback backups and releases by default."""
+        print(f"Clearing {', '.join(include_prefixes)} from S3..." if include_prefixes
+              else "Clearing current deployment from S3...")
         
         s3 = self.get_s3_client()
+        workers = max(1, max_workers or self.upload_workers)
+        exclude_prefixes = tuple(exclude_prefixes if exclude_prefixes is not None else [BACKUPS_PREFIX, RELEASES_PREFIX])
+        errors = []
+        deleted = 0
+        started = time.perf_counter()
+        
+        def list_batches():
+            paginator = s3.get_paginator('list_objects_v2')
+            batch = []
+            for prefix in include_prefixes or ['']:
+                for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+                    for obj in page.get('Contents', []):
+                        if exclude_prefixes and obj['Key'].startswith(exclude_prefixes):
+                            continue
+                        batch.append({'Key': obj['Key']})
+                        if len(batch) == DELETE_BATCH_SIZE:
+                            yield batch
+                            batch = []
+            if batch:
+                yield batch
+        
+        def delete_batch(batch):
+            response = s3.delete_objects(Bucket=bucket_name, Delete={'Objects': batch, 'Quiet': True})
+            return len(batch), response.get('Errors', [])
+        
+        def collect(done):
+            nonlocal deleted
+            for future in done:
+                pending.remove(future)
+                try:
+                    batch_size, batch_errors = future.result()
+                except Exception as e:
+                    errors.append({'Key': '<batch>', 'Code': type(e).__name__, 'Message': str(e)})
+                    continue
+                deleted += batch_size - len(batch_errors)
+                count('objects_deleted', batch_size - len(batch_errors))
+                errors.extend(batch_errors)
         
         try:
-            response = s3.list_objects_v2(Bucket=bucket_name)
-            
-            if 'Contents' not in response:
-                print("No files to clear")
-                return True
-            
-            objects_to_delete = [{'Key': obj['Key']} for obj in response['Contents']]
-            
-            s3.delete_objects(
-                Bucket=bucket_name,
-                Delete={'Objects': objects_to_delete}
-            )
-            
-            print(f"Cleared {len(objects_to_delete)} objects from bucket")
-            return True
-            
+            pending = set()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for batch in list_batches():
+                    pending.add(executor.submit(delete_batch, batch))
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                collect(list(pending))
         except Exception as e:
             print(f"Error clearing bucket: {e}")
             return False
- 
+        
+        if deleted == 0 and not errors:
+            print("No files to clear")
+            return True
+        
+        for error in errors[:20]:
+            print(f"  Failed to delete {error.get('Key')}: {error.get('Code')} {error.get('Message', '')}")
+        if len(errors) > 20:
+            print(f"  ... and {len(errors) - 20} more delete errors")
+        
+        print(f"Cleared {deleted} objects from bucket in {time.perf_counter() - started:.1f}s"
+              + (f" (kept {', '.join(exclude_prefixes)})" if exclude_prefixes else ""))
+        return not errors
@@ -2,13 +2,65 @@
 
 import os
 import json
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+def get_cache_dir(config: Dict[str, Any], *parts: str) -> str:
+    """Get (and create) a directory under the tool's persistent cache root."""
+    cache_root = config.get('cache_dir') or os.path.join(os.path.expanduser('~'), '.deploy-tool', 'cache')
+    cache_dir = os.path.join(cache_root, *parts)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _apply_operation(config: Dict[str, Any], operation: Tuple[Any, ...]) -> None:
+    """Apply one recorded change (set, update or replace) to a config dictionary."""
+    action, key = operation[0], operation[1]
+    
+    if action == 'replace':
+        replacement = dict(operation[2])
+        config.clear()
+        config.update(replacement)
+        return
+    
+    keys = key.split('.') if key else []
+    parent = config
+    for k in keys[:-1]:
+        if not isinstance(parent.get(k), dict):
+            parent[k] = {}
+        parent = parent[k]
+    
+    if action == 'set':
+        parent[keys[-1]] = operation[2]
+    elif action == 'update':
+        if keys:
+            if not isinstance(parent.get(keys[-1]), dict):
+                parent[keys[-1]] = {}
+            parent = parent[keys[-1]]
+        parent.update(operation[2])
 
 
 class ConfigManager:
     def __init__(self, config_file: str = '.deploy-config.json'):
         self.config_file = config_file
+        self.lock_file = f"{config_file}.lock"
         self._config = self.load_config()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._batch_depth = 0
+        self._lock = threading.RLock()
     
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file."""
@@ -17,10 +69,80 @@ class ConfigManager:
                 return json.load(f)
         return {}
     
+    @contextmanager
+    def _file_lock(self):
+        """Hold an advisory lock on the config file across processes."""
+        with open(self.lock_file, 'a+') as lock:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            elif msvcrt:
+                lock.seek(0)
+                # LK_LOCK retries for about 10 seconds before raising
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                elif msvcrt:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+    
+    def _write_atomic(self, config: Dict[str, Any]) -> None:
+        """Write the config through a temp file, fsync and rename so readers never see a partial file."""
+        config_dir = os.path.dirname(os.path.abspath(self.config_file))
+        fd, temp_path = tempfile.mkstemp(prefix='.deploy-config.', suffix='.tmp', dir=config_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        # Persist the rename itself (not possible on Windows)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(config_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    
     def save_config(self) -> None:
-        """Save configuration to file."""
-        with open(self.config_file, 'w') as f:
-            json.dump(self._config, f, indent=2)
+        """Save pending changes, merged into the latest file contents, under the file lock."""
+        with self._lock, self._file_lock():
+            # Replay this process's changes on top of whatever other processes wrote meanwhile
+            config = self.load_config()
+            for operation in self._pending:
+                _apply_operation(config, operation)
+            
+            self._write_atomic(config)
+            self._config = config
+            self._pending = []
+    
+    def _record(self, operation: Tuple[Any, ...]) -> None:
+        """Apply a change in memory and save it now, or at the end of the current batch."""
+        with self._lock:
+            _apply_operation(self._config, operation)
+            self._pending.append(operation)
+            if self._batch_depth == 0:
+                self.save_config()
+    
+    @contextmanager
+    def batch(self):
+        """Collect every change made inside the block and write them with one save."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._pending:
+                    self.save_config()
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value."""
@@ -34,23 +156,20 @@ class ConfigManager:
                 return default
         return config
     
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        """Get a boolean configuration value, accepting strings set via the CLI."""
+        value = self.get(key, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ('true', 'yes', '1', 'on')
+        return bool(value)
+    
     def set(self, key: str, value: Any) -> None:
         """Set configuration value."""
-        keys = key.split('.')
-        config = self._config
-        
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        
-        config[keys[-1]] = value
-        self.save_config()
+        self._record(('set', key, value))
     
-    def update(self, updates: Dict[str, Any]) -> None:
-        """Update configuration with dictionary."""
-        self._config.update(updates)
-        self.save_config()
+    def update(self, updates: Dict[str, Any], key: Optional[str] = None) -> None:
+        """Update configuration, or the dictionary at key, with a dictionary."""
+        self._record(('update', key, updates))
     
     @property
     def config(self) -> Dict[str, Any]:
@@ -60,6 +179,5 @@ class ConfigManager:
     @config.setter
     def config(self, value: Dict[str, Any]) -> None:
         """Set full configuration."""
-        self._config = value
-        self.save_config()
+        self._record(('replace', None, value))
  
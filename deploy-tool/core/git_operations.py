@@ -1,16 +1,38 @@
 """Git and GitHub operations."""
 
 import os
+import hashlib
 import subprocess
 import tempfile
 import shutil
+import threading
+import time
 from urllib.parse import urlparse
-from typing import Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+from utils.tracing import count, span, traced
+
+
+def remove_tree(path: str) -> None:
+    """Remove a directory tree, clearing read-only flags on Windows."""
+    def handle_remove_readonly(func, path, exc):
+        os.chmod(path, 0o777)
+        func(path)
+    
+    shutil.rmtree(path, onerror=handle_remove_readonly)
 
 
 class GitOperations:
-    def __init__(self):
+    # One lock per mirror: git cannot fetch into or add worktrees to a repository concurrently
+    _mirror_locks: Dict[str, threading.Lock] = {}
+    _mirror_locks_guard = threading.Lock()
+    
+    def __init__(self, clone_depth: int = 1, mirror_dir: Optional[str] = None):
         self.temp_dir = None
+        self.temp_dirs: List[str] = []
+        self._temp_dirs_lock = threading.Lock()
+        self.clone_depth = max(1, clone_depth)
+        self.mirror_dir = mirror_dir
+        self.last_clone_stats: Dict[str, Any] = {}
     
     def parse_github_url(self, github_url: str) -> Tuple[str, str, str]:
         """Parse GitHub URL to extract owner, repo, and branch."""
@@ -31,81 +53,176 @@ class GitOperations:
         
         return owner, repo, 'master'
     
+    def _run_git(self, args: List[str], cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Run a git command and return the completed process."""
+        count('git_commands')
+        with span(f"git {args[0]}", 'git'):
+            return subprocess.run(['git'] + args, cwd=cwd, check=True, capture_output=True, text=True)
+    
+    @traced()
+    def resolve_remote_commit(self, github_url: str, branch: str = 'master') -> Optional[str]:
+        """Resolve a remote branch head with ls-remote, without fetching any objects."""
+        try:
+            result = self._run_git(['ls-remote', github_url, f'refs/heads/{branch}'])
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+        
+        output = result.stdout.split()
+        return output[0] if output else None
+    
+    def _fetch_commit(self, repo_dir: str, ref: str, depth: int) -> str:
+        """Fetch a branch tip or commit with a shallow fetch, deepening when it is not reachable."""
+        try:
+            self._run_git(['fetch', '--depth', str(depth), '--no-tags', 'origin', ref], cwd=repo_dir)
+            return 'shallow'
+        except subprocess.CalledProcessError:
+            print(f"{ref[:8] if len(ref) == 40 else ref} not reachable with a depth-{depth} fetch, "
+                  f"fetching full history without file contents...")
+        
+        # Full commit graph but no blobs; checkout then downloads only the blobs it needs
+        shallow_file = os.path.join(repo_dir, '.git', 'shallow')
+        unshallow = ['--unshallow'] if os.path.exists(shallow_file) else []
+        self._run_git(['fetch', '--filter=blob:none', '--no-tags'] + unshallow +
+                      ['origin', '+refs/heads/*:refs/remotes/origin/*'], cwd=repo_dir)
+        return 'partial'
+    
+    def _git_objects_size(self, git_dir: str) -> int:
+        """Get the size of everything git downloaded into an object store."""
+        objects_dir = os.path.join(git_dir, 'objects')
+        return sum(os.path.getsize(os.path.join(root, file))
+                   for root, dirs, files in os.walk(objects_dir) for file in files)
+    
+    def get_mirror_path(self, github_url: str) -> str:
+        """Get the local bare mirror path for a repository URL."""
+        url_hash = hashlib.sha1(github_url.rstrip('/').encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.mirror_dir, f"{url_hash}.git")
+    
+    def _get_mirror_lock(self, mirror_path: str) -> threading.Lock:
+        """Get the lock serializing git operations on a mirror."""
+        with self._mirror_locks_guard:
+            return self._mirror_locks.setdefault(mirror_path, threading.Lock())
+    
+    def create_temp_dir(self) -> str:
+        """Create a checkout directory and register it for cleanup."""
+        temp_dir = tempfile.mkdtemp(prefix='deploy_')
+        with self._temp_dirs_lock:
+            self.temp_dirs.append(temp_dir)
+            self.temp_dir = temp_dir
+        return temp_dir
+    
+    def _update_mirror(self, github_url: str) -> Tuple[str, int]:
+        """Create or incrementally fetch the local mirror; return its path and bytes fetched."""
+        mirror_path = self.get_mirror_path(github_url)
+        
+        if not os.path.exists(os.path.join(mirror_path, 'HEAD')):
+            print(f"Creating local mirror in {mirror_path}...")
+            # Blobless: history comes now, file contents only when a checkout needs them
+            self._run_git(['clone', '--mirror', '--filter=blob:none', '--quiet', github_url, mirror_path])
+            return mirror_path, self._git_objects_size(mirror_path)
+        
+        size_before = self._git_objects_size(mirror_path)
+        self._run_git(['fetch', '--prune', '--quiet', 'origin'], cwd=mirror_path)
+        return mirror_path, self._git_objects_size(mirror_path) - size_before
+    
+    def _checkout_from_mirror(self, github_url: str, ref: str, checkout_dir: str) -> int:
+        """Check out a ref from the local mirror into checkout_dir as a detached worktree."""
+        with self._get_mirror_lock(self.get_mirror_path(github_url)):
+            mirror_path, fetched_bytes = self._update_mirror(github_url)
+            size_before = self._git_objects_size(mirror_path)
+            self._run_git(['worktree', 'add', '--detach', '--force', checkout_dir, ref], cwd=mirror_path)
+            return fetched_bytes + self._git_objects_size(mirror_path) - size_before
+    
+    @traced()
     def clone_repository(self, github_url: str, branch: str = 'master', commit_hash: Optional[str] = None) -> Tuple[str, str]:
-        """Clone repository and return path and commit hash."""
+        """Check out the requested branch tip or commit and return path and commit hash."""
         if commit_hash:
             print(f"Cloning repository from {github_url} at commit {commit_hash[:8]}...")
         else:
             print(f"Cloning repository from {github_url}...")
         
-        self.temp_dir = tempfile.mkdtemp(prefix='deploy_')
+        checkout_dir = self.create_temp_dir()
+        started = time.perf_counter()
+        ref = commit_hash or branch or 'master'
+        fetch_mode = None
         
         try:
-            result = subprocess.run([
-                'git', 'clone', 
-                github_url, 
-                self.temp_dir
-            ], shell=True, check=True, capture_output=True, text=True)
-            
-            original_cwd = os.getcwd()
-            os.chdir(self.temp_dir)
+            if self.mirror_dir:
+                try:
+                    fetched_bytes = self._checkout_from_mirror(github_url, ref, checkout_dir)
+                    fetch_mode = 'mirror'
+                except subprocess.CalledProcessError as e:
+                    print(f"Warning: Local mirror unavailable, cloning directly: {(e.stderr or str(e)).strip()}")
+                    self.cleanup_temp_dir(checkout_dir)
+                    checkout_dir = self.create_temp_dir()
             
-            try:
-                if commit_hash:
-                    result = subprocess.run([
-                        'git', 'checkout', commit_hash
-                    ], shell=True, check=True, capture_output=True, text=True)
-                    print(f"Checked out commit {commit_hash[:8]}")
-                else:
-                    result = subprocess.run([
-                        'git', 'checkout', branch
-                    ], shell=True, check=True, capture_output=True, text=True)
-                    print(f"Checked out branch {branch}")
-                
-                result = subprocess.run([
-                    'git', 'rev-parse', 'HEAD'
-                ], shell=True, check=True, capture_output=True, text=True)
-                current_commit = result.stdout.strip()
-                
-                git_dir = os.path.join(self.temp_dir, '.git')
-                if os.path.exists(git_dir):
-                    try:
-                        def handle_remove_readonly(func, path, exc):
-                            os.chmod(path, 0o777)
-                            func(path)
-                        
-                        shutil.rmtree(git_dir, onerror=handle_remove_readonly)
-                    except Exception as e:
-                        print(f"Warning: Could not remove .git directory: {e}")
-                
-                print(f"Repository cloned to {self.temp_dir}")
-                return self.temp_dir, current_commit
+            if fetch_mode is None:
+                self._run_git(['init', '--quiet', checkout_dir])
+                self._run_git(['remote', 'add', 'origin', github_url], cwd=checkout_dir)
                 
-            finally:
-                os.chdir(original_cwd)
+                fetch_mode = self._fetch_commit(checkout_dir, ref, self.clone_depth)
+                checkout_ref = ref if commit_hash else ('FETCH_HEAD' if fetch_mode == 'shallow' else f'origin/{ref}')
+                self._run_git(['checkout', '--quiet', '--detach', checkout_ref], cwd=checkout_dir)
+                fetched_bytes = self._git_objects_size(os.path.join(checkout_dir, '.git'))
+            
+            if commit_hash:
+                print(f"Checked out commit {commit_hash[:8]}")
+            else:
+                print(f"Checked out branch {ref}")
+            
+            result = self._run_git(['rev-parse', 'HEAD'], cwd=checkout_dir)
+            current_commit = result.stdout.strip()
+            
+            count('git_bytes_fetched', fetched_bytes)
+            self.last_clone_stats = {
+                'mode': fetch_mode,
+                'seconds': round(time.perf_counter() - started, 2),
+                'bytes': fetched_bytes
+            }
+            print(f"Fetched {fetched_bytes / (1024 * 1024):.1f} MB ({fetch_mode}) "
+                  f"in {self.last_clone_stats['seconds']:.1f}s")
+            
+            # A mirror worktree has a .git file pointing back at the mirror
+            git_dir = os.path.join(checkout_dir, '.git')
+            if os.path.isfile(git_dir):
+                os.remove(git_dir)
+                mirror_path = self.get_mirror_path(github_url)
+                with self._get_mirror_lock(mirror_path):
+                    self._run_git(['worktree', 'prune'], cwd=mirror_path)
+            elif os.path.exists(git_dir):
+                try:
+                    remove_tree(git_dir)
+                except Exception as e:
+                    print(f"Warning: Could not remove .git directory: {e}")
+            
+            print(f"Repository cloned to {checkout_dir}")
+            return checkout_dir, current_commit
             
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr if e.stderr else str(e)
             print(f"Failed to clone repository: {error_msg}")
-            self.cleanup_temp_dir()
+            self.cleanup_temp_dir(checkout_dir)
             raise Exception(f"Git clone failed: {error_msg}")
         except FileNotFoundError:
             print("Git command not found!")
             print("Please install Git from https://git-scm.com/")
-            self.cleanup_temp_dir()
+            self.cleanup_temp_dir(checkout_dir)
             raise Exception("Git is not installed or not in PATH")
     
-    def cleanup_temp_dir(self):
-        """Clean up temporary directory."""
-        if self.temp_dir and os.path.exists(self.temp_dir):
+    def cleanup_temp_dir(self, temp_dir: Optional[str] = None):
+        """Clean up one checkout directory, or every directory this instance created."""
+        with self._temp_dirs_lock:
+            temp_dirs = [temp_dir] if temp_dir else list(self.temp_dirs)
+            self.temp_dirs = [d for d in self.temp_dirs if d not in temp_dirs]
+            if self.temp_dir in temp_dirs:
+                self.temp_dir = self.temp_dirs[-1] if self.temp_dirs else None
+        
+        for temp_dir in temp_dirs:
+            if not os.path.exists(temp_dir):
+                continue
             try:
-                def handle_remove_readonly(func, path, exc):
-                    os.chmod(path, 0o777)
-                    func(path)
-                
-                shutil.rmtree(self.temp_dir, onerror=handle_remove_readonly)
+                remove_tree(temp_dir)
                 print("Cleaned up temporary directory")
             except Exception as e:
                 print(f"Warning: Could not clean up temporary directory: {e}")
-                print(f"You may need to manually delete: {self.temp_dir}")
+                print(f"You may need to manually delete: {temp_dir}")
  
@@ -0,0 +1,132 @@
+"""Indexed deployment history stored in SQLite."""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deployments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    status TEXT NOT NULL,
+    commit_hash TEXT,
+    bucket TEXT,
+    url TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deployments_environment ON deployments (environment, status, id);
+CREATE INDEX IF NOT EXISTS idx_deployments_status ON deployments (status, id);
+CREATE INDEX IF NOT EXISTS idx_deployments_commit ON deployments (commit_hash);
+CREATE INDEX IF NOT EXISTS idx_deployments_timestamp ON deployments (timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+MIGRATION_KEY = 'migrated_config_deployments'
+
+
+class DeploymentHistory:
+    def __init__(self, db_path: str = '.deploy-history.db',
+                 legacy_records: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None):
+        self.db_path = db_path
+        self.legacy_records = legacy_records
+        self._ready = False
+    
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        # A connection per call keeps the store safe to use from pipeline threads
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._ready:
+                self._initialize(conn)
+                self._ready = True
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def _initialize(self, conn: sqlite3.Connection) -> None:
+        """Create the schema and import the deployments list from .deploy-config.json once."""
+        conn.executescript(SCHEMA)
+        
+        # Serialize the migration between processes opening a fresh database at once
+        conn.execute('BEGIN IMMEDIATE')
+        migrated = conn.execute('SELECT 1 FROM meta WHERE key = ?', (MIGRATION_KEY,)).fetchone()
+        if not migrated:
+            legacy = list(self.legacy_records() or []) if self.legacy_records else []
+            # The config list is newest first; ids grow with time
+            for record in reversed(legacy):
+                self._insert(conn, record)
+            conn.execute('INSERT INTO meta (key, value) VALUES (?, ?)', (MIGRATION_KEY, str(len(legacy))))
+        conn.commit()
+    
+    def _insert(self, conn: sqlite3.Connection, record: Dict[str, Any]) -> int:
+        """Insert one record, copying its queried fields into indexed columns."""
+        cursor = conn.execute(
+            'INSERT INTO deployments (timestamp, environment, status, commit_hash, bucket, url, record) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (record.get('timestamp', ''), record.get('environment', ''), record.get('status', 'success'),
+             record.get('commit_hash'), record.get('bucket'), record.get('url'), json.dumps(record))
+        )
+        return cursor.lastrowid
+    
+    def add(self, record: Dict[str, Any]) -> int:
+        """Append a deployment record and return its id."""
+        with self._connect() as conn:
+            return self._insert(conn, record)
+    
+    @staticmethod
+    def _where(environment: Optional[str] = None, status: Optional[str] = None,
+               commit: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """Build a WHERE clause and its parameters from the given filters."""
+        clauses = []
+        params: List[Any] = []
+        if environment is not None:
+            clauses.append('environment = ?')
+            params.append(environment)
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if commit:
+            # A range rather than LIKE so the commit index serves prefix lookups too
+            clauses.append('commit_hash >= ? AND commit_hash < ?')
+            params.extend([commit.lower(), commit.lower() + 'g'])
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+    
+    def query(self, environment: Optional[str] = None, status: Optional[str] = None,
+              commit: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get deployment records, newest first, filtered by environment, status and commit (full or prefix)."""
+        where, params = self._where(environment, status, commit)
+        sql = f'SELECT record FROM deployments{where} ORDER BY id DESC LIMIT ? OFFSET ?'
+        params.extend([limit if limit is not None else -1, offset])
+        
+        with self._connect() as conn:
+            return [json.loads(row[0]) for row in conn.execute(sql, params)]
+    
+    def latest(self, environment: str, status: str = 'success') -> Optional[Dict[str, Any]]:
+        """Get the most recent record for an environment with the given status."""
+        records = self.query(environment=environment, status=status, limit=1)
+        return records[0] if records else None
+    
+    def count(self, environment: Optional[str] = None, status: Optional[str] = None) -> int:
+        """Count deployment records, optionally for one environment and status."""
+        where, params = self._where(environment, status)
+        with self._connect() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM deployments{where}', params).fetchone()[0]
+    
+    def urls(self, status: str = 'success') -> List[str]:
+        """Get each distinct deployed URL once, most recently deployed first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT url FROM deployments WHERE status = ? AND url IS NOT NULL '
+                'GROUP BY url ORDER BY MAX(id) DESC', (status,)
+            )
+            return [row[0] for row in rows]
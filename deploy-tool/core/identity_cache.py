@@ -0,0 +1,133 @@
+"""On-disk cache of validated AWS caller identities."""
+
+import os
+import json
+import time
+import hashlib
+import configparser
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Stop trusting a cached identity this long before the SSO token expires
+EXPIRY_MARGIN = 60
+
+
+def _parse_expiry(value: str) -> Optional[float]:
+    """Parse an SSO token expiresAt timestamp ("2024-05-01T12:00:00Z" or "...UTC") to epoch seconds."""
+    try:
+        value = value.strip().replace('UTC', '').rstrip('Z')
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class IdentityCache:
+    def __init__(self, cache_dir: str, ttl: float = 900):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+    
+    def _resolve_profile(self, profile: Optional[str]) -> str:
+        """Resolve the profile boto3 will use."""
+        return profile or os.environ.get('AWS_PROFILE') or 'default'
+    
+    def _cache_path(self, profile: Optional[str], region: str) -> str:
+        """Get the cache file for a profile and region."""
+        key = hashlib.sha1(f"{self._resolve_profile(profile)}|{region}".encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def _credentials_key(self) -> Optional[str]:
+        """Hash the access key set in the environment, which overrides any profile."""
+        access_key = os.environ.get('AWS_ACCESS_KEY_ID')
+        return hashlib.sha1(access_key.encode('utf-8')).hexdigest()[:16] if access_key else None
+    
+    def _get_sso_cache_key(self, profile: Optional[str]) -> Optional[str]:
+        """Get the sso_session name or start URL naming the profile's token file, if it uses SSO."""
+        config_path = os.environ.get('AWS_CONFIG_FILE', os.path.join(os.path.expanduser('~'), '.aws', 'config'))
+        parser = configparser.RawConfigParser()
+        try:
+            parser.read(config_path)
+        except configparser.Error:
+            return None
+        
+        profile = self._resolve_profile(profile)
+        section = 'default' if profile == 'default' else f'profile {profile}'
+        if not parser.has_section(section):
+            return None
+        
+        if parser.has_option(section, 'sso_session'):
+            return parser.get(section, 'sso_session')
+        if parser.has_option(section, 'sso_start_url'):
+            return parser.get(section, 'sso_start_url')
+        return None
+    
+    def get_sso_token_expiry(self, profile: Optional[str]) -> Optional[float]:
+        """Read when the profile's SSO token expires; 0 if it has no token, None if it does not use SSO."""
+        sso_cache_key = self._get_sso_cache_key(profile)
+        if not sso_cache_key:
+            return None
+        
+        token_file = os.path.join(os.path.expanduser('~'), '.aws', 'sso', 'cache',
+                                  f"{hashlib.sha1(sso_cache_key.encode('utf-8')).hexdigest()}.json")
+        try:
+            with open(token_file, 'r') as f:
+                return _parse_expiry(json.load(f).get('expiresAt')) or 0
+        except (OSError, json.JSONDecodeError):
+            return 0
+    
+    def load(self, profile: Optional[str], region: str) -> Optional[Dict[str, Any]]:
+        """Return the cached identity while its credentials are still valid."""
+        cache_path = self._cache_path(profile, region)
+        if not os.path.exists(cache_path):
+            return None
+        
+        try:
+            with open(cache_path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        
+        if entry.get('credentials_key') != self._credentials_key():
+            return None
+        
+        now = time.time()
+        token_expiry = None if entry['credentials_key'] else self.get_sso_token_expiry(profile)
+        if token_expiry is not None:
+            # Same login as when the identity was validated, and not about to expire
+            if entry.get('token_expires_at') != token_expiry or token_expiry - EXPIRY_MARGIN <= now:
+                return None
+            return entry
+        
+        return entry if now < entry.get('cached_at', 0) + self.ttl else None
+    
+    def store(self, profile: Optional[str], region: str, identity: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a caller identity returned by STS."""
+        credentials_key = self._credentials_key()
+        token_expiry = None if credentials_key else self.get_sso_token_expiry(profile)
+        now = time.time()
+        
+        entry = {
+            'profile': self._resolve_profile(profile),
+            'region': region,
+            'account': identity['Account'],
+            'arn': identity['Arn'],
+            'user_id': identity['UserId'],
+            'credentials_key': credentials_key,
+            'token_expires_at': token_expiry,
+            'cached_at': now,
+            'expires_at': token_expiry if token_expiry else now + self.ttl
+        }
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(profile, region)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(temp_path, cache_path)
+        return entry
+    
+    def clear(self, profile: Optional[str], region: str) -> None:
+        """Forget the cached identity for a profile and region."""
+        try:
+            os.remove(self._cache_path(profile, region))
+        except OSError:
+            pass
@@ -6,25 +6,35 @@ Usage: python deploy_tool.py [command] [options]
 
 import sys
 import argparse
+import importlib
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from commands.init import InitCommand
-from commands.deploy import DeployCommand
-from commands.status import StatusCommand
-from commands.rollback import RollbackCommand
-from commands.config_cmd import ConfigCommand
-from commands.monitoring import MonitoringCommand
-from utils.prerequisites import check_prerequisites
+# Command modules are imported on demand so commands that never call AWS skip boto3
+COMMANDS = {
+    'init': ('commands.init', 'InitCommand'),
+    'deploy': ('commands.deploy', 'DeployCommand'),
+    'status': ('commands.status', 'StatusCommand'),
+    'rollback': ('commands.rollback', 'RollbackCommand'),
+    'config': ('commands.config_cmd', 'ConfigCommand'),
+    'monitoring': ('commands.monitoring', 'MonitoringCommand')
+}
+
+
+def load_command(name):
+    """Import a command module and return its command class."""
+    module_name, class_name = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 def main():
     parser = argparse.ArgumentParser(description='GitHub Deploy Tool with GZIP Compressed Monitoring')
     parser.add_argument('command', choices=['init', 'deploy', 'status', 'rollback', 'config', 'check', 'monitoring'])
     parser.add_argument('subcommand', nargs='?', choices=['init', 'status', 'destroy', 'update'], help='Monitoring subcommand')
-    parser.add_argument('--env', default='dev', help='Environment (dev/staging/prod)')
+    parser.add_argument('--env', default='dev', help='Environment (dev/staging/prod), or a comma-separated list for deploy')
+    parser.add_argument('--all-envs', action='store_true', help='Deploy to every configured environment')
     parser.add_argument('--github-url', help='GitHub repository URL')
     parser.add_argument('--name', help='Project name')
     parser.add_argument('--env-file', help='Path to .env file')
@@ -33,35 +43,32 @@ def main():
     parser.add_argument('--set', help='Set config (key=value)')
     parser.add_argument('--list', action='store_true', help='List config')
     parser.add_argument('--deployment', type=int, help='Deployment index for rollback (1-based)')
+    parser.add_argument('--upload-workers', type=int, help='Number of concurrent S3 upload workers')
+    parser.add_argument('--full-upload', action='store_true', help='Upload every file, ignoring the delta-sync manifest')
+    parser.add_argument('--no-build-cache', action='store_true', help='Always run install and build, ignoring cached builds')
+    parser.add_argument('--force', action='store_true', help='Deploy even if the branch head is already live')
+    parser.add_argument('--compress', choices=['gzip', 'br'], help='Pre-compress text assets before upload')
+    parser.add_argument('--trace', metavar='FILE', help='Write a Chrome trace (JSON) of every deploy phase to FILE')
     
     args = parser.parse_args()
     
+    tracer = None
+    if args.trace:
+        from utils.tracing import start_tracing
+        tracer = start_tracing()
+    
     try:
         if args.command == 'check':
+            from utils.prerequisites import check_prerequisites
             check_prerequisites()
             
-        elif args.command == 'init':
-            command = InitCommand()
-            command.execute(args)
-            
         elif args.command == 'deploy':
-            command = DeployCommand()
-            command.execute(args)
+            command = load_command('deploy')()
+            if not command.execute(args):
+                sys.exit(1)
             
-        elif args.command == 'status':
-            command = StatusCommand()
-            command.execute(args)
-            
-        elif args.command == 'rollback':
-            command = RollbackCommand()
-            command.execute(args)
-            
-        elif args.command == 'monitoring':
-            command = MonitoringCommand()
-            command.execute(args)
-                
-        elif args.command == 'config':
-            command = ConfigCommand()
+        else:
+            command = load_command(args.command)()
             command.execute(args)
                 
     except KeyboardInterrupt:
@@ -70,6 +77,11 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if tracer:
+            tracer.save(args.trace)
+            print(f"Trace written to {args.trace} ({len(tracer.spans)} spans, "
+                  f"{tracer.counters.get('aws_api_calls', 0)} AWS API calls); open it in ui.perfetto.dev")
 
 
 if __name__ == '__main__':
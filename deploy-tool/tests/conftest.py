@@ -0,0 +1,29 @@
+"""Shared test fixtures."""
+
+import os
+import sys
+
+import pytest
+
+# The tool runs from the deploy-tool directory and imports its packages from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    """Point boto3 at fake credentials so no test can reach a real account."""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    for name in ('AWS_PROFILE', 'AWS_ENDPOINT_URL', 'AWS_ENDPOINT_URL_S3'):
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.fixture
+def aws_client(aws_credentials):
+    """Get an AWSClient backed by moto's in-memory S3."""
+    from moto import mock_aws
+    from core.aws_client import AWSClient
+    
+    with mock_aws():
+        yield AWSClient(profile=None, region='us-east-1', upload_workers=4, identity_cache=None)
@@ -0,0 +1,121 @@
+"""Tests for the local build artifact cache."""
+
+import argparse
+import json
+import os
+
+import pytest
+
+from commands.deploy import DeployCommand
+from core.artifact_cache import ArtifactCache
+
+COMMIT = 'a' * 40
+
+
+def make_build(path, files):
+    for name, body in files.items():
+        os.makedirs(os.path.dirname(os.path.join(path, name)), exist_ok=True)
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(body)
+    return str(path)
+
+
+def read_build(path):
+    return {os.path.relpath(os.path.join(root, name), path): open(os.path.join(root, name)).read()
+            for root, dirs, files in os.walk(path) for name in files}
+
+
+@pytest.fixture
+def project(tmp_path):
+    project_path = tmp_path / 'project'
+    project_path.mkdir()
+    (project_path / 'package-lock.json').write_text('{"lockfileVersion": 3}')
+    return project_path
+
+
+def compute_key(project, env_file=None, commit=COMMIT):
+    return ArtifactCache.compute_key(commit, str(project), 'npm run build', 'build', env_file and str(env_file))
+
+
+def test_key_changes_with_every_build_input(project, tmp_path):
+    env_file = tmp_path / 'dev.env'
+    env_file.write_text('API_URL=https://dev.example.com\n')
+    key = compute_key(project, env_file)
+    
+    assert compute_key(project, env_file) == key
+    assert compute_key(project, env_file, commit='b' * 40) != key
+    assert compute_key(project) != key
+    assert ArtifactCache.compute_key(COMMIT, str(project), 'npm run build:prod', 'build', str(env_file)) != key
+    
+    (project / 'package-lock.json').write_text('{"lockfileVersion": 3, "packages": {}}')
+    assert compute_key(project, env_file) != key
+    
+    # Editing the .env file in place is a different build, even at the same path
+    lockfile_key = compute_key(project, env_file)
+    env_file.write_text('API_URL=https://prod.example.com\n')
+    assert compute_key(project, env_file) != lockfile_key
+
+
+def test_restore_returns_the_stored_build(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    os.makedirs(cache.cache_dir)
+    build = make_build(tmp_path / 'build', {'index.html': '<html>a</html>', 'static/js/main.js': 'a'})
+    
+    assert cache.restore('key', str(tmp_path / 'restored')) is False
+    cache.store('key', build, COMMIT)
+    
+    # A stale build in the target is replaced, not merged with
+    stale = make_build(tmp_path / 'restored', {'index.html': 'stale', 'old.js': 'stale'})
+    assert cache.restore('key', stale) is True
+    assert read_build(stale) == read_build(build)
+    assert cache.restore('other', str(tmp_path / 'other')) is False
+
+
+def test_least_recently_used_builds_are_evicted_over_the_size_limit(tmp_path, monkeypatch):
+    # Room for two 400 KB builds
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_size_mb=1)
+    os.makedirs(cache.cache_dir)
+    clock = iter(range(100))
+    monkeypatch.setattr('core.artifact_cache.time.time', lambda: next(clock))
+    builds = {key: make_build(tmp_path / key, {'bundle.js': key * 400 * 1024}) for key in 'abc'}
+    
+    cache.store('a', builds['a'])
+    cache.store('b', builds['b'])
+    # Restoring a makes b the least recently used
+    assert cache.restore('a', str(tmp_path / 'restored'))
+    cache.store('c', builds['c'])
+    
+    with open(cache.index_file) as f:
+        assert set(json.load(f)) == {'a', 'c'}
+    assert not os.path.exists(os.path.join(cache.cache_dir, 'b'))
+    assert cache.restore('b', str(tmp_path / 'restored')) is False
+    assert cache.restore('c', str(tmp_path / 'restored'))
+
+
+def test_each_env_file_gets_its_own_cached_build(project, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False}
+    }))
+    builds = []
+    
+    def build_project(project_path, env_file_path, config):
+        with open(env_file_path) as f:
+            builds.append(f.read())
+        return make_build(os.path.join(project_path, 'build'), {'env.txt': builds[-1]})
+    
+    monkeypatch.setattr('commands.base.build_project', build_project)
+    command = DeployCommand()
+    args = argparse.Namespace(no_build_cache=False)
+    dev_env, prod_env = tmp_path / 'dev.env', tmp_path / 'prod.env'
+    dev_env.write_text('ENV=dev\n')
+    prod_env.write_text('ENV=prod\n')
+    
+    deployed = {}
+    for env_file in (dev_env, prod_env, dev_env, prod_env):
+        build_path = command.build_with_cache(args, str(project), COMMIT, str(env_file))
+        deployed.setdefault(env_file.name, []).append(read_build(build_path)['env.txt'])
+    
+    assert builds == ['ENV=dev\n', 'ENV=prod\n']
+    assert deployed == {'dev.env': ['ENV=dev\n'] * 2, 'prod.env': ['ENV=prod\n'] * 2}
@@ -0,0 +1,122 @@
+"""Tests for bucket provisioning, drift repair and trusted fingerprints."""
+
+import argparse
+import json
+import time
+
+import pytest
+
+from commands.deploy import DeployCommand
+from core.aws_client import get_s3_error_code
+
+
+@pytest.fixture
+def make_command(aws_client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'create_dockerfile': False,
+        'bucket_provisioning': {'trust_hours': 1}
+    }))
+    
+    def make(check='verify'):
+        command = DeployCommand()
+        command.aws_client = aws_client
+        command.config_manager.set('bucket_provisioning.check', check)
+        return command
+    
+    return make
+
+
+@pytest.fixture
+def bucket_calls(aws_client, monkeypatch):
+    """Record the checks ensure_s3_bucket makes against the bucket."""
+    calls = []
+    for name in ('_create_bucket_if_missing', '_find_bucket_drift', '_apply_bucket_configuration'):
+        method = getattr(aws_client, name)
+        monkeypatch.setattr(aws_client, name, lambda *args, _name=name, _method=method: calls.append(_name) or _method(*args))
+    return calls
+
+
+def test_new_bucket_is_created_and_its_fingerprint_stored(make_command, aws_client):
+    command = make_command()
+    
+    assert command.provision_bucket('dev', 'site') == 'http://site.s3-website.us-east-1.amazonaws.com'
+    
+    s3 = aws_client.get_s3_client()
+    assert s3.get_bucket_website(Bucket='site')['IndexDocument'] == {'Suffix': 'index.html'}
+    assert json.loads(s3.get_bucket_policy(Bucket='site')['Policy'])['Statement'][0]['Action'] == 's3:GetObject'
+    assert command.config_manager.get('bucket_state')['site']['fingerprint'] == aws_client.get_bucket_fingerprint('site')
+
+
+def test_verify_mode_reapplies_only_drifted_configuration(make_command, aws_client, bucket_calls, capsys):
+    make_command().provision_bucket('dev', 'site')
+    s3 = aws_client.get_s3_client()
+    s3.delete_bucket_website(Bucket='site')
+    bucket_calls.clear()
+    capsys.readouterr()
+    
+    make_command().provision_bucket('dev', 'site')
+    
+    assert 'drifted (website)' in capsys.readouterr().out
+    assert bucket_calls == ['_create_bucket_if_missing', '_find_bucket_drift', '_apply_bucket_configuration']
+    assert s3.get_bucket_website(Bucket='site')['IndexDocument'] == {'Suffix': 'index.html'}
+
+
+def test_trusted_fingerprint_skips_every_bucket_check(make_command, bucket_calls):
+    make_command().provision_bucket('dev', 'site')
+    bucket_calls.clear()
+    
+    make_command(check='trust').provision_bucket('dev', 'site')
+    
+    assert bucket_calls == []
+
+
+def test_expired_trust_checks_the_bucket_again(make_command, aws_client, bucket_calls):
+    command = make_command()
+    command.provision_bucket('dev', 'site')
+    aws_client.get_s3_client().delete_bucket_policy(Bucket='site')
+    # Verified two hours ago with a one hour trust window
+    command.config_manager.update({'site': {**command.config_manager.get('bucket_state')['site'],
+                                            'verified_at': time.time() - 7200}}, key='bucket_state')
+    bucket_calls.clear()
+    
+    command = make_command(check='trust')
+    command.provision_bucket('dev', 'site')
+    
+    assert bucket_calls == ['_create_bucket_if_missing', '_find_bucket_drift', '_apply_bucket_configuration']
+    assert aws_client.get_s3_client().get_bucket_policy(Bucket='site')
+    assert time.time() - command.config_manager.get('bucket_state')['site']['verified_at'] < 60
+
+
+def test_bucket_deleted_outside_the_tool_drops_its_trusted_state(make_command, aws_client, bucket_calls, tmp_path):
+    make_command().provision_bucket('dev', 'site')
+    aws_client.get_s3_client().delete_bucket(Bucket='site')
+    bucket_calls.clear()
+    command = make_command(check='trust')
+    
+    website_url = command.provision_bucket('dev', 'site')
+    assert bucket_calls == []
+    
+    build = tmp_path / 'build'
+    build.mkdir()
+    (build / 'index.html').write_text('<html></html>')
+    with pytest.raises(Exception):
+        command.publish_build(argparse.Namespace(compress=None, full_upload=False), 'dev', 'site', str(build),
+                              str(tmp_path), 'a' * 40, website_url=website_url)
+    assert command.config_manager.get('bucket_state')['site'] == {}
+    
+    # The next deploy checks the bucket and recreates it
+    make_command(check='trust').provision_bucket('dev', 'site')
+    assert bucket_calls[0] == '_create_bucket_if_missing'
+    assert aws_client.get_s3_client().head_bucket(Bucket='site')
+
+
+def test_failed_uploads_keep_the_s3_error_code(aws_client, tmp_path):
+    (tmp_path / 'index.html').write_text('<html></html>')
+    
+    with pytest.raises(Exception) as failure:
+        aws_client.upload_to_s3(str(tmp_path), 'missing-bucket')
+    
+    assert get_s3_error_code(failure.value) == 'NoSuchBucket'
@@ -0,0 +1,113 @@
+"""Tests for Cache-Control rule resolution and the headers uploads carry."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.cache_control import DEFAULT_CACHE_RULES, get_cache_rules, is_fingerprinted, resolve_cache_policy
+from utils.manifest import build_manifest
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+@pytest.mark.parametrize('file_name', [
+    'main.3f9a1c2b.js',
+    '2.4f6a8b1c.chunk.js',
+    'main.3f9a1c2b4d5e6f708192.css',
+    'index-BkX3a1c9.js',
+    'index-D-dUa_1x.js',
+    # Hashes made only of letters or only of digits
+    'index-BkXaQcZe.js',
+    'index-Cq_ZpLmW.css',
+    'main.12345678.js',
+])
+def test_content_hashes_are_fingerprinted(file_name):
+    assert is_fingerprinted(file_name)
+
+
+@pytest.mark.parametrize('file_name', [
+    'Roboto-Regular500.woff2',
+    'my-long-file-name2.js',
+    'jquery-3.6.0.min.js',
+    'bootstrap.bundle.min.js',
+    'main.3f9a1c.js',
+    'logo192.png',
+])
+def test_plain_names_are_not_fingerprinted(file_name):
+    assert not is_fingerprinted(file_name)
+
+
+@pytest.mark.parametrize('s3_path, cache_control', [
+    ('index.html', 'no-cache'),
+    ('health', 'no-cache, no-store, must-revalidate'),
+    ('sw.js', 'no-cache'),
+    ('static/js/main.3f9a1c2b.js', IMMUTABLE),
+    ('assets/index-BkX3a1c9.js', IMMUTABLE),
+    ('assets/index-BkXaQcZe.js', IMMUTABLE),
+    ('assets/index-Cq_ZpLmW.css', IMMUTABLE),
+    ('static/js/main.12345678.js', IMMUTABLE),
+    # Hash-like names outside the bundler output are copied public files
+    ('fonts/Roboto-Bold1234.woff2', 'public, max-age=3600'),
+    ('img/photo-20240115.jpg', 'public, max-age=3600'),
+    ('static/media/Roboto-Regular500.woff2', 'public, max-age=3600'),
+])
+def test_default_rules(s3_path, cache_control):
+    assert resolve_cache_policy(s3_path, DEFAULT_CACHE_RULES)['cache_control'] == cache_control
+
+
+def test_immutable_rule_sets_expiry():
+    assert resolve_cache_policy('static/js/main.3f9a1c2b.js', DEFAULT_CACHE_RULES)['expires_in'] == 31536000
+    assert 'expires_in' not in resolve_cache_policy('index.html', DEFAULT_CACHE_RULES)
+
+
+def test_first_matching_rule_wins():
+    rules = [
+        {'match': 'static/media/*', 'cache_control': 'public, max-age=86400'},
+        {'match': '*.jpg', 'cache_control': 'public, max-age=60'},
+        {'match': '*', 'cache_control': 'no-cache'},
+    ]
+    
+    assert resolve_cache_policy('static/media/photo.jpg', rules) == {'cache_control': 'public, max-age=86400'}
+    assert resolve_cache_policy('img/photo.jpg', rules) == {'cache_control': 'public, max-age=60'}
+    assert resolve_cache_policy('index.html', rules) == {'cache_control': 'no-cache'}
+    assert resolve_cache_policy('index.html', rules[:2]) == {}
+
+
+def test_environment_rules_override_global_rules():
+    env_rules = [{'match': '*', 'cache_control': 'no-store'}]
+    global_rules = [{'match': '*', 'cache_control': 'public, max-age=60'}]
+    config = {'cache_rules': global_rules, 'environments': {'dev': {'cache_rules': env_rules}, 'prod': {}}}
+    
+    assert get_cache_rules(config, 'dev') == env_rules
+    assert get_cache_rules(config, 'prod') == global_rules
+    assert get_cache_rules(config, 'staging') == global_rules
+
+
+def test_default_rules_apply_without_configuration():
+    assert get_cache_rules({}, 'dev') == DEFAULT_CACHE_RULES
+    assert get_cache_rules({'environments': {'dev': {}}}, 'dev') == DEFAULT_CACHE_RULES
+
+
+def test_upload_sets_cache_control_and_expires(aws_client, tmp_path):
+    (tmp_path / 'index.html').write_text('<html></html>')
+    (tmp_path / 'static' / 'js').mkdir(parents=True)
+    (tmp_path / 'static' / 'js' / 'main.3f9a1c2b.js').write_text('console.log(1)')
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG')
+    
+    s3 = aws_client.get_s3_client()
+    s3.create_bucket(Bucket='site')
+    files = build_manifest(str(tmp_path), cache_rules=get_cache_rules({}, 'dev'))
+    uploaded_at = datetime.now(timezone.utc)
+    
+    assert aws_client.upload_to_s3(str(tmp_path), 'site', files) == 3
+    
+    bundle = s3.head_object(Bucket='site', Key='static/js/main.3f9a1c2b.js')
+    assert bundle['CacheControl'] == IMMUTABLE
+    assert bundle['ContentType'] == 'application/javascript'
+    assert bundle['Expires'] - uploaded_at > timedelta(days=364)
+    
+    index = s3.head_object(Bucket='site', Key='index.html')
+    assert index['CacheControl'] == 'no-cache'
+    assert 'Expires' not in index
+    
+    assert s3.head_object(Bucket='site', Key='logo.png')['CacheControl'] == 'public, max-age=3600'
@@ -0,0 +1,74 @@
+"""Tests for build asset pre-compression."""
+
+import argparse
+import gzip
+import json
+import threading
+
+import pytest
+
+from commands.deploy import DeployCommand
+from utils import compression
+from utils.compression import compress_build_assets
+
+BUNDLE = 'function render() { return document.body; }\n' * 200
+
+
+@pytest.fixture
+def build(tmp_path):
+    build_path = tmp_path / 'build'
+    (build_path / 'static' / 'js').mkdir(parents=True)
+    (build_path / 'static' / 'js' / 'main.3f9a1c2b.js').write_text(BUNDLE)
+    (build_path / 'index.html').write_text('<html></html>')
+    (build_path / 'logo.png').write_bytes(b'\x89PNG' * 1000)
+    return build_path
+
+
+def test_text_assets_are_compressed_in_place(build):
+    assert compress_build_assets(str(build), 'gzip', min_size=1024) == {'static/js/main.3f9a1c2b.js': 'gzip'}
+    assert gzip.decompress((build / 'static' / 'js' / 'main.3f9a1c2b.js').read_bytes()).decode() == BUNDLE
+    # Below min_size, or not text
+    assert (build / 'index.html').read_text() == '<html></html>'
+    assert (build / 'logo.png').read_bytes() == b'\x89PNG' * 1000
+
+
+def test_compression_runs_on_threads_not_forked_processes(build, monkeypatch):
+    threads = set()
+    compress_asset = compression._compress_asset
+    monkeypatch.setattr(compression, '_compress_asset',
+                        lambda task: threads.add(threading.current_thread().name) or compress_asset(task))
+    
+    # A pool started from a pipeline worker thread, as the deploy pipeline does
+    worker = threading.Thread(target=compress_build_assets, args=(str(build), 'gzip'), kwargs={'workers': 2})
+    worker.start()
+    worker.join(timeout=30)
+    
+    assert not worker.is_alive()
+    assert threads and all(name.startswith('ThreadPoolExecutor') for name in threads)
+
+
+@pytest.fixture
+def command(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'environments': {'dev': {'bucket': 'dev-site'},
+                         'prod': {'bucket': 'prod-site', 'cdn_url': 'https://www.example.com'}}
+    }))
+    return DeployCommand()
+
+
+def test_brotli_falls_back_to_gzip_without_an_https_cdn(command, build, monkeypatch, capsys):
+    algorithms = []
+    monkeypatch.setattr('commands.base.compress_build_assets',
+                        lambda build_dir, algorithm, **kwargs: algorithms.append(algorithm) or {})
+    args = argparse.Namespace(compress='br')
+    
+    command.compress_assets(str(build), args, 'dev')
+    command.compress_assets(str(build), args, 'prod')
+    command.config_manager.set('environments.dev.cdn_url', 'http://cdn.example.com')
+    command.compress_assets(str(build), args, 'dev')
+    
+    assert algorithms == ['gzip', 'br', 'gzip']
+    assert 'No HTTPS cdn_url configured for dev' in capsys.readouterr().out
@@ -0,0 +1,77 @@
+"""Tests for locked, atomic config writes."""
+
+import os
+import subprocess
+import sys
+
+from core.config import ConfigManager
+
+PROCESSES = 6
+WRITES = 10
+
+# Each writer process saves WRITES changes from threads of its own, one save per change
+WRITER = """
+import sys
+import threading
+sys.path.insert(0, sys.argv[1])
+from core.config import ConfigManager
+
+process = int(sys.argv[2])
+config_manager = ConfigManager()
+threads = [
+    threading.Thread(target=config_manager.update, args=({f'p{process}-w{write}': write},), kwargs={'key': 'bucket_state'})
+    for write in range(int(sys.argv[3]))
+]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+config_manager.set(f'writers.p{process}', True)
+"""
+
+
+def test_concurrent_writers_across_processes_keep_every_change(tmp_path):
+    tool_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ConfigManager(str(tmp_path / '.deploy-config.json')).set('project_name', 'site')
+    
+    writers = [
+        subprocess.Popen([sys.executable, '-c', WRITER, tool_dir, str(process), str(WRITES)], cwd=tmp_path)
+        for process in range(PROCESSES)
+    ]
+    assert [writer.wait(timeout=60) for writer in writers] == [0] * PROCESSES
+    
+    config_manager = ConfigManager(str(tmp_path / '.deploy-config.json'))
+    assert config_manager.get('project_name') == 'site'
+    assert config_manager.get('bucket_state') == {
+        f'p{process}-w{write}': write for process in range(PROCESSES) for write in range(WRITES)
+    }
+    assert config_manager.get('writers') == {f'p{process}': True for process in range(PROCESSES)}
+    # Temp files are always renamed into place
+    assert sorted(os.listdir(tmp_path)) == ['.deploy-config.json', '.deploy-config.json.lock']
+
+
+def test_batch_writes_once(tmp_path, monkeypatch):
+    config_manager = ConfigManager(str(tmp_path / '.deploy-config.json'))
+    writes = []
+    write_atomic = config_manager._write_atomic
+    monkeypatch.setattr(config_manager, '_write_atomic', lambda config: writes.append(1) or write_atomic(config))
+    
+    with config_manager.batch():
+        config_manager.set('a.b', 1)
+        config_manager.update({'c': 2}, key='a')
+        assert config_manager.get('a') == {'b': 1, 'c': 2}
+        assert not os.path.exists(tmp_path / '.deploy-config.json')
+    
+    assert len(writes) == 1
+    assert ConfigManager(str(tmp_path / '.deploy-config.json')).get('a') == {'b': 1, 'c': 2}
+
+
+def test_save_merges_changes_written_by_another_process(tmp_path):
+    config_file = str(tmp_path / '.deploy-config.json')
+    first = ConfigManager(config_file)
+    second = ConfigManager(config_file)
+    
+    first.set('aws_region', 'us-east-1')
+    second.set('project_name', 'site')
+    
+    assert ConfigManager(config_file).config == {'aws_region': 'us-east-1', 'project_name': 'site'}
@@ -0,0 +1,184 @@
+"""Tests for skipping deploys that are already live and for multi-environment deploys."""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from commands.deploy import DeployCommand
+
+# Counts builds and bakes the build's .env into index.html
+STUB_NPM = """#!/bin/sh
+case "$1" in
+  --version) echo "10.2.4";;
+  run)
+    echo build >> "$BUILD_LOG"
+    mkdir -p build
+    { echo "<html>"; cat .env; echo "</html>"; } > build/index.html
+    ;;
+esac
+"""
+
+STUB_NODE = """#!/bin/sh
+echo "v20.11.0"
+"""
+
+pytestmark = pytest.mark.skipif(os.name == 'nt' or not shutil.which('git'), reason='needs git and a POSIX shell')
+
+
+def git(*args, cwd=None):
+    subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'package.json').write_text('{"name": "site", "scripts": {"build": "stub"}}')
+    git('init', '-q', '-b', 'master', cwd=source)
+    git('add', '.', cwd=source)
+    git('commit', '-q', '-m', 'Initial commit', cwd=source)
+    
+    bare = tmp_path / 'site.git'
+    git('clone', '-q', '--bare', str(source), str(bare))
+    git('remote', 'add', 'origin', str(bare), cwd=source)
+    return source
+
+
+def push_commit(repo, message):
+    (repo / 'CHANGELOG').write_text(message)
+    git('add', '.', cwd=repo)
+    git('commit', '-q', '-m', message, cwd=repo)
+    git('push', '-q', 'origin', 'master', cwd=repo)
+
+
+@pytest.fixture
+def env_files(tmp_path, monkeypatch, repo):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name, script in (('npm', STUB_NPM), ('node', STUB_NODE)):
+        (bin_dir / name).write_text(script)
+        (bin_dir / name).chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('BUILD_LOG', str(tmp_path / 'builds.log'))
+    monkeypatch.chdir(tmp_path)
+    
+    # dev and staging share a .env file, so they share a build
+    files = {'shared': tmp_path / 'shared.env', 'prod': tmp_path / 'prod.env'}
+    files['shared'].write_text('API_URL=https://api.example.com\n')
+    files['prod'].write_text('API_URL=https://prod.example.com\n')
+    
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'github_url': str(tmp_path / 'site.git'),
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'create_dockerfile': False,
+        'environments': {
+            'dev': {'bucket': 'dev-site', 'env_file_path': str(files['shared'])},
+            'staging': {'bucket': 'staging-site', 'env_file_path': str(files['shared'])},
+            'prod': {'bucket': 'prod-site', 'env_file_path': str(files['prod'])}
+        }
+    }))
+    return files
+
+
+@pytest.fixture
+def deploy(aws_client, env_files):
+    def run(env='dev', **options):
+        command = DeployCommand()
+        command.aws_client = aws_client
+        args = argparse.Namespace(env=env, all_envs=False, github_url=None, env_file=None, no_docker=False,
+                                  no_health_check=False, upload_workers=None, full_upload=False,
+                                  no_build_cache=True, force=False, compress=None)
+        vars(args).update(options)
+        return command.execute(args), command
+    
+    return run
+
+
+def build_count(tmp_path):
+    log = tmp_path / 'builds.log'
+    return len(log.read_text().split()) if log.exists() else 0
+
+
+def index_html(aws_client, bucket):
+    return aws_client.get_s3_client().get_object(Bucket=bucket, Key='index.html')['Body'].read().decode()
+
+
+def test_live_branch_head_is_not_deployed_again(deploy, aws_client, tmp_path, monkeypatch, capsys):
+    deployed, command = deploy()
+    assert deployed is True
+    assert 'api.example.com' in index_html(aws_client, 'dev-site')
+    
+    # ls-remote finds the live commit, so nothing is cloned or built
+    monkeypatch.setattr('core.git_operations.GitOperations.clone_repository',
+                        lambda *args, **kwargs: pytest.fail('an unchanged deploy should not clone'))
+    capsys.readouterr()
+    deployed, command = deploy()
+    
+    assert deployed is True
+    assert 'Nothing to deploy: master is at' in capsys.readouterr().out
+    assert command.history.count(environment='dev') == 1
+    assert build_count(tmp_path) == 1
+
+
+def test_new_commit_env_file_change_or_force_deploys_again(deploy, repo, env_files, tmp_path):
+    deploy()
+    
+    push_commit(repo, 'Second commit')
+    assert deploy()[0] is True
+    
+    env_files['shared'].write_text('API_URL=https://api2.example.com\n')
+    assert deploy()[0] is True
+    
+    deployed, command = deploy(force=True)
+    assert deployed is True
+    assert build_count(tmp_path) == 4
+    commits = [record['commit_hash'] for record in command.history.query(environment='dev')]
+    assert len(commits) == 4
+    assert commits[0] == commits[1] == commits[2] != commits[3]
+
+
+def test_environments_sharing_an_env_file_share_a_build(deploy, aws_client, tmp_path, capsys):
+    deployed, command = deploy('dev,staging,prod')
+    output = capsys.readouterr().out
+    
+    assert deployed is True
+    assert 'Building 2 variant(s) for 3 environment(s)' in output
+    assert build_count(tmp_path) == 2
+    assert 'api.example.com' in index_html(aws_client, 'dev-site')
+    assert 'api.example.com' in index_html(aws_client, 'staging-site')
+    assert 'prod.example.com' in index_html(aws_client, 'prod-site')
+    assert [command.history.count(environment=environment) for environment in ('dev', 'staging', 'prod')] == [1, 1, 1]
+    
+    # Every environment is already live, so the second run only reports them
+    deployed, command = deploy('dev,staging,prod')
+    output = capsys.readouterr().out
+    assert deployed is True
+    assert output.count('UNCHANGED') == 3
+    assert build_count(tmp_path) == 2
+
+
+def test_one_failing_environment_fails_the_run_but_not_the_others(deploy, aws_client, monkeypatch, capsys):
+    ensure_s3_bucket = aws_client.ensure_s3_bucket
+    
+    def fail_for_prod(bucket_name, **kwargs):
+        if bucket_name == 'prod-site':
+            raise Exception("Access denied")
+        return ensure_s3_bucket(bucket_name, **kwargs)
+    
+    monkeypatch.setattr(aws_client, 'ensure_s3_bucket', fail_for_prod)
+    
+    deployed, command = deploy('dev,staging,prod')
+    output = capsys.readouterr().out
+    
+    assert deployed is False
+    assert 'bucket:prod failed: Access denied' in output
+    assert '1 of 3 environment(s) failed: prod' in output
+    assert command.history.count(environment='dev') == 1
+    assert command.history.count(environment='staging') == 1
+    assert command.history.count(environment='prod') == 0
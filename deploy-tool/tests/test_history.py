@@ -0,0 +1,70 @@
+"""Tests for the SQLite deployment history."""
+
+import os
+import subprocess
+import sys
+
+from core.history import DeploymentHistory
+
+PROCESSES = 6
+
+# The deployments list from .deploy-config.json, newest first
+LEGACY = [
+    {'timestamp': '2024-01-03T00:00:00', 'environment': 'prod', 'status': 'success', 'commit_hash': 'c' * 40},
+    {'timestamp': '2024-01-02T00:00:00', 'environment': 'dev', 'status': 'failed', 'commit_hash': 'b' * 40},
+    {'timestamp': '2024-01-01T00:00:00', 'environment': 'dev', 'status': 'success', 'commit_hash': 'a' * 40},
+]
+
+# Reading the legacy list is slowed down so every process is inside the migration at once
+OPENER = """
+import sys
+import time
+sys.path.insert(0, sys.argv[1])
+from core.history import DeploymentHistory
+
+def legacy_records():
+    time.sleep(0.5)
+    return [{'timestamp': f'2024-01-0{day}T00:00:00', 'environment': 'dev', 'status': 'success'} for day in (3, 2, 1)]
+
+DeploymentHistory(sys.argv[2], legacy_records=legacy_records).count()
+"""
+
+
+def test_legacy_records_are_imported_once(tmp_path):
+    db_path = str(tmp_path / 'history.db')
+    calls = []
+    
+    def legacy_records():
+        calls.append(1)
+        return LEGACY
+    
+    DeploymentHistory(db_path, legacy_records=legacy_records).count()
+    history = DeploymentHistory(db_path, legacy_records=legacy_records)
+    
+    assert history.count() == 3
+    assert len(calls) == 1
+    assert [record['timestamp'] for record in history.query()] == [record['timestamp'] for record in LEGACY]
+
+
+def test_processes_opening_a_fresh_store_import_once(tmp_path):
+    tool_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    db_path = str(tmp_path / 'history.db')
+    
+    openers = [subprocess.Popen([sys.executable, '-c', OPENER, tool_dir, db_path]) for _ in range(PROCESSES)]
+    assert [opener.wait(timeout=60) for opener in openers] == [0] * PROCESSES
+    
+    assert DeploymentHistory(db_path).count() == 3
+
+
+def test_records_added_after_the_import_come_first(tmp_path):
+    history = DeploymentHistory(str(tmp_path / 'history.db'), legacy_records=lambda: LEGACY)
+    history.add({'timestamp': '2024-01-04T00:00:00', 'environment': 'dev', 'status': 'success',
+                 'commit_hash': 'd' * 40})
+    
+    assert history.latest('dev')['commit_hash'] == 'd' * 40
+    assert history.latest('prod')['commit_hash'] == 'c' * 40
+    assert history.latest('staging') is None
+    assert history.count(environment='dev', status='success') == 2
+    assert [record['commit_hash'] for record in history.query(environment='dev', limit=2, offset=1)] == \
+        ['b' * 40, 'a' * 40]
+    assert [record['timestamp'] for record in history.query(commit='aaaa')] == ['2024-01-01T00:00:00']
@@ -0,0 +1,127 @@
+"""Tests for the cached AWS caller identity."""
+
+import hashlib
+import json
+import os
+
+import pytest
+
+from core import identity_cache
+from core.aws_client import AWSClient
+from core.identity_cache import EXPIRY_MARGIN, IdentityCache
+
+IDENTITY = {'Account': '123456789012', 'Arn': 'arn:aws:sts::123456789012:assumed-role/dev/me', 'UserId': 'AROA:me'}
+
+AWS_CONFIG = '''[profile sso-dev]
+sso_session = company
+sso_account_id = 123456789012
+sso_role_name = dev
+
+[profile legacy-sso]
+sso_start_url = https://company.awsapps.com/start
+sso_region = us-east-1
+
+[profile static]
+region = us-east-1
+'''
+
+# 2024-05-01T12:00:00Z
+TOKEN_EXPIRY = 1714564800.0
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(tmp_path / '.aws' / 'config'))
+    for name in ('AWS_PROFILE', 'AWS_ACCESS_KEY_ID'):
+        monkeypatch.delenv(name, raising=False)
+    (tmp_path / '.aws' / 'sso' / 'cache').mkdir(parents=True)
+    (tmp_path / '.aws' / 'config').write_text(AWS_CONFIG)
+    return tmp_path
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [TOKEN_EXPIRY - 3600]
+    monkeypatch.setattr(identity_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def write_token(home, cache_key, expires_at):
+    """Write the SSO token file the AWS CLI names after sha1(sso_session or start URL)."""
+    token_name = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+    (home / '.aws' / 'sso' / 'cache' / f"{token_name}.json").write_text(json.dumps({'expiresAt': expires_at}))
+
+
+def test_token_file_is_found_by_sso_session_or_start_url(home):
+    cache = IdentityCache(str(home / 'cache'))
+    write_token(home, 'company', '2024-05-01T12:00:00Z')
+    write_token(home, 'https://company.awsapps.com/start', '2024-05-01T13:00:00UTC')
+    
+    assert cache.get_sso_token_expiry('sso-dev') == TOKEN_EXPIRY
+    assert cache.get_sso_token_expiry('legacy-sso') == TOKEN_EXPIRY + 3600
+    # Profiles without SSO have no token; SSO profiles that never logged in have an expired one
+    assert cache.get_sso_token_expiry('static') is None
+    assert cache.get_sso_token_expiry('missing') is None
+    (home / '.aws' / 'config').write_text('[default]\nsso_session = other\n')
+    assert cache.get_sso_token_expiry(None) == 0
+
+
+def test_sso_identity_is_trusted_until_the_expiry_margin(home, clock):
+    cache = IdentityCache(str(home / 'cache'), ttl=60)
+    write_token(home, 'company', '2024-05-01T12:00:00Z')
+    
+    assert cache.store('sso-dev', 'us-east-1', IDENTITY)['expires_at'] == TOKEN_EXPIRY
+    assert cache.load('sso-dev', 'us-east-1')['account'] == IDENTITY['Account']
+    assert cache.load('sso-dev', 'eu-west-1') is None
+    
+    # SSO identities follow the token, not the TTL
+    clock[0] = TOKEN_EXPIRY - EXPIRY_MARGIN - 1
+    assert cache.load('sso-dev', 'us-east-1') is not None
+    clock[0] = TOKEN_EXPIRY - EXPIRY_MARGIN
+    assert cache.load('sso-dev', 'us-east-1') is None
+
+
+def test_new_sso_login_invalidates_the_cached_identity(home, clock):
+    cache = IdentityCache(str(home / 'cache'))
+    write_token(home, 'company', '2024-05-01T12:00:00Z')
+    cache.store('sso-dev', 'us-east-1', IDENTITY)
+    
+    write_token(home, 'company', '2024-05-01T20:00:00Z')
+    assert cache.load('sso-dev', 'us-east-1') is None
+    
+    (home / '.aws' / 'sso' / 'cache' / f"{hashlib.sha1(b'company').hexdigest()}.json").unlink()
+    assert cache.load('sso-dev', 'us-east-1') is None
+
+
+def test_env_var_credentials_fall_back_to_the_ttl(home, clock, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'AKIAEXAMPLE')
+    cache = IdentityCache(str(home / 'cache'), ttl=900)
+    
+    entry = cache.store('sso-dev', 'us-east-1', IDENTITY)
+    assert entry['token_expires_at'] is None
+    assert entry['expires_at'] == clock[0] + 900
+    
+    clock[0] += 899
+    assert cache.load('sso-dev', 'us-east-1') is not None
+    clock[0] += 1
+    assert cache.load('sso-dev', 'us-east-1') is None
+    
+    # Other keys in the environment are another caller
+    clock[0] -= 1
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'AKIAOTHER')
+    assert cache.load('sso-dev', 'us-east-1') is None
+
+
+def test_cached_identity_skips_sts(home, clock):
+    cache = IdentityCache(str(home / 'cache'))
+    write_token(home, 'company', '2024-05-01T12:00:00Z')
+    cache.store('sso-dev', 'us-east-1', IDENTITY)
+    aws_client = AWSClient(profile='sso-dev', region='us-east-1', identity_cache=cache)
+    aws_client.get_boto3_session = lambda: pytest.fail('the cached identity should have been used')
+    
+    assert aws_client.check_sso_login() is True
+    
+    cache.clear('sso-dev', 'us-east-1')
+    assert not os.listdir(home / 'cache')
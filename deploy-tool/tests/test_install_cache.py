@@ -0,0 +1,125 @@
+"""Tests for package cache counting and the install hit rate."""
+
+import json
+import os
+
+import pytest
+
+from utils.build import count_cache_entries, count_locked_packages, install_dependencies
+
+YARN_LOCK = '''# THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+# yarn lockfile v1
+
+
+"@babel/runtime@^7.0.0", "@babel/runtime@^7.12.5":
+  version "7.23.2"
+  resolved "https://registry.yarnpkg.com/@babel/runtime/-/runtime-7.23.2.tgz"
+  dependencies:
+    regenerator-runtime "^0.14.0"
+
+js-tokens@^4.0.0:
+  version "4.0.0"
+
+regenerator-runtime@^0.14.0:
+  version "0.14.0"
+'''
+
+PNPM_LOCK = '''lockfileVersion: '6.0'
+
+dependencies:
+  react:
+    specifier: ^18.2.0
+    version: 18.2.0
+
+packages:
+
+  /js-tokens@4.0.0:
+    resolution: {integrity: sha512-abc}
+    dev: false
+
+  /loose-envify@1.4.0:
+    resolution: {integrity: sha512-def}
+    hasBin: true
+    dependencies:
+      js-tokens: 4.0.0
+
+  /react@18.2.0:
+    resolution: {integrity: sha512-ghi}
+'''
+
+# Stub package managers: each "downloads" the packages listed in $PACKAGES into its cache unless already there
+STUB = '''#!/bin/sh
+cache=""
+while [ $# -gt 0 ]; do
+  case "$1" in --cache-folder|--store-dir) cache="$2"; shift;; esac
+  shift
+done
+for package in $PACKAGES; do
+  case "$(basename "$0")" in
+    yarn) mkdir -p "$cache/v6/npm-$package-1.0.0-abc-integrity";;
+    pnpm) mkdir -p "$cache/v3/files/00" && touch "$cache/v3/files/00/$package-index.json" "$cache/v3/files/00/$package-content";;
+  esac
+done
+'''
+
+
+def test_yarn_counts_one_entry_per_cached_package_version(tmp_path):
+    for name in ('npm-react-18.2.0-abc-integrity', 'npm-js-tokens-4.0.0-def-integrity', '.tmp'):
+        (tmp_path / 'v6' / name / 'node_modules').mkdir(parents=True)
+    (tmp_path / 'v6' / '.tmp' / 'partial').write_text('')
+    
+    assert count_cache_entries(str(tmp_path), 'yarn') == 2
+
+
+def test_pnpm_counts_index_entries_not_content_files(tmp_path):
+    files = tmp_path / 'v3' / 'files' / '0a'
+    files.mkdir(parents=True)
+    for name in ('1f2e-index.json', '3c4d-index.json', '5e6f', '7a8b', '9c0d-exec'):
+        (files / name).write_text('')
+    index = tmp_path / 'v10' / 'index' / 'ab'
+    index.mkdir(parents=True)
+    (index / 'abcd-react@18.2.0.json').write_text('')
+    
+    assert count_cache_entries(str(tmp_path), 'pnpm') == 3
+
+
+def test_lockfiles_give_the_number_of_locked_packages(tmp_path):
+    (tmp_path / 'yarn.lock').write_text(YARN_LOCK)
+    (tmp_path / 'pnpm-lock.yaml').write_text(PNPM_LOCK)
+    (tmp_path / 'package-lock.json').write_text(json.dumps({
+        'lockfileVersion': 3, 'packages': {'': {}, 'node_modules/react': {}, 'node_modules/js-tokens': {}}
+    }))
+    
+    assert count_locked_packages(str(tmp_path), 'yarn') == 3
+    assert count_locked_packages(str(tmp_path), 'pnpm') == 3
+    assert count_locked_packages(str(tmp_path), 'npm') == 2
+    assert count_locked_packages(str(tmp_path / 'missing'), 'yarn') is None
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='stub package managers are shell scripts')
+@pytest.mark.parametrize('manager, lockfile, contents', [
+    ('yarn', 'yarn.lock', YARN_LOCK),
+    ('pnpm', 'pnpm-lock.yaml', PNPM_LOCK),
+])
+def test_repeated_installs_report_the_cache_hit_rate(tmp_path, monkeypatch, capsys, manager, lockfile, contents):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    (bin_dir / manager).write_text(STUB)
+    (bin_dir / manager).chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / lockfile).write_text(contents)
+    config = {'cache_dir': str(tmp_path / 'cache')}
+    
+    # The first install downloads all three packages, a later one only the package added since
+    monkeypatch.setenv('PACKAGES', 'a b c')
+    install_dependencies(str(project), config)
+    monkeypatch.setenv('PACKAGES', 'a b c d')
+    install_dependencies(str(project), config)
+    
+    output = capsys.readouterr().out
+    assert 'Package cache hit rate: 0% (3 packages, 3 new cache entries)' in output
+    assert 'Package cache hit rate: 67% (3 packages, 1 new cache entries)' in output
+    with open(os.path.join(config['cache_dir'], 'packages', 'install-stats.json')) as f:
+        assert [(entry['manager'], entry['hit_rate']) for entry in json.load(f)] == [(manager, 0.0), (manager, 0.667)]
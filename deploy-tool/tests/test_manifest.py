@@ -0,0 +1,54 @@
+"""Tests for the delta-sync manifest stored in the bucket."""
+
+from utils.manifest import build_manifest, diff_manifests, manifest_document, trusted_manifest
+
+FILES = {'index.html': {'hash': 'a', 'size': 10, 'content_type': 'text/html'}}
+
+
+def test_manifest_round_trips_through_the_bucket(aws_client):
+    aws_client.get_s3_client().create_bucket(Bucket='site')
+    assert aws_client.load_manifest('site', 'dev') is None
+    
+    document = manifest_document('site', FILES, 'abc123')
+    aws_client.save_manifest('site', 'dev', document)
+    assert aws_client.load_manifest('site', 'dev') == document
+    
+    aws_client.delete_manifest('site', 'dev')
+    assert aws_client.load_manifest('site', 'dev') is None
+
+
+def test_manifest_matching_the_live_deployment_is_trusted():
+    document = manifest_document('site', FILES, 'abc123', 'releases/abc123-1')
+    live = {'bucket': 'site', 'commit_hash': 'abc123', 'release': 'releases/abc123-1'}
+    
+    assert trusted_manifest(document, 'site', live) == (FILES, 'releases/abc123-1')
+
+
+def test_manifest_without_a_local_record_is_trusted():
+    document = manifest_document('site', FILES, 'abc123')
+    
+    assert trusted_manifest(document, 'site', None) == (FILES, None)
+
+
+def test_manifest_from_another_deployment_is_not_trusted():
+    document = manifest_document('site', FILES, 'abc123')
+    live = {'bucket': 'site', 'commit_hash': 'def456', 'release': None}
+    
+    assert trusted_manifest(document, 'site', live) == ({}, None)
+
+
+def test_manifest_for_another_bucket_is_not_trusted():
+    assert trusted_manifest(manifest_document('old-site', FILES, 'abc123'), 'site') == ({}, None)
+    assert trusted_manifest(None, 'site') == ({}, None)
+
+
+def test_untrusted_manifest_uploads_every_file(tmp_path):
+    (tmp_path / 'index.html').write_text('<html></html>')
+    (tmp_path / 'app.js').write_text('console.log(1)')
+    manifest = build_manifest(str(tmp_path))
+    
+    stale = manifest_document('site', manifest, 'abc123')
+    previous, _ = trusted_manifest(stale, 'site', {'bucket': 'site', 'commit_hash': 'def456'})
+    
+    assert diff_manifests(previous, manifest) == manifest
+    assert diff_manifests(manifest, manifest) == {}
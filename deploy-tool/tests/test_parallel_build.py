@@ -0,0 +1,103 @@
+"""Tests that clones and builds can run side by side in one process."""
+
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.git_operations import GitOperations
+from utils.build import build_project
+
+JOBS = 6
+
+# Records what each build saw: its .env, its working directory and $PWD
+STUB_NPM = """#!/bin/sh
+case "$1" in
+  run)
+    sleep 0.2
+    mkdir -p build
+    cp .env build/env.txt
+    pwd > build/pwd.txt
+    echo "$PWD" > build/env_pwd.txt
+    ;;
+esac
+"""
+
+pytestmark = pytest.mark.skipif(os.name == 'nt' or not shutil.which('git'), reason='needs git and a POSIX shell')
+
+
+def git(*args, cwd=None):
+    subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def bare_repo(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'package.json').write_text('{"name": "site", "scripts": {"build": "stub"}}')
+    git('init', '-q', '-b', 'master', cwd=source)
+    git('add', '.', cwd=source)
+    git('commit', '-q', '-m', 'Initial commit', cwd=source)
+    
+    bare = tmp_path / 'site.git'
+    git('clone', '-q', '--bare', str(source), str(bare))
+    return str(bare)
+
+
+@pytest.fixture
+def stub_npm(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    npm = bin_dir / 'npm'
+    npm.write_text(STUB_NPM)
+    npm.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_parallel_clones_and_builds_do_not_interfere(tmp_path, bare_repo, stub_npm):
+    config = {'cache_dir': str(tmp_path / 'cache')}
+    git_ops = GitOperations(mirror_dir=str(tmp_path / 'cache' / 'git'))
+    start_dir = os.getcwd()
+    seen_dirs = set()
+    done = threading.Event()
+    
+    def watch_cwd():
+        while not done.is_set():
+            seen_dirs.add(os.getcwd())
+            done.wait(0.005)
+    
+    def job(index):
+        env_file = tmp_path / f"{index}.env"
+        env_file.write_text(f"JOB={index}\n")
+        project_path, commit_hash = git_ops.clone_repository(bare_repo)
+        build_path = build_project(project_path, str(env_file), config)
+        return project_path, commit_hash, build_path
+    
+    watcher = threading.Thread(target=watch_cwd)
+    watcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=JOBS) as executor:
+            results = list(executor.map(job, range(JOBS)))
+    finally:
+        done.set()
+        watcher.join()
+    
+    assert seen_dirs == {start_dir}
+    assert os.getcwd() == start_dir
+    assert len({project_path for project_path, _, _ in results}) == JOBS
+    assert len({commit_hash for _, commit_hash, _ in results}) == 1
+    
+    for index, (project_path, _, build_path) in enumerate(results):
+        assert build_path == os.path.join(project_path, 'build')
+        with open(os.path.join(build_path, 'env.txt')) as f:
+            assert f.read() == f"JOB={index}\n"
+        for name in ('pwd.txt', 'env_pwd.txt'):
+            with open(os.path.join(build_path, name)) as f:
+                assert os.path.realpath(f.read().strip()) == os.path.realpath(project_path)
+    
+    git_ops.cleanup_temp_dir()
+    assert not any(os.path.exists(project_path) for project_path, _, _ in results)
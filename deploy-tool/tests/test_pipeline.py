@@ -0,0 +1,89 @@
+"""Tests for the deploy stage scheduler."""
+
+import threading
+import time
+
+import pytest
+
+from utils.pipeline import Pipeline, require
+
+
+def timed(seconds, result=None, log=None, name=None):
+    def stage():
+        if log is not None:
+            log.append(f"start {name}")
+        time.sleep(seconds)
+        if log is not None:
+            log.append(f"end {name}")
+        return result
+    
+    return stage
+
+
+def test_stages_start_only_after_their_dependencies():
+    log = []
+    pipeline = Pipeline()
+    pipeline.add_stage('clone', timed(0.05, 'checkout', log, 'clone'))
+    pipeline.add_stage('sso', timed(0.01, True, log, 'sso'))
+    pipeline.add_stage('build', lambda: pipeline.result('clone') + '/build', ['clone'])
+    pipeline.add_stage('bucket', timed(0.01, 'url', log, 'bucket'), ['sso'])
+    pipeline.add_stage('publish', lambda: log.append('publish') or (pipeline.result('build'), pipeline.result('bucket')),
+                       ['build', 'bucket'])
+    
+    assert pipeline.run() is True
+    
+    assert pipeline.result('publish') == ('checkout/build', 'url')
+    assert log.index('end sso') < log.index('start bucket')
+    assert log.index('end clone') < log.index('publish')
+    assert log.index('end bucket') < log.index('publish')
+    assert set(pipeline.timings()) == {'clone', 'sso', 'build', 'bucket', 'publish'}
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(3, timeout=5)
+    pipeline = Pipeline()
+    for name in ('prerequisites', 'sso', 'clone'):
+        pipeline.add_stage(name, barrier.wait)
+    
+    # Each stage waits for the other two, so they only finish if they run at once
+    assert pipeline.run() is True
+
+
+def test_a_failed_stage_skips_everything_that_depends_on_it():
+    ran = []
+    pipeline = Pipeline()
+    pipeline.add_stage('prerequisites', require(lambda: False, "Prerequisites check failed"))
+    pipeline.add_stage('clone', lambda: ran.append('clone'))
+    pipeline.add_stage('build', lambda: ran.append('build'), ['prerequisites', 'clone'])
+    pipeline.add_stage('publish', lambda: ran.append('publish'), ['build'])
+    
+    assert pipeline.run() is False
+    
+    assert ran == ['clone']
+    assert [stage.name for stage in pipeline.failed_stages()] == ['prerequisites']
+    assert str(pipeline.failed_stages()[0].error) == "Prerequisites check failed"
+    assert {name: stage.status for name, stage in pipeline.stages.items()} == {
+        'prerequisites': 'failed', 'clone': 'done', 'build': 'skipped', 'publish': 'skipped'
+    }
+
+
+def test_critical_path_follows_the_slowest_dependencies(capsys):
+    pipeline = Pipeline()
+    pipeline.add_stage('prerequisites', timed(0.01))
+    pipeline.add_stage('sso', timed(0.01))
+    pipeline.add_stage('clone', timed(0.1))
+    pipeline.add_stage('build', timed(0.05), ['prerequisites', 'clone'])
+    pipeline.add_stage('bucket', timed(0.01), ['prerequisites', 'sso'])
+    pipeline.add_stage('publish', timed(0.01), ['build', 'bucket'])
+    
+    pipeline.run()
+    
+    assert [stage.name for stage in pipeline.critical_path()] == ['clone', 'build', 'publish']
+    pipeline.print_timings()
+    assert 'Critical path: clone' in capsys.readouterr().out
+
+
+def test_unknown_dependencies_are_rejected():
+    pipeline = Pipeline()
+    with pytest.raises(ValueError, match="unknown stage 'clone'"):
+        pipeline.add_stage('build', lambda: None, ['clone'])
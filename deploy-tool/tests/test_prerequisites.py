@@ -0,0 +1,43 @@
+"""Tests for the prerequisites check."""
+
+import os
+
+import pytest
+
+from utils.prerequisites import check_prerequisites, get_tool_version
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason='stub tools are shell scripts')
+
+
+@pytest.fixture
+def tools_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    
+    def add_tool(name, version):
+        tool = tmp_path / name
+        tool.write_text(f'#!/bin/sh\n[ "$1" = "--version" ] && echo "{version}" && exit 0\nexit 1\n')
+        tool.chmod(0o755)
+    
+    return add_tool
+
+
+def test_versions_come_from_the_resolved_executables(tools_dir, capsys):
+    tools_dir('node', 'v20.11.0')
+    tools_dir('npm', '10.2.4')
+    tools_dir('git', 'git version 2.43.0')
+    
+    assert get_tool_version('node') == 'v20.11.0'
+    assert check_prerequisites() is True
+    output = capsys.readouterr().out
+    assert 'Node.js: v20.11.0' in output
+    assert 'npm: 10.2.4' in output
+    assert 'Git: git version 2.43.0' in output
+
+
+def test_missing_tool_fails_the_check(tools_dir, capsys):
+    tools_dir('node', 'v20.11.0')
+    tools_dir('npm', '10.2.4')
+    
+    assert get_tool_version('git') is None
+    assert check_prerequisites() is False
+    assert 'Git: Not found' in capsys.readouterr().out
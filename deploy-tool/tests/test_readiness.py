@@ -0,0 +1,98 @@
+"""Tests for readiness polling of the monitoring services."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from commands.monitoring import MonitoringCommand
+from utils import readiness
+from utils.readiness import probe_endpoint, wait_until_ready
+
+
+@pytest.fixture
+def server():
+    """Serve /ready with 200, /starting with 503 until its fourth request, and /down with 503."""
+    requests = {}
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests[self.path] = requests.get(self.path, 0) + 1
+            ready = self.path == '/ready' or (self.path == '/starting' and requests[self.path] >= 4)
+            self.send_response(200 if ready else 503)
+            self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", requests
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_probe_reports_only_2xx_as_ready(server):
+    base_url, _ = server
+    
+    assert probe_endpoint(f"{base_url}/ready")
+    assert not probe_endpoint(f"{base_url}/down")
+    assert not probe_endpoint('http://127.0.0.1:1/ready')
+    assert not probe_endpoint('http://None:3000/api/health', timeout=1)
+
+
+def test_waits_with_exponential_backoff_until_every_endpoint_is_ready(server, monkeypatch):
+    base_url, requests = server
+    sleeps = []
+    monkeypatch.setattr(readiness.time, 'sleep', sleeps.append)
+    
+    ready, pending = wait_until_ready({'Prometheus': f"{base_url}/ready", 'Grafana': f"{base_url}/starting"},
+                                      timeout=60, initial_delay=1, max_delay=3)
+    
+    assert pending == []
+    assert set(ready) == {'Prometheus', 'Grafana'}
+    assert sleeps == [1, 2, 3]
+    # A ready endpoint is not polled again
+    assert requests == {'/ready': 1, '/starting': 4}
+
+
+def test_gives_up_at_the_deadline(server):
+    base_url, _ = server
+    started = time.monotonic()
+    
+    ready, pending = wait_until_ready({'Prometheus': f"{base_url}/ready", 'Grafana': f"{base_url}/down"},
+                                      timeout=0.5, initial_delay=0.1, max_delay=0.2)
+    
+    assert pending == ['Grafana']
+    assert list(ready) == ['Prometheus']
+    assert 0.5 <= time.monotonic() - started < 2
+
+
+def test_monitoring_init_accepts_readiness_settings_set_from_the_cli(tmp_path, monkeypatch):
+    # config --set stores every value as a string
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'project_name': 'site',
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'monitoring_readiness': {'timeout_seconds': '120', 'max_interval_seconds': '15'}
+    }))
+    answers = iter(['', 'yes'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    waits = []
+    monkeypatch.setattr('commands.monitoring.wait_until_ready',
+                        lambda endpoints, **kwargs: waits.append(kwargs) or ({name: 0.0 for name in endpoints}, []))
+    
+    command = MonitoringCommand()
+    command.history.add({'timestamp': '2024-01-01T00:00:00', 'environment': 'dev', 'status': 'success',
+                         'url': 'http://site.example'})
+    monkeypatch.setattr(command.aws_client, 'check_sso_login', lambda: True)
+    monkeypatch.setattr(command, '_create_monitoring_instance', lambda *args: ('i-0123456789', '203.0.113.10'))
+    
+    assert command._init_monitoring() is True
+    assert waits == [{'timeout': 120.0, 'max_delay': 15.0}]
+    assert command.config_manager.get('monitoring.ready') is True
+    assert command.config_manager.get('monitoring.grafana_url') == 'http://203.0.113.10:3000'
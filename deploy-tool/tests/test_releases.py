@@ -0,0 +1,145 @@
+"""Tests for release activation and retention."""
+
+import argparse
+import json
+from datetime import datetime
+
+import pytest
+
+from commands.rollback import RollbackCommand
+from utils.manifest import manifest_document
+
+
+def put_release(s3, release, files):
+    for name, body in files.items():
+        s3.put_object(Bucket='site', Key=f"{release}/{name}", Body=body)
+
+
+@pytest.fixture
+def s3(aws_client):
+    client = aws_client.get_s3_client()
+    client.create_bucket(Bucket='site')
+    return client
+
+
+def test_activation_serves_the_release_from_the_root(aws_client, s3):
+    put_release(s3, 'releases/aaaaaaaa-20240101000000', {
+        'index.html': b'<html>a</html>', 'health': b'{}', 'robots.txt': b'', 'static/js/main.3f9a1c2b.js': b'a'
+    })
+    put_release(s3, 'releases/bbbbbbbb-20240102000000', {
+        'index.html': b'<html>b</html>', 'health': b'{}', 'static/js/main.4e8b2d3c.js': b'b'
+    })
+    
+    aws_client.activate_release('site', 'releases/aaaaaaaa-20240101000000')
+    aws_client.activate_release('site', 'releases/bbbbbbbb-20240102000000')
+    
+    assert s3.get_object(Bucket='site', Key='index.html')['Body'].read() == b'<html>b</html>'
+    root_files = [obj['Key'] for obj in s3.list_objects_v2(Bucket='site', Delimiter='/')['Contents']]
+    assert sorted(root_files) == ['health', 'index.html']
+    # Assets are served directly, and open tabs of the old release can still load theirs
+    assert s3.get_object(Bucket='site', Key='static/js/main.4e8b2d3c.js')['Body'].read() == b'b'
+    assert s3.get_object(Bucket='site', Key='static/js/main.3f9a1c2b.js')['Body'].read() == b'a'
+
+
+def test_index_html_is_written_last(aws_client, s3, monkeypatch):
+    put_release(s3, 'releases/aaaaaaaa-20240101000000', {
+        'index.html': b'<html>a</html>', 'sw.js': b'', 'static/js/main.3f9a1c2b.js': b'a'
+    })
+    writes = []
+    copy_objects = aws_client.copy_objects
+    monkeypatch.setattr(aws_client, 'copy_objects', lambda bucket_name, copies, **kwargs:
+                        copy_objects(bucket_name, [writes.append(target) or (source, target, size)
+                                                   for source, target, size in copies], **kwargs))
+    
+    aws_client.activate_release('site', 'releases/aaaaaaaa-20240101000000')
+    
+    assert writes == ['static/js/main.3f9a1c2b.js', 'sw.js', 'index.html']
+
+
+def test_reactivation_copies_only_missing_assets(aws_client, s3, capsys):
+    put_release(s3, 'releases/aaaaaaaa-20240101000000', {'index.html': b'a', 'assets/index-BkX3a1c9.js': b'a'})
+    put_release(s3, 'releases/bbbbbbbb-20240102000000', {'index.html': b'b', 'assets/index-Cq_ZpLmW.js': b'b'})
+    
+    aws_client.activate_release('site', 'releases/aaaaaaaa-20240101000000')
+    aws_client.activate_release('site', 'releases/bbbbbbbb-20240102000000')
+    capsys.readouterr()
+    aws_client.activate_release('site', 'releases/aaaaaaaa-20240101000000')
+    
+    assert '0 assets staged' in capsys.readouterr().out
+    assert s3.get_object(Bucket='site', Key='index.html')['Body'].read() == b'a'
+
+
+def test_release_directories_may_not_shadow_managed_prefixes(aws_client, s3):
+    put_release(s3, 'releases/aaaaaaaa-20240101000000', {'index.html': b'a', 'releases/notes.txt': b''})
+    
+    with pytest.raises(Exception, match='clash'):
+        aws_client.activate_release('site', 'releases/aaaaaaaa-20240101000000')
+
+
+def test_activating_a_missing_release_fails(aws_client, s3):
+    with pytest.raises(Exception, match='empty or missing'):
+        aws_client.activate_release('site', 'releases/cccccccc-20240103000000')
+
+
+def test_prune_keeps_the_newest_and_the_active_release(aws_client, s3):
+    releases = [f"releases/{commit * 8}-2024010{day}000000" for commit, day in zip('abcde', range(1, 6))]
+    for release in releases:
+        put_release(s3, release, {'index.html': b'<html></html>', f"static/js/main.{release[9:17]}.js": b''})
+        aws_client.activate_release('site', release)
+        aws_client.save_manifest('site', 'dev', manifest_document('site', {}, release[9:17], release))
+    
+    # The oldest release is live again after a rollback
+    aws_client.activate_release('site', releases[0])
+    assert aws_client.prune_releases('site', 2, active_release=releases[0]) == 2
+    
+    for release in releases:
+        kept = release in (releases[0], releases[3], releases[4])
+        assert aws_client.release_exists('site', release) == kept
+        assert (aws_client.load_release_manifest('site', release) is not None) == kept
+    # Root assets of the pruned releases go with them
+    root_assets = [obj['Key'] for obj in s3.list_objects_v2(Bucket='site', Prefix='static/')['Contents']]
+    assert sorted(root_assets) == ['static/js/main.aaaaaaaa.js', 'static/js/main.dddddddd.js',
+                                   'static/js/main.eeeeeeee.js']
+
+
+def test_rollback_to_a_release_restores_its_manifest(aws_client, s3, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'deploy_strategy': 'release',
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'create_dockerfile': False
+    }))
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'yes')
+    # Release names carry the second they were made in
+    seconds = iter(range(10))
+    monkeypatch.setattr('commands.base.datetime', type('Clock', (), {
+        'now': staticmethod(lambda: datetime(2024, 1, 1, 0, 0, next(seconds)))
+    }))
+    
+    command = RollbackCommand()
+    command.aws_client = aws_client
+    monkeypatch.setattr(aws_client, 'check_sso_login', lambda: True)
+    publish_args = argparse.Namespace(compress=None, full_upload=False)
+    
+    def deploy(commit):
+        build = tmp_path / commit / 'build'
+        (build / 'static' / 'js').mkdir(parents=True)
+        (build / 'index.html').write_text(f"<html>{commit}</html>")
+        (build / 'static' / 'js' / 'main.3f9a1c2b.js').write_text('shared')
+        published = command.publish_build(publish_args, 'dev', 'site', str(build), str(tmp_path / commit),
+                                          commit * 40, website_url='http://site')
+        command.history.add({'timestamp': datetime.now().isoformat(), 'environment': 'dev', 'status': 'success',
+                             'bucket': 'site', 'commit_hash': commit * 40, 'release': published['release'],
+                             'url': 'http://site'})
+        return published
+    
+    first = deploy('a')
+    deploy('b')
+    
+    assert command.execute(argparse.Namespace(env='dev', deployment=1, upload_workers=None, env_file=None))
+    assert s3.get_object(Bucket='site', Key='index.html')['Body'].read() == b'<html>a</html>'
+    assert aws_client.load_manifest('site', 'dev') == aws_client.load_release_manifest('site', first['release'])
+    
+    # The next deploy copies what the restored release already holds instead of uploading it again
+    assert deploy('c')['manifest']['copied'] == 1
@@ -0,0 +1,91 @@
+"""Tests for the rollback command's safety checks."""
+
+import argparse
+import json
+
+import pytest
+
+from commands.rollback import RollbackCommand
+
+
+class FakeAWSClient:
+    aws_region = 'us-east-1'
+    aws_profile = 'test'
+    
+    def __init__(self, backup_ok=True, clear_ok=True):
+        self.backup_ok = backup_ok
+        self.clear_ok = clear_ok
+        self.calls = []
+    
+    def check_sso_login(self):
+        return True
+    
+    def backup_current_deployment(self, bucket_name, backup_prefix):
+        self.calls.append('backup')
+        return self.backup_ok
+    
+    def delete_manifest(self, bucket_name, environment):
+        self.calls.append('delete_manifest')
+    
+    def clear_s3_bucket(self, bucket_name):
+        self.calls.append('clear')
+        return self.clear_ok
+
+
+class FakeGitOperations:
+    temp_dirs = []
+    
+    def __init__(self, calls):
+        self.calls = calls
+    
+    def clone_repository(self, github_url, branch, commit_hash):
+        self.calls.append('clone')
+        raise AssertionError('rollback should have stopped before cloning')
+
+
+@pytest.fixture
+def make_rollback(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.deploy-config.json').write_text(json.dumps({
+        'cache_dir': str(tmp_path / 'cache'),
+        'identity_cache': {'enabled': False},
+        'github_url': 'https://github.com/example/site'
+    }))
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'yes')
+    
+    def make(aws_client):
+        command = RollbackCommand()
+        command.aws_client = aws_client
+        command.git_ops = FakeGitOperations(aws_client.calls)
+        for day, commit in enumerate(['a' * 40, 'b' * 40], 1):
+            command.history.add({
+                'timestamp': f'2024-01-0{day}T00:00:00', 'environment': 'dev', 'status': 'success',
+                'bucket': 'site', 'commit_hash': commit, 'commit_short': commit[:8],
+                'github_url': 'https://github.com/example/site'
+            })
+        return command
+    
+    return make
+
+
+def rollback_args():
+    return argparse.Namespace(env='dev', deployment=1, upload_workers=None, env_file=None)
+
+
+def test_incomplete_backup_leaves_the_bucket_untouched(make_rollback):
+    aws_client = FakeAWSClient(backup_ok=False)
+    command = make_rollback(aws_client)
+    
+    assert command.execute(rollback_args()) is False
+    assert aws_client.calls == ['backup']
+    assert command.history.count(environment='dev') == 2
+
+
+def test_partly_cleared_bucket_stops_the_rollback(make_rollback):
+    aws_client = FakeAWSClient(clear_ok=False)
+    command = make_rollback(aws_client)
+    
+    assert command.execute(rollback_args()) is False
+    # The manifest goes first so a partly cleared bucket never has one claiming its old files
+    assert aws_client.calls == ['backup', 'delete_manifest', 'clear']
+    assert command.history.count(environment='dev') == 2
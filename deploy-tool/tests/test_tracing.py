@@ -0,0 +1,103 @@
+"""Tests for phase spans and the Chrome trace export."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from utils import tracing
+from utils.tracing import count, phase_timings, span, start_tracing, stop_tracing, trace, traced
+
+
+@pytest.fixture
+def tracer():
+    tracer = start_tracing()
+    yield tracer
+    stop_tracing()
+
+
+def complete_events(document):
+    return {event['name']: event for event in document['traceEvents'] if event['ph'] == 'X'}
+
+
+def contains(parent, child):
+    return parent['ts'] <= child['ts'] and child['ts'] + child['dur'] <= parent['ts'] + parent['dur']
+
+
+@traced(category='phase')
+def publish():
+    with span('upload_to_s3'):
+        count('files_uploaded', 3)
+        time.sleep(0.01)
+
+
+def test_nested_spans_export_inside_their_parents(tracer, tmp_path):
+    with trace('deploy', environment='dev') as root:
+        with span('clone', 'phase'):
+            count('git_commands')
+            time.sleep(0.01)
+        publish()
+    
+    trace_path = tmp_path / 'trace.json'
+    tracer.save(str(trace_path))
+    events = complete_events(json.loads(trace_path.read_text()))
+    
+    assert set(events) == {'deploy', 'clone', 'publish', 'upload_to_s3'}
+    assert contains(events['deploy'], events['clone'])
+    assert contains(events['deploy'], events['publish'])
+    assert contains(events['publish'], events['upload_to_s3'])
+    assert events['clone']['ts'] + events['clone']['dur'] <= events['publish']['ts']
+    
+    # Counters land on every span that was open while they grew
+    assert events['upload_to_s3']['args']['files_uploaded'] == 3
+    assert events['publish']['args']['files_uploaded'] == 3
+    assert events['deploy']['args'] == {'environment': 'dev', 'git_commands': 1, 'files_uploaded': 3}
+    assert 'files_uploaded' not in events['clone']['args']
+    
+    assert events['deploy']['cat'] == 'command'
+    assert set(phase_timings(root)) == {'clone', 'publish'}
+
+
+def test_spans_from_threads_get_their_own_track(tracer):
+    def worker():
+        with span('copy_one'):
+            pass
+    
+    with span('backup'):
+        threads = [threading.Thread(target=worker, name=f'worker-{i}') for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    document = tracer.to_chrome_trace()
+    tracks = {event['tid'] for event in document['traceEvents'] if event['name'] == 'copy_one'}
+    names = {event['args']['name'] for event in document['traceEvents'] if event['name'] == 'thread_name'}
+    assert len(tracks) == 2
+    assert {'worker-0', 'worker-1'} <= names
+
+
+def test_failed_span_records_the_error(tracer):
+    with pytest.raises(ValueError):
+        with span('build', 'phase'):
+            raise ValueError('npm failed')
+    
+    assert tracer.spans[0].args['error'] == 'ValueError: npm failed'
+
+
+def test_spans_do_nothing_while_tracing_is_off():
+    assert tracing.get_tracer() is None
+    with span('clone') as clone_span:
+        clone_span.set(files=1)
+        count('git_commands')
+    publish()
+    assert tracing.get_tracer() is None
+
+
+def test_trace_without_tracing_uses_a_private_tracer():
+    with trace('rollback') as root:
+        with span('activate', 'phase'):
+            pass
+        assert phase_timings(root).keys() == {'activate'}
+    assert tracing.get_tracer() is None
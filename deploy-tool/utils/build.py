@@ -2,9 +2,17 @@
 
 import os
 import json
+import time
 import subprocess
 import shutil
+import threading
 from datetime import datetime
+from core.config import get_cache_dir
+from utils.tracing import span, traced
+
+INSTALL_STATS_FILE = 'install-stats.json'
+
+_install_stats_lock = threading.Lock()
 
 
 def detect_project_type(project_path):
@@ -77,27 +85,171 @@ def create_health_check_endpoint(build_dir):
         return None
 
 
+def get_build_env(project_path):
+    """Get a private copy of the environment for a project's install and build subprocesses."""
+    env = dict(os.environ)
+    env['PWD'] = project_path
+    return env
+
+
+def get_install_command(project_path, config):
+    """Get a lockfile-aware install command that uses the tool's persistent package cache."""
+    if os.path.exists(os.path.join(project_path, 'pnpm-lock.yaml')):
+        store_dir = get_cache_dir(config, 'packages', 'pnpm')
+        return 'pnpm', store_dir, f'pnpm install --frozen-lockfile --prefer-offline --store-dir "{store_dir}"'
+    
+    if os.path.exists(os.path.join(project_path, 'yarn.lock')):
+        cache_dir = get_cache_dir(config, 'packages', 'yarn')
+        return 'yarn', cache_dir, f'yarn install --frozen-lockfile --prefer-offline --cache-folder "{cache_dir}"'
+    
+    cache_dir = get_cache_dir(config, 'packages', 'npm')
+    if os.path.exists(os.path.join(project_path, 'package-lock.json')) or \
+            os.path.exists(os.path.join(project_path, 'npm-shrinkwrap.json')):
+        return 'npm', cache_dir, f'npm ci --prefer-offline --no-audit --no-fund --cache "{cache_dir}"'
+    return 'npm', cache_dir, f'npm install --prefer-offline --no-audit --no-fund --cache "{cache_dir}"'
+
+
+def count_cache_entries(cache_dir, manager):
+    """Count the package versions held in a package cache directory."""
+    if manager == 'yarn':
+        # Yarn v1 unpacks one npm-<name>-<version>-... directory per package version under v6/
+        return sum(len([name for name in os.listdir(os.path.join(cache_dir, version)) if name.startswith('npm-')])
+                   for version in os.listdir(cache_dir)
+                   if version.startswith('v') and os.path.isdir(os.path.join(cache_dir, version)))
+    if manager == 'pnpm':
+        # The store keeps one index file per package version next to the content files it lists:
+        # files/xx/<hash>-index.json up to store v3, index/xx/<hash>-<name>@<version>.json from v10
+        return sum(1 for root, dirs, files in os.walk(cache_dir) for name in files
+                   if name.endswith('-index.json') or os.path.basename(os.path.dirname(root)) == 'index')
+    # npm stores every downloaded tarball as one content-addressed file
+    return sum(len(files) for root, dirs, files in os.walk(os.path.join(cache_dir, '_cacache', 'content-v2')))
+
+
+def _count_lockfile_section(lockfile_path, section=None):
+    """Count the entries of a YAML-style lockfile, or of one of its top-level sections."""
+    entries = 0
+    in_section = section is None
+    with open(lockfile_path, 'r') as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            if section is None:
+                # yarn.lock v1: one unindented "name@range, name@range:" header per resolved version
+                entries += not line[0].isspace() and line.rstrip().endswith(':')
+            elif not line[0].isspace():
+                in_section = line.rstrip() == f"{section}:"
+            elif in_section and line.startswith('  ') and not line[2].isspace():
+                entries += 1
+    return entries
+
+
+def count_locked_packages(project_path, manager='npm'):
+    """Count the package versions pinned by the project's lockfile, if there is one."""
+    lockfiles = {'npm': 'package-lock.json', 'yarn': 'yarn.lock', 'pnpm': 'pnpm-lock.yaml'}
+    lockfile_path = os.path.join(project_path, lockfiles[manager])
+    if not os.path.exists(lockfile_path):
+        return None
+    
+    try:
+        if manager == 'yarn':
+            return _count_lockfile_section(lockfile_path) or None
+        if manager == 'pnpm':
+            # Every resolved package version is a key of the top-level "packages" map
+            return _count_lockfile_section(lockfile_path, 'packages') or None
+        with open(lockfile_path, 'r') as f:
+            lockfile = json.load(f)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    
+    # lockfileVersion 2/3 list every package under "packages", keyed by install path
+    packages = lockfile.get('packages')
+    if packages:
+        return len([path for path in packages if path])
+    return len(lockfile.get('dependencies', {})) or None
+
+
+def record_install_stats(config, stats):
+    """Append install stats to the cache's history and return that history."""
+    stats_path = os.path.join(get_cache_dir(config, 'packages'), INSTALL_STATS_FILE)
+    
+    # Parallel builds share the stats file
+    with _install_stats_lock:
+        history = []
+        if os.path.exists(stats_path):
+            try:
+                with open(stats_path, 'r') as f:
+                    history = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                history = []
+        
+        history = (history + [stats])[-50:]
+        temp_path = f"{stats_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        os.replace(temp_path, stats_path)
+    return history
+
+
+def install_dependencies(project_path, config, env=None):
+    """Install dependencies through the persistent package cache and report cache savings."""
+    manager, cache_dir, install_command = get_install_command(project_path, config)
+    entries_before = count_cache_entries(cache_dir, manager)
+    
+    print(f"Installing dependencies ({install_command.split(' --')[0]}, cache: {cache_dir})...")
+    started = time.perf_counter()
+    with span('install_dependencies', 'build', command=install_command.split(' --')[0]) as install_span:
+        subprocess.run(install_command, shell=True, check=True, capture_output=True, text=True,
+                       cwd=project_path, env=env or get_build_env(project_path))
+    install_seconds = time.perf_counter() - started
+    
+    new_entries = count_cache_entries(cache_dir, manager) - entries_before
+    locked_packages = count_locked_packages(project_path, manager)
+    hit_rate = None
+    if locked_packages:
+        hit_rate = max(0.0, 1 - new_entries / locked_packages)
+    
+    install_span.set(new_cache_entries=new_entries, hit_rate=round(hit_rate, 3) if hit_rate is not None else None)
+    history = record_install_stats(config, {
+        'timestamp': datetime.now().isoformat(),
+        'manager': manager,
+        'seconds': round(install_seconds, 2),
+        'new_cache_entries': new_entries,
+        'packages': locked_packages,
+        'hit_rate': round(hit_rate, 3) if hit_rate is not None else None
+    })
+    average_seconds = sum(entry['seconds'] for entry in history) / len(history)
+    
+    print(f"Dependencies installed in {install_seconds:.1f}s")
+    if hit_rate is not None:
+        print(f"   Package cache hit rate: {hit_rate * 100:.0f}% ({locked_packages} packages, "
+              f"{new_entries} new cache entries)")
+    else:
+        print(f"   New package cache entries: {new_entries}")
+    print(f"   Average install time over last {len(history)} installs: {average_seconds:.1f}s")
+
+
+@traced()
 def build_project(project_path, env_file_path, config):
     """Build the project."""
     print("Building project...")
     
-    original_cwd = os.getcwd()
-    os.chdir(project_path)
+    # Everything runs with an explicit cwd and env so builds can run in parallel
+    env = get_build_env(project_path)
     
     try:
-        if not os.path.exists('package.json'):
+        if not os.path.exists(os.path.join(project_path, 'package.json')):
             raise Exception("package.json not found. This doesn't appear to be a Node.js project.")
         
         if env_file_path:
             handle_env_file(project_path, env_file_path)
         
-        print("Installing dependencies...")
-        result = subprocess.run(['npm', 'install'], shell=True, check=True, capture_output=True, text=True)
-        print("Dependencies installed successfully")
+        install_dependencies(project_path, config, env)
         
         print("Building...")
         build_command = config.get('build_command', 'npm run build')
-        result = subprocess.run(build_command, shell=True, check=True, capture_output=True, text=True)
+        with span('run_build', 'build', command=build_command):
+            result = subprocess.run(build_command, shell=True, check=True, capture_output=True, text=True,
+                                    cwd=project_path, env=env)
         print("Build completed successfully")
         
         build_dir = config.get('build_dir', 'build')
@@ -114,6 +266,4 @@ def build_project(project_path, env_file_path, config):
     except subprocess.CalledProcessError as e:
         print(f"Build failed: {e.stderr}")
         raise Exception("Build process failed")
-    finally:
-        os.chdir(original_cwd)
  
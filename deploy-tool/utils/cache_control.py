@@ -0,0 +1,66 @@
+"""Cache-Control policy rules for uploaded build files."""
+
+import re
+import fnmatch
+
+# A bundler content hash is hex of 8+ characters (main.3f9a1c2b.js, main.12345678.js) or 8 base64url
+# ones (index-BkXaQcZe.js); only files under BUILD_OUTPUT_PATTERNS are checked for one
+FINGERPRINT_PATTERN = re.compile(r'[.-][0-9a-fA-F]{8,}\.|-[A-Za-z0-9_-]{8}\.')
+
+# Only bundler output directories hold hashed files; copied public files keep their names
+BUILD_OUTPUT_PATTERNS = ['static/*', 'assets/*', '_next/static/*']
+
+IMMUTABLE_MAX_AGE = 31536000
+
+DEFAULT_CACHE_RULES = [
+    {'match': 'health', 'cache_control': 'no-cache, no-store, must-revalidate'},
+    {'match': ['service-worker.js', 'sw.js'], 'cache_control': 'no-cache'},
+    {'match': ['*.html', 'manifest.json', 'asset-manifest.json'], 'cache_control': 'no-cache'},
+    {'match': BUILD_OUTPUT_PATTERNS, 'fingerprinted': True, 'cache_control': f'public, max-age={IMMUTABLE_MAX_AGE}, immutable',
+     'expires_in': IMMUTABLE_MAX_AGE},
+    {'match': '*', 'cache_control': 'public, max-age=3600'}
+]
+
+
+def is_fingerprinted(s3_path):
+    """Check whether a file name carries a bundler content hash."""
+    return bool(FINGERPRINT_PATTERN.search(s3_path.rsplit('/', 1)[-1]))
+
+
+def _matches_pattern(s3_path, pattern):
+    """Match a glob against the full key, or the file name when it has no slash."""
+    if '/' in pattern:
+        return fnmatch.fnmatchcase(s3_path, pattern)
+    return fnmatch.fnmatchcase(s3_path.rsplit('/', 1)[-1], pattern)
+
+
+def _matches_rule(s3_path, rule):
+    """Check whether a cache rule applies to an S3 key."""
+    if rule.get('fingerprinted') and not is_fingerprinted(s3_path):
+        return False
+    
+    patterns = rule.get('match')
+    if patterns is None:
+        return True
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    return any(_matches_pattern(s3_path, pattern) for pattern in patterns)
+
+
+def resolve_cache_policy(s3_path, rules):
+    """Return the Cache-Control and Expires settings of the first matching rule."""
+    for rule in rules:
+        if _matches_rule(s3_path, rule):
+            policy = {'cache_control': rule['cache_control']}
+            if rule.get('expires_in'):
+                policy['expires_in'] = int(rule['expires_in'])
+            return policy
+    return {}
+
+
+def get_cache_rules(config, environment):
+    """Get cache rules for an environment, falling back to global and default rules."""
+    env_rules = config.get('environments', {}).get(environment, {}).get('cache_rules')
+    if env_rules is not None:
+        return env_rules
+    return config.get('cache_rules', DEFAULT_CACHE_RULES)
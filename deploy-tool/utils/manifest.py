@@ -0,0 +1,93 @@
+"""Build manifest utilities for delta uploads."""
+
+import os
+import hashlib
+from utils.cache_control import resolve_cache_policy
+
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.js': 'application/javascript',
+    '.css': 'text/css',
+    '.json': 'application/json',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.ico': 'image/x-icon'
+}
+
+
+def get_content_type(file_name):
+    """Get the S3 content type for a build file."""
+    file_ext = os.path.splitext(file_name)[1].lower()
+    return CONTENT_TYPES.get(file_ext, 'application/json' if file_name == 'health' else 'text/html')
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(build_dir, content_encodings=None, cache_rules=None):
+    """Map every file in the build directory to its hash, size and upload headers."""
+    content_encodings = content_encodings or {}
+    manifest = {}
+    
+    for root, dirs, files in os.walk(build_dir):
+        for file in files:
+            local_path = os.path.join(root, file)
+            s3_path = os.path.relpath(local_path, build_dir).replace('\\', '/')
+            
+            manifest[s3_path] = {
+                'hash': hash_file(local_path),
+                'size': os.path.getsize(local_path),
+                'content_type': get_content_type(file)
+            }
+            if s3_path in content_encodings:
+                manifest[s3_path]['content_encoding'] = content_encodings[s3_path]
+            if cache_rules is not None:
+                manifest[s3_path].update(resolve_cache_policy(s3_path, cache_rules))
+    
+    return manifest
+
+
+def diff_manifests(previous, current):
+    """Return the entries of the current manifest that are new or changed."""
+    return {path: entry for path, entry in current.items() if previous.get(path) != entry}
+
+
+def manifest_document(bucket_name, manifest, commit_hash=None, release=None):
+    """Wrap an uploaded manifest with the deployment it describes, for storing in the bucket."""
+    return {'bucket': bucket_name, 'commit': commit_hash, 'release': release, 'files': manifest}
+
+
+def trusted_manifest(document, bucket_name, live_deployment=None):
+    """Get the files and release prefix of a stored manifest, or nothing when it may not match the bucket."""
+    if not document or document.get('bucket') != bucket_name:
+        return {}, None
+    
+    # A deploy from another machine may have replaced what the live record describes
+    if live_deployment and live_deployment.get('bucket') == bucket_name:
+        if live_deployment.get('commit_hash') != document.get('commit') or \
+                live_deployment.get('release') != document.get('release'):
+            print(f"Manifest in {bucket_name} does not match the live deployment, uploading all files")
+            return {}, None
+    
+    return document.get('files', {}), document.get('release')
+
+
+def summarize_manifest(manifest, uploaded, copied=0):
+    """Summarize a delta upload for the deployment record."""
+    return {
+        'files': len(manifest),
+        'uploaded': len(uploaded),
+        'copied': copied,
+        'skipped': len(manifest) - len(uploaded) - copied,
+        'bytes_total': sum(entry['size'] for entry in manifest.values()),
+        'bytes_uploaded': sum(entry['size'] for entry in uploaded.values())
+    }
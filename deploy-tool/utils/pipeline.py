@@ -0,0 +1,132 @@
+"""Stage scheduler that runs independent deploy stages concurrently."""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.tracing import span
+
+
+def require(check, message):
+    """Wrap a check that returns False on failure as a stage that raises instead."""
+    def stage():
+        if not check():
+            raise Exception(message)
+        return True
+    
+    return stage
+
+
+class Stage:
+    def __init__(self, name, func, depends_on):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+    
+    @property
+    def seconds(self):
+        """Get how long the stage ran."""
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class Pipeline:
+    def __init__(self, max_workers=8):
+        self.stages = {}
+        self.max_workers = max_workers
+        self.started = None
+        self.finished = None
+    
+    def add_stage(self, name, func, depends_on=()):
+        """Register a stage; it starts as soon as every stage it depends on has succeeded."""
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, func, depends_on)
+    
+    def result(self, name):
+        """Get the return value of a finished stage."""
+        return self.stages[name].result
+    
+    def _run_stage(self, stage):
+        """Run one stage, recording its timing, result or error."""
+        stage.started = time.perf_counter()
+        try:
+            with span(stage.name, 'phase'):
+                stage.result = stage.func()
+            stage.status = 'done'
+        except Exception as e:
+            stage.error = e
+            stage.status = 'failed'
+        finally:
+            stage.finished = time.perf_counter()
+    
+    def run(self):
+        """Run every stage whose dependencies succeed; return True when all stages succeeded."""
+        self.started = time.perf_counter()
+        running = set()
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                # Stages are registered after their dependencies, so one pass settles skips
+                for stage in self.stages.values():
+                    if stage.status != 'pending':
+                        continue
+                    
+                    dependency_statuses = [self.stages[name].status for name in stage.depends_on]
+                    if any(status in ('failed', 'skipped') for status in dependency_statuses):
+                        stage.status = 'skipped'
+                    elif all(status == 'done' for status in dependency_statuses):
+                        stage.status = 'running'
+                        running.add(executor.submit(self._run_stage, stage))
+                
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+        
+        self.finished = time.perf_counter()
+        return not self.failed_stages()
+    
+    def failed_stages(self):
+        """Get the stages that raised, in registration order."""
+        return [stage for stage in self.stages.values() if stage.status == 'failed']
+    
+    def critical_path(self):
+        """Walk back from the last stage to finish through the dependency that finished last."""
+        finished = [stage for stage in self.stages.values() if stage.finished is not None]
+        if not finished:
+            return []
+        
+        stage = max(finished, key=lambda s: s.finished)
+        path = [stage]
+        while stage.depends_on:
+            stage = max((self.stages[name] for name in stage.depends_on), key=lambda s: s.finished)
+            path.insert(0, stage)
+        return path
+    
+    def timings(self):
+        """Get the seconds each stage ran, by stage name."""
+        return {name: round(stage.seconds, 2) for name, stage in self.stages.items() if stage.started is not None}
+    
+    def print_timings(self):
+        """Print when each stage ran, the time overlap saved and the critical path."""
+        wall_seconds = self.finished - self.started
+        stage_seconds = sum(stage.seconds for stage in self.stages.values())
+        
+        print(f"Stage timings: {wall_seconds:.1f}s wall clock, {stage_seconds:.1f}s of stage time "
+              f"({max(0.0, stage_seconds - wall_seconds):.1f}s saved by overlap)")
+        for stage in sorted(self.stages.values(), key=lambda s: s.started if s.started is not None else float('inf')):
+            if stage.started is None:
+                print(f"   {stage.name:<20} {stage.status}")
+                continue
+            status = '' if stage.status == 'done' else f"  {stage.status}"
+            print(f"   {stage.name:<20} {stage.started - self.started:6.1f}s -> "
+                  f"{stage.finished - self.started:6.1f}s  {stage.seconds:6.1f}s{status}")
+        
+        critical_path = self.critical_path()
+        if critical_path:
+            print("   Critical path: " + " -> ".join(f"{stage.name} ({stage.seconds:.1f}s)" for stage in critical_path))
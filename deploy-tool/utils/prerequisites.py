@@ -1,30 +1,31 @@
 """Prerequisites checking utilities."""
 
+import shutil
 import subprocess
 
 
+def get_tool_version(name):
+    """Get a command-line tool's version, or None when it is not installed."""
+    # Resolving the executable first finds npm.cmd on Windows without going through a shell
+    executable = shutil.which(name)
+    if not executable:
+        return None
+    
+    try:
+        result = subprocess.run([executable, '--version'], capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
 def check_prerequisites():
     """Check and print prerequisites."""
     print("Checking prerequisites...")
     prerequisites = []
     
-    try:
-        result = subprocess.run(['node', '--version'], shell=True, capture_output=True, text=True)
-        prerequisites.append(f"Node.js: {result.stdout.strip()}" if result.returncode == 0 else "Node.js: Not found")
-    except:
-        prerequisites.append("Node.js: Not found")
-    
-    try:
-        result = subprocess.run(['npm', '--version'], shell=True, capture_output=True, text=True)
-        prerequisites.append(f"npm: {result.stdout.strip()}" if result.returncode == 0 else "npm: Not found")
-    except:
-        prerequisites.append("npm: Not found")
-    
-    try:
-        result = subprocess.run(['git', '--version'], shell=True, capture_output=True, text=True)
-        prerequisites.append(f"Git: {result.stdout.strip()}" if result.returncode == 0 else "Git: Not found")
-    except:
-        prerequisites.append("Git: Not found")
+    for label, name in (('Node.js', 'node'), ('npm', 'npm'), ('Git', 'git')):
+        version = get_tool_version(name)
+        prerequisites.append(f"{label}: {version}" if version else f"{label}: Not found")
     
     for prereq in prerequisites:
         print(f"  {prereq}")
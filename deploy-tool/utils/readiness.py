@@ -0,0 +1,42 @@
+"""HTTP readiness polling utilities."""
+
+import time
+import urllib.error
+import urllib.request
+
+
+def probe_endpoint(url, timeout=5):
+    """Check whether an endpoint answers with a 2xx status."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return 200 <= response.status < 300
+    except (urllib.error.URLError, OSError, ValueError):
+        # HTTPError (e.g. 503 while starting) is a URLError
+        return False
+
+
+def wait_until_ready(endpoints, timeout=600, initial_delay=2, max_delay=30):
+    """Poll endpoints with exponential backoff and return their ready times and the names still pending."""
+    started = time.monotonic()
+    deadline = started + timeout
+    pending = dict(endpoints)
+    ready = {}
+    delay = initial_delay
+    
+    while pending:
+        for name, url in list(pending.items()):
+            if probe_endpoint(url):
+                ready[name] = time.monotonic() - started
+                del pending[name]
+                print(f"  {name} ready after {ready[name]:.0f}s")
+        
+        remaining = deadline - time.monotonic()
+        if not pending or remaining <= 0:
+            break
+        
+        wait_seconds = min(delay, remaining)
+        print(f"  Waiting for {', '.join(pending)} (next check in {wait_seconds:.0f}s, {remaining:.0f}s left)...")
+        time.sleep(wait_seconds)
+        delay = min(delay * 2, max_delay)
+    
+    return ready, list(pending)
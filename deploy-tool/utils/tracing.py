@@ -0,0 +1,213 @@
+"""Nested timing spans and counters, exported as Chrome trace JSON."""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+
+# Tracer that span() and count() record into; None when tracing is off
+_tracer = None
+
+
+class Span:
+    def __init__(self, name, category, args, thread_id):
+        self.name = name
+        self.category = category
+        self.args = dict(args)
+        self.thread_id = thread_id
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.finished = None
+    
+    @property
+    def seconds(self):
+        """Get how long the span ran."""
+        if self.finished is None:
+            return 0.0
+        return self.finished - self.started
+    
+    def set(self, **args):
+        """Attach extra values to the span."""
+        self.args.update(args)
+
+
+class _NullSpan:
+    def set(self, **args):
+        """Ignore values while tracing is off."""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+        self.threads = {}
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _thread_id(self):
+        """Get a small per-thread id, naming the thread the first time it records a span."""
+        thread_id = getattr(self._local, 'thread_id', None)
+        if thread_id is None:
+            with self._lock:
+                thread_id = self._local.thread_id = len(self.threads) + 1
+                self.threads[thread_id] = threading.current_thread().name
+        return thread_id
+    
+    @contextmanager
+    def span(self, name, category='function', **args):
+        """Time a block, recording how much every counter grew while it ran."""
+        span = Span(name, category, args, self._thread_id())
+        with self._lock:
+            counters_before = dict(self.counters)
+        
+        try:
+            yield span
+        except BaseException as e:
+            span.args['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.finished = time.perf_counter()
+            # Counters are process-wide, so a span also sees work done by threads running beside it
+            with self._lock:
+                span.counters = {key: value - counters_before.get(key, 0)
+                                 for key, value in self.counters.items() if value != counters_before.get(key, 0)}
+                self.spans.append(span)
+    
+    def count(self, name, value=1):
+        """Add to a named counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def phase_timings(self, since=None):
+        """Get the seconds spent in each phase span (started after since, if given), by phase name."""
+        timings = {}
+        for span in self.spans:
+            if span.category == 'phase' and (since is None or span.started >= since):
+                timings[span.name] = timings.get(span.name, 0.0) + span.seconds
+        return {name: round(seconds, 2) for name, seconds in timings.items()}
+    
+    def to_chrome_trace(self):
+        """Build a Chrome trace / Perfetto JSON document from the recorded spans."""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': 'deploy_tool'}}]
+        for thread_id, thread_name in self.threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'name': thread_name}})
+            events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                           'args': {'sort_index': thread_id}})
+        
+        for span in sorted(self.spans, key=lambda s: s.started):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.started - self.started) * 1e6, 1),
+                'dur': round(span.seconds * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': {**span.args, **span.counters}
+            })
+        
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'started_at': self.started_at, 'counters': dict(self.counters)}
+        }
+    
+    def save(self, trace_path):
+        """Write the trace to a file that chrome://tracing or ui.perfetto.dev can open."""
+        with open(trace_path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, indent=1)
+
+
+def start_tracing():
+    """Start recording spans and counters process-wide."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing():
+    """Stop recording and return the tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    """Get the active tracer, or None when tracing is off."""
+    return _tracer
+
+
+@contextmanager
+def trace(name, **args):
+    """Run a command under a root span, in the active tracer or in a private one; yields the root span."""
+    global _tracer
+    tracer = _tracer
+    private = tracer is None
+    if private:
+        tracer = _tracer = Tracer()
+    
+    try:
+        with tracer.span(name, 'command', **args) as root:
+            yield root
+    finally:
+        if private and _tracer is tracer:
+            _tracer = None
+
+
+def phase_timings(root):
+    """Get the seconds spent in each phase of the command running under a root span from trace()."""
+    tracer = _tracer
+    return tracer.phase_timings(since=root.started) if tracer is not None else {}
+
+
+def span(name, category='function', **args):
+    """Time a block in the active tracer; does nothing while tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return nullcontext(_NULL_SPAN)
+    return tracer.span(name, category, **args)
+
+
+def traced(name=None, category='function'):
+    """Decorate a function so every call is recorded as a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, category):
+                return func(*args, **kwargs)
+        
+        return wrapper
+    
+    return decorator
+
+
+def count(name, value=1):
+    """Add to a counter in the active tracer."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def _count_api_call(event_name, **kwargs):
+    """Count an AWS API call from a botocore before-call event (before-call.<service>.<operation>)."""
+    service = event_name.split('.')[1]
+    count('aws_api_calls')
+    count(f'{service}_api_calls')
+
+
+def instrument_client(client):
+    """Count every API call a boto3 client makes, including the parts of managed transfers."""
+    client.meta.events.register('before-call', _count_api_call)
+    return client